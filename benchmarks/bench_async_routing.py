@@ -0,0 +1,37 @@
+"""Benchmark: AsyncRoutingClient vs the sequential get_optimized_route loop.
+
+Both paths talk to the local FakeRoutingServer, so no API keys or network
+access are needed. Caches start empty for each run.
+
+    python -m benchmarks.bench_async_routing [n_lanes] [latency_s]
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ORS_API_KEY", "benchmark")
+
+from tests.fakes import FakeRoutingServer, make_lanes, run_async, run_sequential
+
+
+def main(n=200, latency=0.05):
+    lanes = make_lanes(n)
+    with FakeRoutingServer(latency=latency) as server:
+        sequential, seq_seconds = run_sequential(server, lanes)
+        seq_requests = server.requests
+
+    print(f"Lanes: {n}, server latency: {latency * 1000:.0f} ms")
+    print(f"Sequential       : {n / seq_seconds:8.1f} lanes/s  ({seq_requests} requests)")
+
+    for concurrency in (8, 32):
+        with FakeRoutingServer(latency=latency, rate_limit_every=25) as server:
+            results, seconds, retries = run_async(server, lanes, concurrency)
+            requests = server.requests
+        assert [r["baseline"]["distance_km"] for r in results] == [r["baseline"]["distance_km"] for r in sequential]
+        print(f"Async (c={concurrency:<3})    : {n / seconds:8.1f} lanes/s  "
+              f"({requests} requests, {retries} retried 429s, {seq_seconds / seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 200, float(args[1]) if len(args) > 1 else 0.05)
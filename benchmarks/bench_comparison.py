@@ -0,0 +1,58 @@
+"""Benchmark: costing every vehicle/fuel option for many trips, factor cube vs calculate_emissions.
+
+Each synthetic trip drives some tonne-km through one GLEC region; the cube
+evaluates all of the table's (vehicle, fuel) options for all trips in one
+matrix product. A sample is checked against calculate_emissions.
+
+    python -m benchmarks.bench_comparison [n_trips]
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from logic.comparison import get_factor_cube, rank_options
+from logic.emissions import calculate_emissions, get_factor_index
+
+
+def main(n_trips=10_000):
+    cube = get_factor_cube()
+    rng = np.random.default_rng(0)
+    region = rng.integers(0, len(cube.regions), n_trips)
+    distance_km, load_tons = rng.uniform(5, 900, n_trips), rng.uniform(1, 30, n_trips)
+    tkm = np.zeros((n_trips, len(cube.regions)))
+    tkm[np.arange(n_trips), region] = distance_km * load_tons
+
+    start = time.perf_counter()
+    totals = cube.evaluate(tkm)
+    fast = time.perf_counter() - start
+    options = int((~np.isnan(totals["WTW"])).sum())
+    print(f"{n_trips} trips x {len(cube.combos)} options: cube {fast * 1000:.1f} ms ({options} priced)")
+
+    # The same work one calculate_emissions call per (trip, option) on a sample
+    sample = range(min(n_trips, 200))
+    index = get_factor_index()
+    start = time.perf_counter()
+    for t in sample:
+        for c, (vehicle, fuel) in enumerate(cube.combos):
+            if not cube.available[region[t], c]:
+                continue
+            # The cube prices the table row itself; calculate_emissions matches by token, so compare on exact rows
+            record = index.lookup(vehicle, fuel, cube.regions[region[t]])
+            if record is not None and record.vehicle_type == vehicle:
+                expected = calculate_emissions(vehicle, fuel, distance_km[t], load_tons[t], cube.regions[region[t]])
+                assert abs(expected["WTW"] - round(totals["WTW"][t, c], 2)) < 0.011, (vehicle, fuel)
+    slow = (time.perf_counter() - start) * n_trips / len(sample)
+    print(f"calculate_emissions loop ~{slow * 1000:.0f} ms ({slow / fast:.0f}x)")
+
+    start = time.perf_counter()
+    ranked = rank_options({cube.regions[region[0]]: tkm[0, region[0]]})
+    print(f"rank_options for one trip {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{len(ranked['ranked'])} ranked, {len(ranked['missing'])} missing")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,84 @@
+"""Microbenchmark: EmissionFactorIndex lookups vs the old DataFrame scan.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_emission_index
+"""
+import sys
+import os
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd
+
+from logic.emissions import df, factor_index, get_emission_factors
+
+# Mix of hits and misses that the map view actually produces
+QUERIES = [
+    ("Van (<3.5t)", "Diesel", "Europe & South America"),
+    ("Rigid truck (12t)", "Diesel", "Europe & South America"),
+    ("Rigid truck (18t)", "CNG", "Europe & South America"),
+    ("Articulated truck (40t)", "Diesel", "China"),
+    ("Flatbed Truck", "Unknown", "North America"),
+    ("HGV (>20t)", "Diesel", "Europe & South America"),
+]
+
+
+def scan_lookup(vehicle_type, fuel, region):
+    # The pre-index implementation of get_emission_factors, kept for comparison
+    vehicle_type = vehicle_type.lower().strip()
+    fuel = fuel.lower().strip()
+    region = region.lower().strip()
+
+    match = df[
+        (df["Region"] == region) &
+        (df["Vehicle Type"].str.contains(vehicle_type.split()[0], case=False)) &
+        (df["Fuel"] == fuel)
+    ]
+    if match.empty:
+        raise ValueError(f"No match found for: {vehicle_type} with fuel: {fuel} in region: {region}")
+
+    row = match.iloc[0]
+    if pd.isna(row["WTW (g CO2e/t-km)"]):
+        wtw = float(row["WTT (g CO2e/t-km)"]) + float(row["TTW (g CO2e/t-km)"])
+    else:
+        wtw = float(row["WTW (g CO2e/t-km)"])
+    return {"WTT": float(row["WTT (g CO2e/t-km)"]), "TTW": float(row["TTW (g CO2e/t-km)"]), "WTW": wtw}
+
+
+def _run(lookup):
+    for query in QUERIES:
+        try:
+            lookup(*query)
+        except ValueError:
+            pass
+
+
+def main(number=200):
+    # Both paths must agree before timing means anything
+    for query in QUERIES:
+        try:
+            expected = scan_lookup(*query)
+        except ValueError:
+            expected = None
+        try:
+            actual = get_emission_factors(*query)
+        except ValueError:
+            actual = None
+        assert expected == actual, (query, expected, actual)
+
+    scan = min(timeit.repeat(lambda: _run(scan_lookup), number=number, repeat=3))
+    index = min(timeit.repeat(lambda: _run(get_emission_factors), number=number, repeat=3))
+    per_call = number * len(QUERIES)
+
+    print(f"DataFrame scan : {scan / per_call * 1e6:9.2f} us/lookup")
+    print(f"Hash index     : {index / per_call * 1e6:9.2f} us/lookup")
+    print(f"Speed-up       : {scan / index:9.1f}x")
+    print(f"Index keys     : {len(factor_index)}")
+    for miss in factor_index.miss_report():
+        print(f"Miss           : {miss}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Benchmark: calculate_emissions_batch vs a Python loop over calculate_emissions.
+
+Agreement with the scalar function is covered by tests/test_emissions_batch.py.
+
+    python -m benchmarks.bench_emissions_batch [n_legs]
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from logic.emissions import calculate_emissions, calculate_emissions_batch
+from tests.fakes import UNMATCHED, random_legs
+
+
+def main(n=200000):
+    vehicles, fuels, regions, distances, loads = random_legs(n, seed=1)
+    keep = np.array([(v, f, r) not in UNMATCHED for v, f, r in zip(vehicles, fuels, regions)])
+    vehicles, fuels, regions, distances, loads = (a[keep] for a in (vehicles, fuels, regions, distances, loads))
+    n = len(distances)
+
+    start = time.perf_counter()
+    for i in range(n):
+        calculate_emissions(vehicles[i], fuels[i], distances[i], loads[i], regions[i])
+    scalar = time.perf_counter() - start
+
+    timings = {}
+    for dtype in (np.float64, np.float32):
+        start = time.perf_counter()
+        calculate_emissions_batch(vehicle_type=vehicles, fuel=fuels, distance_km=distances,
+                                  load_tons=loads, region=regions, dtype=dtype)
+        timings[np.dtype(dtype).name] = time.perf_counter() - start
+
+    print(f"Legs             : {n}")
+    print(f"Scalar loop      : {n / scalar:12.0f} legs/s")
+    for name, seconds in timings.items():
+        print(f"Batch ({name}) : {n / seconds:12.0f} legs/s  ({scalar / seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
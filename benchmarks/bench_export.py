@@ -0,0 +1,66 @@
+"""Benchmark: streaming trip report export, rows/s and peak memory by route size.
+
+Each size runs in a fresh process so its peak RSS is its own. The streamed
+export is compared with building the whole report as one DataFrame and
+serializing it through a StringIO, as the map view used to.
+
+    python -m benchmarks.bench_export [format] [max_vertices]
+"""
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+VEHICLE, FUEL, REGION = "Rigid truck (12t)", "diesel", "Europe & South America"
+
+
+def route(n):
+    rng = np.random.default_rng(0)
+    return np.column_stack([np.linspace(48, 52, n) + rng.normal(0, 1e-4, n), np.linspace(2, 13, n)])
+
+
+def run_one(mode, fmt, n):
+    from logic.export import export_report, trip_report_chunks
+    from logic.profile import emission_profile
+
+    import pandas as pd  # imported up front so it does not count towards the peak
+
+    coords = route(n)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "stream":
+        rows = export_report(trip_report_chunks(coords, VEHICLE, FUEL, 10.0, REGION, 900.0), os.devnull, fmt)
+    else:
+        frame = pd.DataFrame(emission_profile(coords, VEHICLE, FUEL, 10.0, REGION, 900.0))
+        for key in ("distance_km", "WTT", "TTW", "WTW"):
+            frame[f"segment_{key}"] = frame[key].diff().fillna(0.0)
+        frame["Vehicle"], frame["Fuel"], frame["Load (tons)"] = VEHICLE, FUEL, 10.0
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False)
+        rows = len(buffer.getvalue().encode("utf-8").splitlines()) - 1
+    elapsed = time.perf_counter() - start
+    growth_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024
+    print(f"{mode:9s} {fmt:8s} {rows:>10,} rows {rows / elapsed:>10,.0f} rows/s  peak RSS +{growth_mb:6.1f} MB")
+
+
+def main(fmt="csv", max_vertices=1_000_000):
+    max_vertices = int(max_vertices)
+    sizes = [n for n in (10_000, 100_000, 1_000_000, 10_000_000) if n <= max_vertices]
+    for mode in ("stream", "dataframe"):
+        if mode == "dataframe" and fmt != "csv":
+            continue
+        for n in sizes:
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--one", mode, fmt, str(n)], check=True)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--one"]:
+        run_one(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main(*sys.argv[1:])
@@ -0,0 +1,49 @@
+"""Benchmark: cold start of the emission factor lookup, artifact vs CSV.
+
+Each measurement runs in a fresh interpreter so import costs are included:
+import logic.emissions and resolve the first factor. The CSV path is the
+pre-artifact behaviour (import pandas, parse and normalize the CSV).
+
+    python -m benchmarks.bench_factor_startup [runs]
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+ARTIFACT = """
+import logic.emissions as e
+e.get_emission_factors("Van (<3.5t)", "Diesel", "Europe & South America")
+import sys
+assert "pandas" not in sys.modules
+"""
+
+CSV = """
+import logic.emissions as e
+e._factor_index = e.EmissionFactorIndex.from_dataframe(e.load_factor_frame())
+e.get_emission_factors("Van (<3.5t)", "Diesel", "Europe & South America")
+"""
+
+
+def cold_start(code, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(runs=5):
+    baseline = cold_start("pass", runs)
+    artifact = cold_start(ARTIFACT, runs) - baseline
+    csv = cold_start(CSV, runs) - baseline
+    print(f"Interpreter     : {baseline * 1000:8.1f} ms (subtracted below)")
+    print(f"CSV + pandas    : {csv * 1000:8.1f} ms")
+    print(f"Artifact (mmap) : {artifact * 1000:8.1f} ms  ({csv / artifact:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
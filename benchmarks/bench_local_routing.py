@@ -0,0 +1,47 @@
+"""Benchmark: LocalGraphBackend on a synthetic road grid.
+
+Builds a jittered grid graph (no OSM download needed), checks that A* and
+bidirectional Dijkstra agree on path length, then times shortest-path and
+alternative-route queries.
+
+    python -m benchmarks.bench_local_routing [grid_size]
+"""
+import sys
+import os
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from logic.local_routing import LocalGraphBackend
+from tests.fakes import synthetic_grid
+
+
+def main(size=150, queries=20, seed=1):
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path, lat, lon = synthetic_grid(tmp, size)
+        backends = {name: LocalGraphBackend(path, algorithm=name) for name in ("astar", "bidirectional")}
+        pairs = [tuple(rng.integers(0, size * size, 2)) for _ in range(queries)]
+        points = [([lat[a], lon[a]], [lat[b], lon[b]]) for a, b in pairs]
+
+        lengths = {}
+        for name, backend in backends.items():
+            start = time.perf_counter()
+            lengths[name] = [backend.directions(s, e)[0]["distance_km"] for s, e in points]
+            seconds = time.perf_counter() - start
+            print(f"{name:14s}: {seconds / queries * 1000:8.1f} ms/query")
+        assert np.allclose(lengths["astar"], lengths["bidirectional"], atol=0.02), lengths
+
+        backend = backends["astar"]
+        start = time.perf_counter()
+        found = [len(backend.directions(s, e, {"share_factor": 0.6, "target_count": 2})) for s, e in points]
+        seconds = time.perf_counter() - start
+        print(f"alternatives  : {seconds / queries * 1000:8.1f} ms/query, "
+              f"{np.mean(found) - 1:.2f} alternatives/query (graph {size}x{size})")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
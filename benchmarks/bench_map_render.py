@@ -0,0 +1,90 @@
+"""Benchmark: map payload size and build time, per-point objects vs binned layers.
+
+The legacy layout (one folium.Marker per sampled point plus a HeatMap over
+the same points) is compared with the map_layers one (hex cells as a single
+GeoJSON layer, heatmap over cell centres, clustered markers) for a long
+route and for a fleet of routes. Binning and GeoJSON size are measured
+without folium; the HTML comparison needs folium installed.
+
+    python -m benchmarks.bench_map_render
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.suite import random_walk
+from logic.map_layers import add_emission_cells, add_markers, bin_profiles, cells_geojson, heat_points, payload_size
+from logic.profile import emission_profile, sample_profile
+
+VEHICLE = ("Rigid truck (18t)", "Diesel", 10.0, "Europe & South America")
+
+
+def marker_rows(profile, step_km):
+    sampled = sample_profile(profile, step_km)
+    return [{"city": f"Point {k + 1}", "lat": float(lat), "lon": float(lon), "co2": round(float(co2), 2)}
+            for k, (lat, lon, co2) in enumerate(zip(sampled["lat"], sampled["lon"], sampled["WTW"]))]
+
+
+def scenarios():
+    route = emission_profile(random_walk(100_000), *VEHICLE)
+    yield "1 route, 100k vertices", [route], marker_rows(route, 1.0)
+    fleet = [emission_profile(random_walk(20_000, seed=s) + [s * 0.05, s * 0.08], *VEHICLE) for s in range(50)]
+    yield "50 routes, 1M vertices", fleet, [row for p in fleet for row in marker_rows(p, 5.0)]
+
+
+def legacy_map(rows):
+    import folium
+    from folium.plugins import HeatMap
+
+    m = folium.Map(location=[rows[0]["lat"], rows[0]["lon"]], zoom_start=7)
+    for city in rows:
+        folium.Marker(
+            location=[city["lat"], city["lon"]],
+            tooltip=f"{city['city']}<br>CO₂: {city['co2']} KG",
+            icon=folium.Icon(color="green" if city["co2"] < 300 else "red")
+        ).add_to(m)
+    HeatMap([[c["lat"], c["lon"], c["co2"]] for c in rows], min_opacity=0.3, radius=20).add_to(m)
+    return m
+
+
+def binned_map(profiles, rows):
+    import folium
+    from folium.plugins import HeatMap
+
+    bins = bin_profiles(profiles)
+    m = folium.Map(location=[rows[0]["lat"], rows[0]["lon"]], zoom_start=7)
+    add_emission_cells(m, cells_geojson(bins))
+    HeatMap(heat_points(bins), min_opacity=0.3, radius=20).add_to(m)
+    add_markers(m, rows)
+    return m
+
+
+def timed_html(build, *args):
+    start = time.perf_counter()
+    html = build(*args).get_root().render()
+    return time.perf_counter() - start, len(html.encode("utf-8"))
+
+
+def main():
+    for label, profiles, rows in scenarios():
+        start = time.perf_counter()
+        bins = bin_profiles(profiles)
+        geojson = cells_geojson(bins)
+        binning = time.perf_counter() - start
+        print(f"{label}: {len(rows)} markers -> {len(bins['value'])} {bins['cell_km']:g} km hex cells, "
+              f"binned in {binning * 1000:.0f} ms, cell layer {payload_size(geojson) / 1024:.0f} KiB")
+        try:
+            legacy_s, legacy_bytes = timed_html(legacy_map, rows)
+            binned_s, binned_bytes = timed_html(binned_map, profiles, rows)
+        except ImportError as exc:
+            print(f"  HTML comparison skipped ({exc})")
+            continue
+        print(f"  per-point markers + heatmap: {legacy_bytes / 1024:8.0f} KiB in {legacy_s:6.2f}s")
+        print(f"  cells + clustered markers:   {binned_bytes / 1024:8.0f} KiB in {binned_s:6.2f}s "
+              f"({legacy_bytes / binned_bytes:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: GLEC region lookup for route vertices, grid index vs brute-force polygon tests.
+
+Random points over the covered continents are checked against exact
+point-in-polygon tests, then lookup throughput and the cost of a
+region-aware emission profile on full-resolution routes are reported.
+
+    python -m benchmarks.bench_regions [n_points]
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from logic.profile import emission_profiles, regional_emission_profiles
+from logic.regions import RegionIndex, _points_in_ring
+
+# Berlin -> Moscow stays in one region; Los Angeles -> Bogota crosses from North America into South America
+ROUTES = {"Berlin-Moscow": ((52.52, 13.40), (55.75, 37.62)), "Los Angeles-Bogota": ((34.05, -118.24), (4.71, -74.07))}
+
+
+def brute_force(index, coords):
+    codes = np.zeros(len(coords), dtype=np.int16)
+    for code, ring in index.rings:
+        codes[_points_in_ring(coords[:, 1], coords[:, 0], ring)] = code
+    return codes
+
+
+def main(n_points=1_000_000):
+    start = time.perf_counter()
+    index = RegionIndex.from_geojson()
+    print(f"index built in {(time.perf_counter() - start) * 1000:.0f} ms, grid {index.shape[0]}x{index.shape[1]}, "
+          f"{(index.grid == -1).mean() * 100:.1f}% border cells")
+
+    rng = np.random.default_rng(0)
+    points = np.column_stack([rng.uniform(-56, 75, n_points), rng.uniform(-170, 135, n_points)])
+    start = time.perf_counter()
+    codes = index.codes(points)
+    fast = time.perf_counter() - start
+    sample = points[:100_000]
+    start = time.perf_counter()
+    exact = brute_force(index, sample)
+    slow = (time.perf_counter() - start) * n_points / len(sample)
+    assert np.array_equal(codes[:len(sample)], exact)
+    print(f"{n_points} points: grid {fast * 1000:.0f} ms vs brute force ~{slow * 1000:.0f} ms ({slow / fast:.0f}x)")
+
+    for name, (a, b) in ROUTES.items():
+        coords = np.column_stack([np.linspace(a[0], b[0], 100_000), np.linspace(a[1], b[1], 100_000)])
+        start = time.perf_counter()
+        regional = regional_emission_profiles(coords, "Rigid truck (12t)", ["diesel"], 10.0)["diesel"]
+        regional_s = time.perf_counter() - start
+        start = time.perf_counter()
+        emission_profiles(coords, "Rigid truck (12t)", ["diesel"], 10.0, "Europe & South America")
+        single_s = time.perf_counter() - start
+        regions = list(dict.fromkeys(regional["region"]))
+        print(f"{name}, 100k vertices: regional profile {regional_s * 1000:.0f} ms "
+              f"(single region {single_s * 1000:.0f} ms), regions {regions}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
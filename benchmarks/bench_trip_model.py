@@ -0,0 +1,56 @@
+"""Benchmark: recomputing a trip after a parameter change, TripModel vs a full rebuild.
+
+A full-resolution route crossing from North America into South America is
+costed once, then after a load change, a fuel change, a vehicle change and a
+switch to a fixed region. Each is compared with rebuilding the profile from
+the polyline as the map view used to.
+
+    python -m benchmarks.bench_trip_model [n_vertices]
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from logic.emissions import get_factor_index
+from logic.profile import emission_profile, regional_emission_profiles
+from logic.regions import get_region_index
+from logic.trip_model import TripModel
+
+STEPS = [
+    ("first trip", "Rigid truck (12t)", "diesel", 10.0, None),
+    ("load 10 -> 25 t", "Rigid truck (12t)", "diesel", 25.0, None),
+    ("fuel diesel -> cng", "Rigid truck (12t)", "cng", 25.0, None),
+    ("vehicle -> 18t", "Rigid truck (18t)", "cng", 25.0, None),
+    ("fixed region", "Rigid truck (18t)", "cng", 25.0, "Europe & South America"),
+]
+
+
+def rebuild(coords, vehicle_type, fuel, load_tons, region, total_km):
+    if region is None:
+        return regional_emission_profiles(coords, vehicle_type, [fuel], load_tons, total_km=total_km)[fuel]
+    return emission_profile(coords, vehicle_type, fuel, load_tons, region, total_km)
+
+
+def main(n_vertices=200_000):
+    coords = np.column_stack([np.linspace(34.05, 4.71, n_vertices), np.linspace(-118.24, -74.07, n_vertices)])
+    get_factor_index(), get_region_index()  # one-off loads, outside both timings
+    model = TripModel()
+    for label, vehicle_type, fuel, load_tons, region in STEPS:
+        start = time.perf_counter()
+        profile = model.profile("route", coords, vehicle_type, fuel, load_tons, region, total_km=6000.0)
+        incremental = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = rebuild(coords, vehicle_type, fuel, load_tons, region, 6000.0)
+        full = time.perf_counter() - start
+        assert np.allclose(profile["WTW"], expected["WTW"], rtol=1e-9, atol=1e-6)
+        recomputed = [row["stage"] for row in model.report() if row["status"] == "recomputed"]
+        print(f"{label:20s} model {incremental * 1000:7.1f} ms  rebuild {full * 1000:7.1f} ms  "
+              f"recomputed: {', '.join(recomputed)}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
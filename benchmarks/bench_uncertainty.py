@@ -0,0 +1,63 @@
+"""Benchmark: Monte Carlo emission bands for many trips.
+
+Trips are drawn over every row of the factor table; bands are computed at
+increasing sample counts, checked for reproducibility (same seed, different
+chunking) and against a direct per-trip simulation on a few trips.
+
+    python -m benchmarks.bench_uncertainty [n_trips]
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from logic.emissions import calculate_emissions_batch, get_factor_index
+from logic.uncertainty import UncertaintyModel, emission_bands
+
+
+def random_trips(n, seed=0):
+    rng = np.random.default_rng(seed)
+    keys = get_factor_index().row_keys
+    pick = rng.integers(0, len(keys), n)
+    return {"region": [keys[i][0] for i in pick], "vehicle_type": [keys[i][1] for i in pick],
+            "fuel": [keys[i][2] for i in pick], "distance_km": rng.uniform(5, 900, n), "load_tons": rng.uniform(1, 30, n)}
+
+
+def direct(wtt_kg, ttw_kg, wtw_kg, n_samples, model, rng):
+    # Straightforward simulation of one trip, every term drawn separately
+    def lognormal(sigma):
+        return np.exp(sigma * rng.standard_normal(n_samples) - sigma * sigma / 2)
+
+    shared = lognormal(model.load_factor) * lognormal(model.distance)
+    wtt, ttw = lognormal(model.wtt), lognormal(model.ttw)
+    share = wtt_kg / (wtt_kg + ttw_kg)
+    return np.percentile(wtw_kg * shared * (share * wtt + (1 - share) * ttw), [5, 50, 95])
+
+
+def main(n_trips=5_000):
+    trips = random_trips(n_trips)
+    for n_samples in (10_000, 100_000, 1_000_000):
+        start = time.perf_counter()
+        bands = emission_bands(**trips, n_samples=n_samples)
+        elapsed = time.perf_counter() - start
+        priced = int((~np.isnan(bands["WTW_p50"])).sum())
+        print(f"{n_trips} trips x {n_samples:>9,} samples: {elapsed:6.2f} s ({priced} with factors)")
+
+    again = emission_bands(**trips, max_chunk_values=25_000)
+    assert all(np.array_equal(again[key], value, equal_nan=True) for key, value in emission_bands(**trips).items())
+    print("same seed, different chunking: identical bands")
+
+    point = calculate_emissions_batch(errors="nan", **trips)
+    bands = emission_bands(**trips, n_samples=200_000)
+    rng, model = np.random.default_rng(1), UncertaintyModel()
+    for t in np.flatnonzero(~np.isnan(point["WTW"]))[:3]:
+        expected = direct(*(float(point[key][t]) for key in ("WTT", "TTW", "WTW")), 200_000, model, rng)
+        got = [bands[f"WTW_p{q}"][t] for q in (5, 50, 95)]
+        print(f"trip {t}: WTW point {point['WTW'][t]:.1f} kg, bands {np.round(got, 1)}, direct {np.round(expected, 1)}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,181 @@
+"""Load test for the HTTP service: p50/p99 latency and requests per second.
+
+By default the ASGI app is driven in-process (no server or network needed),
+once with micro-batching and once with it disabled (max_batch=1), plus a
+/route run against the local FakeRoutingServer. With --url the same
+closed-loop clients hit a running deployment instead, e.g.
+
+    uvicorn logic.service:app --workers 4 &
+    python -m benchmarks.load_service --url http://127.0.0.1:8000 --concurrency 64
+
+    python -m benchmarks.load_service [--concurrency N] [--duration S] [--endpoint emissions|batch|route]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ORS_API_KEY", "benchmark")
+
+import numpy as np
+
+from logic.geocache import GeocodeCache
+from logic.route_cache import RouteCache
+from logic.service import MicroBatcher, Service, create_app
+from tests.fakes import FakeRoutingServer
+
+TRIPS = [
+    ("Van (<3.5t)", "Diesel", "Europe & South America"),
+    ("Rigid truck (12t)", "Diesel", "Europe & South America"),
+    ("Rigid truck (18t)", "CNG", "Europe & South America"),
+    ("Articulated truck (40t)", "Diesel", "China"),
+    ("Flatbed Truck", "Unknown", "North America"),
+]
+
+
+def random_trip(rng):
+    vehicle_type, fuel, region = rng.choice(TRIPS)
+    return {"vehicle_type": vehicle_type, "fuel": fuel, "region": region,
+            "distance_km": round(rng.uniform(5, 900), 1), "load_tons": round(rng.uniform(1, 30), 1)}
+
+
+def request_for(endpoint, rng):
+    if endpoint == "emissions":
+        return "/emissions", random_trip(rng)
+    if endpoint == "batch":
+        return "/emissions/batch", {"trips": [random_trip(rng) for _ in range(100)]}
+    return "/route", {"start": f"Depot {rng.randrange(40)}", "end": f"Depot {rng.randrange(40, 80)}"}
+
+
+class InProcessClient:
+    """Calls the ASGI app directly with in-memory receive/send channels."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def post(self, path, payload):
+        body = json.dumps(payload).encode("utf-8")
+        delivered = False
+        response = {}
+
+        async def receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            else:
+                response["body"] = message.get("body", b"")
+
+        await self.app({"type": "http", "method": "POST", "path": path, "headers": []}, receive, send)
+        return response["status"]
+
+    async def close(self):
+        await self.app.service.shutdown()
+
+
+class HTTPClient:
+    def __init__(self, url, concurrency):
+        import aiohttp
+
+        self.url = url.rstrip("/")
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency))
+
+    async def post(self, path, payload):
+        async with self.session.post(self.url + path, json=payload) as response:
+            await response.read()
+            return response.status
+
+    async def close(self):
+        await self.session.close()
+
+
+async def run_load(client, endpoint, concurrency, duration, seed=0):
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def user(k):
+        rng = random.Random(seed * 1000 + k)
+        while time.perf_counter() < deadline:
+            path, payload = request_for(endpoint, rng)
+            start = time.perf_counter()
+            status = await client.post(path, payload)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            await asyncio.sleep(0)  # let the other users in even when a request never had to wait
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(k) for k in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        "statuses": statuses,
+    }
+
+
+def report(label, result, extra=""):
+    print(f"{label:38s} {result['requests']:7d} req {result['rps']:9.0f} req/s "
+          f"p50 {result['p50_ms']:7.2f} ms p99 {result['p99_ms']:7.2f} ms {result['statuses']} {extra}")
+
+
+async def in_process(args):
+    endpoints = [args.endpoint] if args.endpoint else ["emissions", "batch"]
+    for endpoint in endpoints:
+        if endpoint == "route":
+            continue
+        for label, batcher in (("micro-batching", MicroBatcher()), ("no batching", MicroBatcher(max_batch=1))):
+            app = create_app(Service(batcher=batcher))
+            await app.service.startup()
+            client = InProcessClient(app)
+            result = await run_load(client, endpoint, args.concurrency, args.duration)
+            await client.close()
+            extra = f"mean batch {batcher.report()['mean_batch']}" if endpoint == "emissions" else ""
+            report(f"/{endpoint.replace('batch', 'emissions/batch')} ({label})", result, extra)
+
+    if args.endpoint in (None, "route"):
+        with FakeRoutingServer(latency=args.route_latency) as server:
+            options = {"api_key": "benchmark", "ors_base_url": server.url, "nominatim_url": server.url,
+                       "max_geocode_concurrency": 16, "geocoder": GeocodeCache(backend=None), "route_cache": RouteCache()}
+            app = create_app(Service(routing_options=options))
+            await app.service.startup()
+            client = InProcessClient(app)
+            result = await run_load(client, "route", args.concurrency, args.duration)
+            await client.close()
+            report(f"/route (fake ORS, {args.route_latency * 1000:.0f} ms latency)", result,
+                   f"upstream requests {server.requests}")
+
+
+async def remote(args):
+    client = HTTPClient(args.url, args.concurrency)
+    try:
+        for endpoint in [args.endpoint] if args.endpoint else ["emissions", "batch", "route"]:
+            report(f"{args.url} /{endpoint}", await run_load(client, endpoint, args.concurrency, args.duration))
+    finally:
+        await client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="load a running service instead of the in-process app")
+    parser.add_argument("--endpoint", choices=["emissions", "batch", "route"])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--route-latency", type=float, default=0.02, help="fake ORS latency in seconds")
+    args = parser.parse_args(argv)
+    asyncio.run(remote(args) if args.url else in_process(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Regression benchmark suite: emissions, geometry, OCR parsing, routing and rendering.
+
+Every case builds deterministic synthetic inputs (fixed seeds) in its setup
+and times one callable, asv-style: the loop count is calibrated to at least
+min_time seconds, repeated, and the best and median per-call times are kept.
+ORS, Nominatim and Gemini are replaced by in-process fakes, so runs need no
+network or API keys. Cases whose optional dependency is missing (folium)
+are reported as skipped.
+
+    python -m benchmarks.suite                    # run all, save results/latest.json
+    python -m benchmarks.suite -k profile         # only cases whose name contains "profile"
+    python -m benchmarks.suite --save-as baseline # save results/baseline.json
+    python -m benchmarks.suite --compare benchmarks/results/baseline.json
+
+--compare exits with status 1 when a case got slower than --threshold
+(default 1.25x) relative to the stored result.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+# Keep the route cache and fake ORS key away from the user's real setup
+_TMP = tempfile.mkdtemp(prefix="greenroute-bench-")
+os.environ["GREENROUTE_CACHE_DIR"] = _TMP
+os.environ.setdefault("ORS_API_KEY", "benchmark-fake-key")
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+OCR_JSON = os.path.join(ROOT, "data", "glec_raw_output.json")
+
+CASES = {}
+
+
+class Skip(Exception):
+    pass
+
+
+def case(name):
+    # Registers setup(); it returns the zero-argument callable to time
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def random_walk(n_vertices, seed=0):
+    # Road-like polyline: ~50 m steps with a slowly drifting heading
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.15, n_vertices))
+    step = 0.00045
+    lat = 48.0 + np.cumsum(np.cos(heading) * step)
+    lon = 11.0 + np.cumsum(np.sin(heading) * step * 1.5)
+    return np.column_stack([lat, lon])
+
+
+QUERIES = [
+    ("Van (<3.5t)", "Diesel", "Europe & South America"),
+    ("Rigid truck (12t)", "Diesel", "Europe & South America"),
+    ("Rigid truck (18t)", "CNG", "Europe & South America"),
+    ("Articulated truck (40t)", "Diesel", "China"),
+    ("Flatbed Truck", "Unknown", "North America"),
+]
+
+
+@case("emissions.lookup_scalar")
+def _lookup_scalar():
+    from logic.emissions import get_emission_factors
+
+    return lambda: [get_emission_factors(*q) for q in QUERIES]
+
+
+@case("emissions.calculate_scalar_1k")
+def _calculate_scalar():
+    from logic.emissions import calculate_emissions
+
+    rng = np.random.default_rng(0)
+    trips = [(*QUERIES[i % len(QUERIES)], float(d), float(l))
+             for i, (d, l) in enumerate(zip(rng.uniform(1, 900, 1000), rng.uniform(1, 30, 1000)))]
+    return lambda: [calculate_emissions(v, f, d, l, r) for v, f, r, d, l in trips]
+
+
+@case("emissions.calculate_batch_100k")
+def _calculate_batch():
+    from logic.emissions import calculate_emissions_batch
+
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, len(QUERIES), 100_000)
+    vehicles, fuels, regions = (np.array([QUERIES[i][k] for i in picks], dtype=object) for k in range(3))
+    distances = rng.uniform(1, 900, len(picks))
+    loads = rng.uniform(1, 30, len(picks))
+    return lambda: calculate_emissions_batch(vehicle_type=vehicles, fuel=fuels, distance_km=distances,
+                                             load_tons=loads, region=regions)
+
+
+def _profile_case(n_vertices):
+    def setup():
+        from logic.profile import emission_profile, sample_profile
+
+        coords = random_walk(n_vertices)
+        vehicle, fuel, region = QUERIES[1]
+        return lambda: sample_profile(emission_profile(coords, vehicle, fuel, 10.0, region), 25.0)
+    return setup
+
+
+for _n in (1_000, 10_000, 100_000):
+    case(f"profile.emission_profile_{_n // 1000}k")(_profile_case(_n))
+
+
+@case("geometry.simplify_rdp_100k")
+def _simplify():
+    from logic.geometry import simplify
+
+    coords = random_walk(100_000)
+    return lambda: simplify(coords, 25.0)
+
+
+@case("geometry.encode_polyline_100k")
+def _encode():
+    from logic.geometry import encode_polyline
+
+    coords = random_walk(100_000)
+    return lambda: encode_polyline(coords)
+
+
+@case("parse.ocr_stream_to_csv")
+def _parse_stream():
+    from logic.parse_ocr_output import stream_emission_table
+
+    out = os.path.join(_TMP, "parsed.csv")
+    silent = open(os.devnull, "w")
+
+    def run():
+        stdout, sys.stdout = sys.stdout, silent
+        try:
+            stream_emission_table(OCR_JSON, out)
+        finally:
+            sys.stdout = stdout
+    return run
+
+
+@case("parse.ocr_legacy_flatten")
+def _parse_legacy():
+    from logic.parse_ocr_output import extract_table_lines, load_ocr_json, parse_emission_table
+
+    return lambda: parse_emission_table(extract_table_lines(load_ocr_json(OCR_JSON)))
+
+
+@case("routing.optimized_route_cold")
+def _routing_cold():
+    from tests.fakes import FakeGeocoder, FakeRoutingBackend
+    from logic import routing
+
+    routing.set_geocoder_backend(FakeGeocoder())
+    routing.set_routing_backend(FakeRoutingBackend(n_points=2000))
+
+    def run():
+        routing.route_cache.clear()
+        return routing.get_optimized_route("Hamburg", "Munich")
+    return run
+
+
+@case("routing.optimized_route_cached")
+def _routing_cached():
+    from tests.fakes import FakeGeocoder, FakeRoutingBackend
+    from logic import routing
+
+    routing.set_geocoder_backend(FakeGeocoder())
+    routing.set_routing_backend(FakeRoutingBackend(n_points=2000))
+    routing.get_optimized_route("Hamburg", "Munich")
+    return lambda: routing.get_optimized_route("Hamburg", "Munich")
+
+
+def _plot_map_case(n_markers):
+    def setup():
+        try:
+            from logic.map_utils import plot_map
+        except ImportError as exc:
+            raise Skip(str(exc))
+
+        coords = random_walk(20_000)
+        picks = np.linspace(0, len(coords) - 1, n_markers).astype(int)
+        city_data = [{"city": f"Point {i + 1}", "lat": float(coords[k, 0]), "lon": float(coords[k, 1]),
+                      "co2": float(i * 7 % 600)} for i, k in enumerate(picks)]
+        from logic.profile import emission_profile
+
+        profile = emission_profile(coords, *QUERIES[1][:2], 10.0, QUERIES[1][2])
+        return lambda: plot_map(city_data, route_coords=coords, profiles=[profile]).get_root().render()
+    return setup
+
+
+for _n in (50, 500):
+    case(f"map.plot_map_{_n}_markers")(_plot_map_case(_n))
+
+
+@case("gemini.ask_cached")
+def _gemini():
+    from logic import gemini_explainer
+
+    gemini_explainer.set_explainer_backend(gemini_explainer.FakeGeminiBackend())
+    return lambda: gemini_explainer.ask_gemini("How can I cut emissions?", "Vehicle: Van, Fuel: Diesel")
+
+
+def measure(func, min_time=0.2, repeat=5):
+    func()  # warm-up: imports, caches, lazy loads
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {"best_s": min(timings), "median_s": statistics.median(timings), "number": number, "repeat": repeat}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(pattern=None, min_time=0.2, repeat=5):
+    results = {}
+    for name, setup in CASES.items():
+        if pattern and pattern not in name:
+            continue
+        try:
+            func = setup()
+        except Skip as exc:
+            results[name] = {"skipped": str(exc)}
+            print(f"{name:36s} skipped ({exc})")
+            continue
+        results[name] = measure(func, min_time, repeat)
+        r = results[name]
+        print(f"{name:36s} {r['best_s'] * 1000:10.3f} ms best {r['median_s'] * 1000:10.3f} ms median")
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor(), "numpy": np.__version__},
+        "results": results,
+    }
+
+
+def compare(current, previous, threshold=1.25):
+    # Returns the names of cases that got slower than threshold x the stored best time
+    regressions = []
+    print(f"\nvs {previous.get('commit')} ({previous.get('timestamp')}):")
+    for name, now in current["results"].items():
+        before = previous["results"].get(name)
+        if not before or "best_s" not in before or "best_s" not in now:
+            continue
+        ratio = now["best_s"] / before["best_s"]
+        flag = "REGRESSION" if ratio > threshold else ("faster" if ratio < 1 / threshold else "")
+        print(f"{name:36s} {ratio:6.2f}x {flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save-as", default="latest", help="results file name under benchmarks/results")
+    parser.add_argument("--compare", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.pattern, args.min_time, args.repeat)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{args.save_as}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"Saved results to: {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        if compare(current, previous, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
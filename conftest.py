@@ -0,0 +1,19 @@
+# Lets tests import logic/ and tests/fakes.py from the repository root
+import os
+import tempfile
+
+import pytest
+
+# logic.routing needs a key at import time and the caches write to disk; keep both away from real settings
+os.environ.setdefault("ORS_API_KEY", "test")
+os.environ.setdefault("GREENROUTE_CACHE_DIR", tempfile.mkdtemp(prefix="greenroute_test_cache_"))
+
+
+@pytest.fixture
+def restore_routing():
+    # For tests that swap the module-level routing backend, geocoder or route cache
+    from logic import routing
+
+    saved = routing.routing_backend, routing.geocoder, routing.route_cache
+    yield
+    routing.routing_backend, routing.geocoder, routing.route_cache = saved
@@ -0,0 +1,199 @@
+import asyncio
+import random
+
+import aiohttp
+
+from logic import routing
+from logic.backends import GeocodingError, RoutingError
+from logic.route_cache import route_key
+
+ORS_BASE_URL = "https://api.openrouteservice.org"
+NOMINATIM_URL = "https://nominatim.openstreetmap.org"
+
+
+class RoutingApiError(RoutingError):
+    """Non-retryable error returned by ORS (the async counterpart of ApiError).
+
+    status is None when no response arrived (connection error or timeout).
+    """
+
+    def __init__(self, status, message):
+        super().__init__(f"ORS request failed ({status or 'no response'}): {message}")
+        self.status = status
+
+
+class GeocodingApiError(GeocodingError):
+    """Error response from Nominatim, or no response at all (status None)."""
+
+    def __init__(self, status, message):
+        super().__init__(f"Nominatim request failed ({status or 'no response'}): {message}")
+        self.status = status
+
+
+class AsyncRoutingClient:
+    """Non-blocking version of routing.get_optimized_route for many trips at once.
+
+    One pooled aiohttp session is shared by all requests. Separate semaphores
+    bound concurrent ORS and Nominatim calls, 429/503 responses are retried
+    with backoff (honouring Retry-After), and identical requests that are
+    already in flight are awaited rather than sent twice. Results go through
+    the same geocode and route caches as the blocking path.
+
+        async with AsyncRoutingClient() as client:
+            results = await client.get_optimized_routes([("Berlin", "Munich"), ...])
+    """
+
+    def __init__(self, api_key=None, ors_base_url=ORS_BASE_URL, nominatim_url=NOMINATIM_URL,
+                 max_concurrency=16, max_geocode_concurrency=1, max_retries=5, backoff_base=0.5,
+                 timeout=30, geocoder=None, route_cache=None, user_agent="greenroute_app"):
+        self.api_key = api_key or routing.ORS_API_KEY
+        self.ors_base_url = ors_base_url.rstrip("/")
+        self.nominatim_url = nominatim_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.geocoder = geocoder if geocoder is not None else routing.geocoder
+        self.route_cache = route_cache if route_cache is not None else routing.route_cache
+        self.user_agent = user_agent
+        self._ors_slots = asyncio.Semaphore(max_concurrency)
+        # Nominatim's usage policy allows a single connection per client
+        self._geocode_slots = asyncio.Semaphore(max_geocode_concurrency)
+        self._in_flight = {}
+        self._session = None
+        self.retries = 0
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, headers={"User-Agent": self.user_agent}
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _dedupe(self, key, factory):
+        # Identical requests share one task; it is forgotten once it finishes
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _request(self, slots, error, method, url, **kwargs):
+        # error (RoutingApiError or GeocodingApiError) names the service in every failure
+        for attempt in range(self.max_retries + 1):
+            async with slots:
+                try:
+                    async with self._session.request(method, url, **kwargs) as response:
+                        if response.status not in (429, 503):
+                            if response.status >= 400:
+                                raise error(response.status, await response.text())
+                            return await response.json(content_type=None)
+                        retry_after = response.headers.get("Retry-After")
+                except asyncio.TimeoutError:
+                    raise error(None, f"timed out after {self.timeout.total:g}s") from None
+                except aiohttp.ClientError as e:
+                    raise error(None, str(e) or type(e).__name__) from e
+
+            if attempt == self.max_retries:
+                raise error(response.status, "rate limit retries exhausted")
+            self.retries += 1
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = self.backoff_base * 2 ** attempt * (1 + random.random())
+            await asyncio.sleep(delay)
+
+    async def get_coordinates(self, city_name):
+        coords = self.geocoder.cached(city_name)
+        if coords is not None:
+            return coords
+
+        async def geocode():
+            results = await self._request(
+                self._geocode_slots, GeocodingApiError, "GET", f"{self.nominatim_url}/search",
+                params={"q": city_name, "format": "json", "limit": 1},
+            )
+            if not results:
+                raise GeocodingError(f"Location not found for: {city_name}")
+            found = [float(results[0]["lat"]), float(results[0]["lon"])]
+            self.geocoder.remember(city_name, found)
+            return found
+
+        return list(await self._dedupe(("geocode", city_name.lower().strip()), geocode))
+
+    async def _fetch_routes(self, start_coords, end_coords, alternative_routes=None):
+        key = route_key(start_coords, end_coords, routing.ROUTE_PROFILE, alternative_routes)
+        routes = self.route_cache.get(key)
+        if routes is not None:
+            return routes
+
+        async def directions():
+            body = {"coordinates": [start_coords[::-1], end_coords[::-1]]}  # ORS needs [lon, lat]
+            if alternative_routes:
+                body["alternative_routes"] = alternative_routes
+            result = await self._request(
+                self._ors_slots, RoutingApiError, "POST",
+                f"{self.ors_base_url}/v2/directions/{routing.ROUTE_PROFILE}/geojson",
+                json=body, headers={"Authorization": self.api_key},
+            )
+            fetched = [routing.extract_route_info(feature) for feature in result["features"]]
+            self.route_cache.put(key, fetched)
+            if alternative_routes and fetched:
+                self.route_cache.put(route_key(start_coords, end_coords, routing.ROUTE_PROFILE), fetched[:1])
+            return fetched
+
+        return await self._dedupe(("route", key), directions)
+
+    async def get_optimized_route(self, start_city, end_city):
+        # Same request sequence and result shape as routing.get_optimized_route
+        start_coords, end_coords = await asyncio.gather(
+            self.get_coordinates(start_city), self.get_coordinates(end_city)
+        )
+
+        alt_routes = None
+        alt_requested = False
+        alt_failed = False
+        if routing.great_circle_km(start_coords, end_coords) >= routing.OPTIMIZE_MIN_DISTANCE_KM:
+            alt_requested = True
+            try:
+                alt_routes = await self._fetch_routes(start_coords, end_coords, routing.ALTERNATIVE_ROUTES)
+            except RoutingApiError:
+                alt_failed = True
+
+        if alt_routes:
+            baseline_route = alt_routes[0]
+        else:
+            baseline_route = (await self._fetch_routes(start_coords, end_coords))[0]
+
+        if baseline_route["distance_km"] >= routing.OPTIMIZE_MIN_DISTANCE_KM and not alt_requested:
+            try:
+                alt_routes = await self._fetch_routes(start_coords, end_coords, routing.ALTERNATIVE_ROUTES)
+            except RoutingApiError:
+                alt_failed = True
+
+        return routing.build_route_result(start_coords, end_coords, baseline_route, alt_routes, alt_failed)
+
+    async def get_optimized_routes(self, pairs, return_exceptions=False):
+        await self.open()
+        return await asyncio.gather(
+            *(self.get_optimized_route(start, end) for start, end in pairs),
+            return_exceptions=return_exceptions,
+        )
+
+
+async def get_optimized_routes(pairs, return_exceptions=False, **client_options):
+    async with AsyncRoutingClient(**client_options) as client:
+        return await client.get_optimized_routes(pairs, return_exceptions=return_exceptions)
@@ -0,0 +1,96 @@
+import numpy as np
+import openrouteservice
+
+# ORS caps a matrix request at a few thousand cells; large matrices are requested in blocks
+ORS_MATRIX_BLOCK = 50
+
+
+def extract_route_info(route):
+    route_coords = [[lat, lon] for lon, lat in route["geometry"]["coordinates"]]
+    distance_km = round(route["properties"]["segments"][0]["distance"] / 1000, 2)
+    return {"coordinates": route_coords, "distance_km": distance_km}
+
+
+class RoutingError(Exception):
+    """A routing backend could not answer a request."""
+
+
+class GeocodingError(Exception):
+    """A place name could not be resolved to coordinates."""
+
+
+class RoutingBackend:
+    """Interface behind routing.get_optimized_route.
+
+    directions() takes [lat, lon] start/end points and returns a list of
+    {"coordinates": [[lat, lon], ...], "distance_km": float} routes, the
+    recommended route first. alternative_routes follows the ORS option of the
+    same name ({"share_factor", "target_count"}); when it is given, up to
+    target_count further routes may follow the first one.
+    """
+
+    # Part of the route cache key, so backends never answer from each other's entries
+    profile = None
+
+    def directions(self, start, end, alternative_routes=None):
+        raise NotImplementedError
+
+    def matrix(self, locations):
+        """Road distances in km between every pair of [lat, lon] locations.
+
+        Returns an (n, n) float64 array, row = origin, column = destination,
+        NaN where no route exists. The default issues one directions() call
+        per pair; backends with a native matrix endpoint override it.
+        """
+        n = len(locations)
+        distances = np.zeros((n, n))
+        for i in range(n):
+            for j in range(n):
+                if i != j:
+                    try:
+                        distances[i, j] = self.directions(locations[i], locations[j])[0]["distance_km"]
+                    except RoutingError:
+                        distances[i, j] = np.nan
+        return distances
+
+
+class ORSBackend(RoutingBackend):
+    def __init__(self, client=None, api_key=None, profile="driving-car"):
+        self.client = client if client is not None else openrouteservice.Client(key=api_key)
+        self.profile = profile
+
+    def directions(self, start, end, alternative_routes=None):
+        options = {"alternative_routes": alternative_routes} if alternative_routes else {}
+        try:
+            result = self.client.directions(
+                coordinates=[start[::-1], end[::-1]],  # ORS needs [lon, lat]
+                profile=self.profile,
+                format='geojson',
+                **options
+            )
+        except openrouteservice.exceptions.ApiError as e:
+            raise RoutingError(str(e)) from e
+        return [extract_route_info(feature) for feature in result["features"]]
+
+    def matrix(self, locations):
+        lonlat = [[lon, lat] for lat, lon in locations]
+        n = len(lonlat)
+        distances = np.zeros((n, n))
+        for a in range(0, n, ORS_MATRIX_BLOCK):
+            for b in range(0, n, ORS_MATRIX_BLOCK):
+                sources = list(range(a, min(a + ORS_MATRIX_BLOCK, n)))
+                destinations = list(range(b, min(b + ORS_MATRIX_BLOCK, n)))
+                try:
+                    result = self.client.distance_matrix(
+                        locations=lonlat,
+                        profile=self.profile,
+                        sources=sources,
+                        destinations=destinations,
+                        metrics=["distance"],
+                        units="km",
+                    )
+                except openrouteservice.exceptions.ApiError as e:
+                    raise RoutingError(str(e)) from e
+                block = np.array(result["distances"], dtype=np.float64)  # None (unroutable) -> NaN
+                distances[a:a + len(sources), b:b + len(destinations)] = block
+        return distances
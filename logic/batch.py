@@ -0,0 +1,211 @@
+import math
+import os
+import time
+from collections import deque
+from multiprocessing import get_context
+
+import numpy as np
+
+from logic.backends import GeocodingError, RoutingError
+from logic.emissions import calculate_emissions_batch
+
+TRIP_COLUMNS = ("vehicle_type", "fuel", "load_tons", "region")
+
+
+def iter_trip_chunks(path, chunk_rows=50_000):
+    """Yield DataFrames of at most chunk_rows trips from a CSV or Parquet file.
+
+    Each trip needs vehicle_type, fuel, load_tons and region, plus either
+    distance_km or origin and destination place names to route between.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def _place(value):
+    # A usable place name, or None for NaN/blank cells
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return str(value).strip() or None
+
+
+def _unrouted(chunk):
+    # The chunk's distances and the rows without one that origin/destination can fill
+    if "distance_km" in chunk:
+        distance = chunk["distance_km"].to_numpy(dtype=np.float64, copy=True)
+    else:
+        distance = np.full(len(chunk), np.nan)
+    routable = {"origin", "destination"} <= set(chunk.columns)
+    return distance, np.flatnonzero(np.isnan(distance)) if routable else np.empty(0, dtype=np.intp)
+
+
+def geocode_places(chunk):
+    """Coordinates of each distinct place the chunk still has to route, None if unknown.
+
+    run_batch calls this in the parent process, so the geocoder (and its
+    1 request/s Nominatim policy and SQLite cache) is only ever used from
+    one process; workers get the result through process_chunk.
+    """
+    _, todo = _unrouted(chunk)
+    if not len(todo):
+        return {}
+    places = set()
+    for column in ("origin", "destination"):
+        places.update(p for p in map(_place, chunk[column].to_numpy(dtype=object)[todo]) if p is not None)
+    if not places:
+        return {}
+    # Imported here so distance-only files never need an ORS key or geocoder
+    from logic import routing
+
+    coordinates = {}
+    for place in sorted(places):
+        try:
+            coordinates[place] = routing.get_coordinates(place)
+        except GeocodingError:
+            coordinates[place] = None
+    return coordinates
+
+
+def resolve_distances(chunk, coordinates=None):
+    # Routes each distinct origin/destination pair with no distance_km once;
+    # blank places and ones that cannot be geocoded or routed get NaN and a
+    # "no_route" status. Anything else (no ORS key, network or programming
+    # errors) stops the run. coordinates comes from geocode_places.
+    distance, todo = _unrouted(chunk)
+    status = np.full(len(chunk), "ok", dtype=object)
+
+    if len(todo):
+        if coordinates is None:
+            coordinates = geocode_places(chunk)
+        from logic import routing
+
+        routed = {}
+        origins = chunk["origin"].to_numpy(dtype=object)
+        destinations = chunk["destination"].to_numpy(dtype=object)
+        for i in todo:
+            pair = (_place(origins[i]), _place(destinations[i]))
+            if pair not in routed:
+                start, end = coordinates.get(pair[0]), coordinates.get(pair[1])
+                if start is None or end is None:
+                    routed[pair] = math.nan
+                else:
+                    try:
+                        routed[pair] = routing.get_route(start, end)["distance_km"]
+                    except RoutingError:
+                        routed[pair] = math.nan
+            distance[i] = routed[pair]
+    status[np.isnan(distance)] = "no_route"
+    return distance, status
+
+
+def process_chunk(chunk, coordinates=None):
+    missing = [c for c in TRIP_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Trip file is missing columns: {', '.join(missing)}")
+    distance, status = resolve_distances(chunk, coordinates)
+    result = calculate_emissions_batch(
+        vehicle_type=chunk["vehicle_type"].to_numpy(dtype=object),
+        fuel=chunk["fuel"].to_numpy(dtype=object),
+        distance_km=distance,
+        load_tons=chunk["load_tons"].to_numpy(dtype=np.float64),
+        region=chunk["region"].to_numpy(dtype=object),
+        errors="nan",
+    )
+    status[(status == "ok") & np.isnan(result["WTW"])] = "no_factors"
+
+    out = chunk.copy()
+    out["distance_km"] = distance
+    out["wtt_kg"] = result["WTT"]
+    out["ttw_kg"] = result["TTW"]
+    out["wtw_kg"] = result["WTW"]
+    out["status"] = status
+    return out
+
+
+class _CsvSink:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._header = True
+
+    def write(self, frame):
+        frame.to_csv(self._file, index=False, header=self._header)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa, self._pq = pa, pq
+        self.path = path
+        self._writer = None
+
+    def write(self, frame):
+        table = self._pa.Table.from_pandas(frame, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run_batch(input_path, output_path, chunk_rows=50_000, workers=None, max_pending=None, progress=print):
+    """Stream a trip file through process_chunk into output_path.
+
+    Chunks are spread over a spawn process pool (workers=0 runs in this
+    process), with their places geocoded here first, and written in input order as soon as they finish. At most
+    max_pending chunks (default 2 per worker) are in flight, so memory is
+    bounded by a few chunks regardless of file size. Output is Parquet when
+    output_path ends in .parquet, otherwise CSV. Returns a summary dict.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    max_pending = max_pending or 2 * max(workers, 1)
+    sink = _ParquetSink(output_path) if output_path.endswith(".parquet") else _CsvSink(output_path)
+    stats = {"rows": 0, "ok": 0, "no_route": 0, "no_factors": 0, "chunks": 0}
+    start = time.perf_counter()
+
+    def write(frame):
+        sink.write(frame)
+        counts = frame["status"].value_counts()
+        for key in ("ok", "no_route", "no_factors"):
+            stats[key] += int(counts.get(key, 0))
+        stats["rows"] += len(frame)
+        stats["chunks"] += 1
+        elapsed = time.perf_counter() - start
+        progress(f"batch: {stats['rows']:,} rows in {elapsed:.1f}s ({stats['rows'] / elapsed:,.0f} rows/s)")
+
+    pool = get_context("spawn").Pool(workers) if workers else None
+    try:
+        pending = deque()
+        for chunk in iter_trip_chunks(input_path, chunk_rows):
+            if pool is None:
+                write(process_chunk(chunk))
+                continue
+            # Geocoding stays in this process; workers only route and compute
+            pending.append(pool.apply_async(process_chunk, (chunk, geocode_places(chunk))))
+            if len(pending) >= max_pending:
+                write(pending.popleft().get())
+        while pending:
+            write(pending.popleft().get())
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        sink.close()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
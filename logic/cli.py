@@ -0,0 +1,51 @@
+import argparse
+import sys
+
+
+def _batch(args):
+    from logic.batch import run_batch
+
+    stats = run_batch(args.input, args.output, chunk_rows=args.chunk_rows, workers=args.workers,
+                      progress=(lambda message: None) if args.quiet else print)
+    print(f"Wrote {stats['rows']:,} rows to {args.output} in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s); ok={stats['ok']:,} "
+          f"no_route={stats['no_route']:,} no_factors={stats['no_factors']:,}")
+    return 0
+
+
+def _serve(args):
+    from logic.service import serve
+
+    serve(host=args.host, port=args.port, workers=args.workers)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="greenroute", description="GreenRoute command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="compute WTT/TTW/WTW emissions for a trip file")
+    batch.add_argument("input", help="CSV or Parquet trips: vehicle_type, fuel, load_tons, region and "
+                                     "distance_km or origin/destination")
+    batch.add_argument("output", help="results file (.parquet for Parquet, otherwise CSV)")
+    batch.add_argument("--chunk-rows", type=int, default=50_000, help="trips per chunk (default: 50000)")
+    batch.add_argument("--workers", type=int, default=None,
+                       help="worker processes; 0 runs in-process (default: CPU count)")
+    batch.add_argument("--quiet", action="store_true", help="only print the final summary")
+    batch.set_defaults(func=_batch)
+
+    serve = commands.add_parser("serve", help="run the HTTP emissions/routing API (needs uvicorn)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    serve.set_defaults(func=_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import threading
+
+import numpy as np
+
+from logic.emissions import get_factor_index
+
+
+class FactorCube:
+    """Every (vehicle type, fuel) option of the factor table as one dense array.
+
+    factors has shape (regions, combos, 3): the WTT/TTW/WTW g CO2e/t-km of
+    combo c in region r, NaN where the table has no such row or leaves its WTW
+    blank. When the table lists an option twice the first row wins, as in
+    EmissionFactorIndex.
+    """
+
+    def __init__(self, index):
+        keys = index.row_keys
+        self.regions = sorted({region for region, _, _ in keys})
+        self.combos = sorted({(vehicle, fuel) for _, vehicle, fuel in keys})
+        region_pos = {region: i for i, region in enumerate(self.regions)}
+        combo_pos = {combo: i for i, combo in enumerate(self.combos)}
+        self.factors = np.full((len(self.regions), len(self.combos), 3), np.nan)
+        filled = np.zeros(self.factors.shape[:2], dtype=bool)
+        for row, (region, vehicle, fuel) in enumerate(keys):
+            r, c = region_pos[region], combo_pos[(vehicle, fuel)]
+            if not filled[r, c]:
+                self.factors[r, c] = index.factor_matrix[row]
+                filled[r, c] = True
+        self.available = filled & np.isfinite(self.factors[..., 2])
+        self.factors[~self.available] = np.nan
+        self._index = index
+
+    def region_position(self, region):
+        try:
+            return self.regions.index(region.lower().strip())
+        except ValueError:
+            raise ValueError(f"No factors for region: {region.lower().strip()}")
+
+    def tkm_matrix(self, tkm_by_region):
+        # {region: tonne-km} or a list of such dicts -> (trips, regions) array
+        trips = [tkm_by_region] if isinstance(tkm_by_region, dict) else tkm_by_region
+        tkm = np.zeros((len(trips), len(self.regions)))
+        for t, trip in enumerate(trips):
+            for region, value in trip.items():
+                tkm[t, self.region_position(region)] += value
+        return tkm
+
+    def evaluate(self, tkm):
+        """WTT/TTW/WTW kg CO2e of every combo for every trip in one contraction.
+
+        tkm is a (trips, regions) tonne-km array in self.regions order (see
+        tkm_matrix). Returns {"WTT", "TTW", "WTW"} (trips, combos) arrays, NaN
+        where a combo has no factors in a region the trip drives through.
+        """
+        tkm = np.asarray(tkm, dtype=np.float64).reshape(-1, len(self.regions))
+        factors = np.nan_to_num(self.factors, nan=0.0).reshape(len(self.regions), -1)
+        kg = (tkm @ factors).reshape(len(tkm), len(self.combos), 3) / 1000
+        # NaN wherever a driven region lacks the combo: add NaN (or 0) per trip and combo
+        gaps = (tkm > 0).astype(np.float64) @ (~self.available).astype(np.float64)
+        kg += np.where(gaps > 0, np.nan, 0.0)[..., None]
+        return {"WTT": kg[..., 0], "TTW": kg[..., 1], "WTW": kg[..., 2]}
+
+    def missing_combos(self, regions):
+        """Vehicle/fuel pairs offered in regions that lack factors in one of them.
+
+        The candidates are every vehicle type crossed with every fuel found in
+        those regions; returns [{"vehicle_type", "fuel", "missing_in"}, ...].
+        """
+        positions = [self.region_position(region) for region in regions]
+        offered = self.available[positions]
+        vehicles = sorted({vehicle for (vehicle, _), row in zip(self.combos, offered.T) if row.any()})
+        fuels = sorted({fuel for (_, fuel), row in zip(self.combos, offered.T) if row.any()})
+        combo_pos = {combo: c for c, combo in enumerate(self.combos)}
+        missing = []
+        for vehicle in vehicles:
+            for fuel in fuels:
+                c = combo_pos.get((vehicle, fuel))
+                absent = [self.regions[p] for p, row in zip(positions, offered) if c is None or not row[c]]
+                if absent:
+                    missing.append({"vehicle_type": vehicle, "fuel": fuel, "missing_in": absent})
+        return missing
+
+    def fuel_comparison(self, vehicle_type, tkm_by_region):
+        """WTW kg per fuel for one vehicle, matched per region as calculate_emissions does.
+
+        Covers every fuel in the regions driven through; None where a region
+        has no matching row for that fuel.
+        """
+        offered = self.available[[self.region_position(region) for region in tkm_by_region]]
+        fuels = sorted({fuel for (_, fuel), row in zip(self.combos, offered.T) if row.any()})
+        result = {}
+        for fuel in fuels:
+            total = 0.0
+            for region, tkm in tkm_by_region.items():
+                record = self._index.lookup(vehicle_type, fuel, region)
+                if record is None or record.wtw != record.wtw:
+                    total = None
+                    break
+                total += record.wtw * tkm / 1000
+            result[fuel] = total
+        return result
+
+
+_cube = None
+_cube_lock = threading.Lock()
+
+
+def get_factor_cube():
+    global _cube
+    with _cube_lock:
+        if _cube is None:
+            _cube = FactorCube(get_factor_index())
+        return _cube
+
+
+def rank_options(tkm_by_region, top=None, cube=None):
+    """Ranked table of every vehicle/fuel option for one trip, lowest WTW first.
+
+    tkm_by_region maps each region the trip drives through to its tonne-km
+    (distance_km * load_tons for a single-region trip, or per stretch of a
+    regional profile). Returns {"ranked": DataFrame with Rank, Vehicle
+    Type, Fuel, WTT/TTW/WTW (kg) and "vs best (%)", "missing": DataFrame of
+    options absent from one of those regions}.
+    """
+    import pandas as pd
+
+    cube = cube or get_factor_cube()
+    totals = cube.evaluate(cube.tkm_matrix(tkm_by_region))
+    wtw = totals["WTW"][0]
+    order = [c for c in np.argsort(wtw, kind="stable") if not np.isnan(wtw[c])]
+    if top is not None:
+        order = order[:top]
+    best = wtw[order[0]] if order else np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        above_best = np.where(wtw[order] > best, (wtw[order] / best - 1) * 100, 0.0)
+    ranked = pd.DataFrame({
+        "Rank": np.arange(1, len(order) + 1),
+        "Vehicle Type": [cube.combos[c][0] for c in order],
+        "Fuel": [cube.combos[c][1] for c in order],
+        "WTT (kg)": totals["WTT"][0, order].round(2),
+        "TTW (kg)": totals["TTW"][0, order].round(2),
+        "WTW (kg)": wtw[order].round(2),
+        "vs best (%)": above_best.round(1),
+    })
+    missing = pd.DataFrame(cube.missing_combos(list(tkm_by_region)), columns=["vehicle_type", "fuel", "missing_in"])
+    missing = missing.rename(columns={"vehicle_type": "Vehicle Type", "fuel": "Fuel", "missing_in": "Missing in"})
+    missing["Missing in"] = missing["Missing in"].map(", ".join)
+    return {"ranked": ranked, "missing": missing}
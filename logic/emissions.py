@@ -1,41 +1,257 @@
-import pandas as pd
+import difflib
+import math
+from collections import Counter
+from dataclasses import dataclass
 
-# Load and normalize
-df = pd.read_csv("data/glec_emission_factors_cleaned.csv")
-print("DEBUG: Columns =", df.columns.tolist())
-df["Vehicle Type"] = df["Vehicle Type"].str.lower().str.strip()
-df["Fuel"] = df["Fuel"].str.lower().str.strip()
-df["Region"] = df["Region"].str.lower().str.strip()  # ✅ Normalize Region too
+import numpy as np
 
-def get_emission_factors(vehicle_type, fuel, region):
+from logic.factor_artifact import (ARTIFACT_DIR, FACTORS_CSV, ArtifactError, FactorTable, load_factor_artifact,
+                                   normalize_factor_frame)
+from logic.instrumentation import timed
+
+# Distinct missed keys counted for miss_report; misses on further keys are only totalled
+MAX_TRACKED_MISSES = 1000
+
+
+@dataclass(frozen=True)
+class EmissionFactors:
+    """WTT/TTW/WTW factors (g CO2e/t-km) resolved from one row of the factor table.
+
+    load_factor and empty_running are the row's combined load factor and
+    empty running share as fractions, NaN where the table has none.
+    """
+    wtt: float
+    ttw: float
+    wtw: float
+    vehicle_type: str
+    row: int
+    load_factor: float = math.nan
+    empty_running: float = math.nan
+
+    def as_dict(self):
+        return {"WTT": self.wtt, "TTW": self.ttw, "WTW": self.wtw}
+
+
+def _normalize_key(vehicle_type, fuel, region):
     vehicle_type = vehicle_type.lower().strip()
-    fuel = fuel.lower().strip()
-    region = region.lower().strip()
+    tokens = vehicle_type.split()
+    token = tokens[0] if tokens else ""
+    return region.lower().strip(), token, fuel.lower().strip()
+
+
+class EmissionFactorIndex:
+    """Hash index over the factor table keyed by (region, vehicle token, fuel).
+
+    A lookup matches the first row (in table order) of the region/fuel bucket
+    whose vehicle type contains the first word of the requested vehicle type,
+    which is what the old DataFrame scan did. Keys for every word in the table
+    are resolved up front; other tokens are resolved on first use and memoized
+    when they match a row. Misses are not memoized (rescanning one bucket is
+    cheap), so arbitrary user input cannot grow the index; at most
+    MAX_TRACKED_MISSES distinct missed keys are counted for miss_report.
+    """
+
+    def __init__(self, table):
+        # table: a FactorTable, i.e. normalized regions/vehicle_types/fuels
+        # columns plus an (n, 3) WTT/TTW/WTW factor_matrix (g CO2e/t-km)
+        self.factor_matrix = np.asarray(table.factor_matrix, dtype=np.float64).reshape(-1, 3)
+        self.load_matrix = np.asarray(table.load_matrix, dtype=np.float64).reshape(-1, 2)
+        # (region, vehicle type, fuel) of every row, normalized
+        self.row_keys = list(zip(table.regions, table.vehicle_types, table.fuels))
+        self._records = []
+        self._buckets = {}
+        rows = zip(self.factor_matrix.tolist(), self.load_matrix.tolist())
+        for pos, ((wtt, ttw, wtw), (load_factor, empty_running)) in enumerate(rows):
+            record = EmissionFactors(wtt=wtt, ttw=ttw, wtw=wtw, vehicle_type=table.vehicle_types[pos], row=pos,
+                                     load_factor=load_factor, empty_running=empty_running)
+            self._records.append(record)
+            bucket_key = (table.regions[pos], table.fuels[pos])
+            self._buckets.setdefault(bucket_key, []).append(record)
+
+        self._vocabulary = {}
+        for bucket_key, records in self._buckets.items():
+            words = []
+            for record in records:
+                for word in record.vehicle_type.split():
+                    if word not in words:
+                        words.append(word)
+            self._vocabulary[bucket_key] = words
+
+        self._index = {}
+        for (region, fuel), words in self._vocabulary.items():
+            for word in words:
+                self._index[(region, word, fuel)] = self._scan(region, word, fuel)
+
+        self._misses = Counter()
+        self.untracked_misses = 0
+
+    @classmethod
+    def from_dataframe(cls, frame):
+        # frame: the cleaned factor table, already normalized like df
+        factors = np.array([_row_factors(frame, pos) for pos in range(len(frame))], dtype=np.float64)
+        load = frame[["Combined Load Factor (%)", "Empty Running (%)"]].to_numpy(dtype=np.float64) / 100
+        return cls(FactorTable(frame["Region"].tolist(), frame["Vehicle Type"].tolist(),
+                               frame["Fuel"].tolist(), factors, load))
+
+    @classmethod
+    def from_artifact(cls, path=ARTIFACT_DIR, source=FACTORS_CSV, **kwargs):
+        return cls(load_factor_artifact(path, source=source, **kwargs))
+
+    def __len__(self):
+        return len(self._index)
+
+    def _scan(self, region, token, fuel):
+        if not token:
+            return None
+        for record in self._buckets.get((region, fuel), ()):
+            if token in record.vehicle_type:
+                return record
+        return None
+
+    def _fuzzy(self, region, token, fuel):
+        words = self._vocabulary.get((region, fuel), [])
+        if not token or not words:
+            return None
+
+        # Prefix match first: shortest vocabulary word sharing the token as a prefix
+        # (or vice versa), ties broken by table order.
+        prefixed = [w for w in words if w.startswith(token) or (len(w) >= 3 and token.startswith(w))]
+        if prefixed:
+            return self._index[(region, min(prefixed, key=len), fuel)]
+
+        close = difflib.get_close_matches(token, words, n=1, cutoff=0.6)
+        if close:
+            return self._index[(region, close[0], fuel)]
+        return None
+
+    def lookup(self, vehicle_type, fuel, region, fuzzy=False):
+        key = _normalize_key(vehicle_type, fuel, region)
+        record = self._index.get(key)
+        if record is None:
+            record = self._scan(*key)
+            if record is not None:
+                # Only tokens contained in a vehicle type of the table get here, so this stays bounded
+                self._index[key] = record
+
+        if record is None:
+            if key in self._misses or len(self._misses) < MAX_TRACKED_MISSES:
+                self._misses[key] += 1
+            else:
+                self.untracked_misses += 1
+            if fuzzy:
+                record = self._fuzzy(*key)
+        return record
+
+    def resolve_rows(self, vehicle_types, fuels, regions, fuzzy=False):
+        # Resolves each distinct (vehicle, fuel, region) once and scatters the
+        # row ids back with NumPy; -1 marks combinations with no factors.
+        vehicle_codes, vehicles = _factorize(vehicle_types)
+        fuel_codes, fuel_names = _factorize(fuels)
+        region_codes, region_names = _factorize(regions)
+
+        combined = (vehicle_codes * len(fuel_names) + fuel_codes) * len(region_names) + region_codes
+        combos, inverse = np.unique(combined, return_inverse=True)
+
+        rows = np.empty(len(combos), dtype=np.int64)
+        for i, combo in enumerate(combos.tolist()):
+            rest, r = divmod(combo, len(region_names))
+            v, f = divmod(rest, len(fuel_names))
+            record = self.lookup(vehicles[v], fuel_names[f], region_names[r], fuzzy=fuzzy)
+            rows[i] = -1 if record is None else record.row
+        return rows[inverse.reshape(-1)]
 
-    # ✅ Apply Region Filter
-    match = df[
-        (df["Region"] == region) &
-        (df["Vehicle Type"].str.contains(vehicle_type.split()[0], case=False)) &
-        (df["Fuel"] == fuel)
-    ]
+    def miss_report(self):
+        report = []
+        for (region, token, fuel), count in self._misses.most_common():
+            suggestion = self._fuzzy(region, token, fuel)
+            report.append({
+                "region": region,
+                "vehicle_token": token,
+                "fuel": fuel,
+                "misses": count,
+                "suggestion": suggestion.vehicle_type if suggestion else None,
+            })
+        return report
 
-    if match.empty:
+    def reset_misses(self):
+        self._misses.clear()
+        self.untracked_misses = 0
+
+
+def _row_factors(frame, pos):
+    wtt = float(frame["WTT (g CO2e/t-km)"].iat[pos])
+    ttw = float(frame["TTW (g CO2e/t-km)"].iat[pos])
+    wtw = float(frame["WTW (g CO2e/t-km)"].iat[pos])
+    wtw = wtt + ttw if math.isnan(wtw) else wtw
+    return wtt, ttw, wtw
+
+
+def _factorize(values):
+    # Only the batch path needs pandas; plain lookups never import it
+    import pandas as pd
+
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object).reshape(-1))
+    uniques = [str(u) for u in uniques]
+    if (codes < 0).any():
+        # Missing values can never match a factor row
+        codes = np.where(codes < 0, len(uniques), codes)
+        uniques.append("")
+    return codes.astype(np.int64), uniques
+
+
+_factor_index = None
+_df = None
+
+
+def load_factor_frame(path=FACTORS_CSV):
+    import pandas as pd
+
+    return normalize_factor_frame(pd.read_csv(path))
+
+
+def get_factor_index():
+    # Built on first use from the compiled artifact (NumPy only); falls back
+    # to parsing the CSV when the artifact is missing or stale.
+    global _factor_index
+    if _factor_index is None:
+        try:
+            _factor_index = EmissionFactorIndex.from_artifact()
+        except ArtifactError as exc:
+            print(f"Emission factor artifact unavailable ({exc}); loading {FACTORS_CSV}")
+            _factor_index = EmissionFactorIndex.from_dataframe(load_factor_frame())
+    return _factor_index
+
+
+def __getattr__(name):
+    # df and factor_index used to be built at import; keep them importable lazily
+    global _df
+    if name == "factor_index":
+        return get_factor_index()
+    if name == "df":
+        if _df is None:
+            _df = load_factor_frame()
+        return _df
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_factor_record(vehicle_type, fuel, region):
+    # The matched EmissionFactors row, including its load factor / empty running
+    record = get_factor_index().lookup(vehicle_type, fuel, region)
+
+    if record is None:
+        vehicle_type = vehicle_type.lower().strip()
+        fuel = fuel.lower().strip()
+        region = region.lower().strip()
         raise ValueError(f"No match found for: {vehicle_type} with fuel: {fuel} in region: {region}")
 
-    row = match.iloc[0]
+    return record
 
-    if pd.isna(row["WTW (g CO2e/t-km)"]):
-        wtw = float(row["WTT (g CO2e/t-km)"]) + float(row["TTW (g CO2e/t-km)"])
-    else:
-        wtw = float(row["WTW (g CO2e/t-km)"])
 
-    return {
-        "WTT": float(row["WTT (g CO2e/t-km)"]),
-        "TTW": float(row["TTW (g CO2e/t-km)"]),
-        "WTW": wtw
-    }
+def get_emission_factors(vehicle_type, fuel, region):
+    return get_factor_record(vehicle_type, fuel, region).as_dict()
 
 
+@timed("emissions.calculate_emissions")
 def calculate_emissions(vehicle_type, fuel, distance_km, load_tons, region):
     factors = get_emission_factors(vehicle_type, fuel, region)
 
@@ -46,3 +262,58 @@ def calculate_emissions(vehicle_type, fuel, distance_km, load_tons, region):
 
     return emissions
 
+
+def _round_like_python(values, decimals=2):
+    # np.round scales by 10**decimals before rounding, which can disagree with
+    # Python's correctly-rounded round() right at a tie. Only those few
+    # near-tie values are re-rounded in Python.
+    rounded = np.round(values, decimals)
+    scaled = values * 10 ** decimals
+    near_tie = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded.flat[i] = round(float(values.flat[i]), decimals)
+    return rounded
+
+
+def calculate_emissions_batch(trips=None, vehicle_type=None, fuel=None, distance_km=None,
+                              load_tons=None, region=None, dtype=np.float64, errors="raise"):
+    """Columnar version of calculate_emissions.
+
+    Takes either a DataFrame with vehicle_type/fuel/distance_km/load_tons/region
+    columns, or the same fields as arrays (scalars are broadcast). Returns
+    {"WTT", "TTW", "WTW"} arrays in kg CO2e. With the default float64 dtype the
+    values equal calculate_emissions leg for leg; float32 trades that for half
+    the memory and skips the rounding step. errors="nan" leaves legs with no
+    matching factors as NaN instead of raising.
+    """
+    if trips is not None:
+        vehicle_type = trips["vehicle_type"]
+        fuel = trips["fuel"]
+        distance_km = trips["distance_km"]
+        load_tons = trips["load_tons"]
+        region = trips["region"]
+
+    distance_km = np.asarray(distance_km, dtype=dtype).reshape(-1)
+    load_tons = np.asarray(load_tons, dtype=dtype).reshape(-1)
+    n = max(len(distance_km), len(load_tons))
+    columns = [np.broadcast_to(np.asarray(col, dtype=object).reshape(-1), (n,)) for col in (vehicle_type, fuel, region)]
+    distance_km = np.broadcast_to(distance_km, (n,))
+    load_tons = np.broadcast_to(load_tons, (n,))
+
+    factor_index = get_factor_index()
+    rows = factor_index.resolve_rows(*columns)
+    missing = rows < 0
+    if missing.any() and errors == "raise":
+        i = int(np.flatnonzero(missing)[0])
+        vehicle, fuel_name, region_name = (str(col[i]).lower().strip() for col in columns)
+        raise ValueError(f"No match found for: {vehicle} with fuel: {fuel_name} in region: {region_name}")
+
+    factors = factor_index.factor_matrix.astype(dtype, copy=False)[np.where(missing, 0, rows)]
+    grams = factors * distance_km[:, None] * load_tons[:, None]  # g CO2e, same op order as the scalar path
+    kg = grams / 1000
+    kg[missing] = np.nan
+
+    if np.dtype(dtype) == np.float64:
+        kg = _round_like_python(kg)
+
+    return {"WTT": kg[:, 0], "TTW": kg[:, 1], "WTW": kg[:, 2]}
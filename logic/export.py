@@ -0,0 +1,168 @@
+import io
+import json
+
+import numpy as np
+
+from logic.profile import iter_emission_profile, profile_chunks
+
+# Fixed report schema: one row per route vertex, with the segment ending there
+REPORT_COLUMNS = (
+    "Trip", "Point", "Lat", "Lon", "Region", "Vehicle Type", "Fuel", "Load (tons)",
+    "Segment Distance (km)", "Cumulative Distance (km)",
+    "Segment WTT (kg)", "Segment TTW (kg)", "Segment WTW (kg)",
+    "Cumulative WTT (kg)", "Cumulative TTW (kg)", "Cumulative WTW (kg)",
+)
+_TEXT_COLUMNS = ("Trip", "Region", "Vehicle Type", "Fuel")
+_PROFILE_COLUMNS = {
+    "Lat": "lat", "Lon": "lon",
+    "Segment Distance (km)": "segment_distance_km", "Cumulative Distance (km)": "distance_km",
+    "Segment WTT (kg)": "segment_WTT", "Segment TTW (kg)": "segment_TTW", "Segment WTW (kg)": "segment_WTW",
+    "Cumulative WTT (kg)": "WTT", "Cumulative TTW (kg)": "TTW", "Cumulative WTW (kg)": "WTW",
+}
+# format -> (MIME type, file extension)
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "ndjson": ("application/x-ndjson", ".ndjson"),
+}
+
+
+def report_chunks(chunks, vehicle_type, fuel, load_tons, region=None, trip=""):
+    """Map profile chunks (profile_chunks / iter_emission_profile) onto REPORT_COLUMNS.
+
+    Region comes from the profile's "region" array when it has one (regional
+    profiles), otherwise from region. Point numbers run on across chunks.
+    """
+    point = 1
+    for chunk in chunks:
+        n = len(chunk["lat"])
+        columns = {
+            "Trip": np.full(n, trip, dtype=object),
+            "Point": np.arange(point, point + n),
+            "Region": chunk["region"] if "region" in chunk else np.full(n, region, dtype=object),
+            "Vehicle Type": np.full(n, vehicle_type, dtype=object),
+            "Fuel": np.full(n, fuel, dtype=object),
+            "Load (tons)": np.full(n, float(load_tons)),
+        }
+        columns.update({name: np.asarray(chunk[key], dtype=np.float64) for name, key in _PROFILE_COLUMNS.items()})
+        point += n
+        yield {name: columns[name] for name in REPORT_COLUMNS}
+
+
+def trip_report_chunks(coords, vehicle_type, fuel, load_tons, region, total_km=None, trip="", chunk_rows=10_000):
+    # Report chunks straight from the route polyline, never building the full profile
+    chunks = iter_emission_profile(coords, vehicle_type, fuel, load_tons, region, total_km, chunk_rows)
+    return report_chunks(chunks, vehicle_type, fuel, load_tons, region, trip)
+
+
+def profile_report_chunks(profile, vehicle_type, fuel, load_tons, region=None, trip="", chunk_rows=10_000):
+    # Report chunks of an already built (e.g. cached or regional) profile
+    return report_chunks(profile_chunks(profile, chunk_rows), vehicle_type, fuel, load_tons, region, trip)
+
+
+class _CsvWriter:
+    def __init__(self, f):
+        self._file = io.TextIOWrapper(f, encoding="utf-8", newline="", write_through=True)
+        self._header = True
+
+    def write(self, columns):
+        import pandas as pd
+
+        pd.DataFrame(columns).to_csv(self._file, index=False, header=self._header)
+        self._header = False
+
+    def close(self):
+        if self._header:
+            self._file.write(",".join(REPORT_COLUMNS) + "\n")
+        self._file.flush()
+        self._file.detach()
+
+
+class _NdjsonWriter:
+    # Rows encoded per write; Python objects cost far more than the arrays they come from
+    batch_rows = 2000
+
+    def __init__(self, f):
+        self._file = f
+
+    def write(self, columns):
+        n = len(columns["Point"])
+        for lo in range(0, n, self.batch_rows):
+            # One JSON object per line; tolist() gives plain floats and ints for json, NaN becomes null
+            values = []
+            for name in REPORT_COLUMNS:
+                column = columns[name][lo:lo + self.batch_rows]
+                if column.dtype.kind == "f" and np.isnan(column).any():
+                    column = np.where(np.isnan(column), None, column)
+                values.append(column.tolist())
+            lines = (json.dumps(dict(zip(REPORT_COLUMNS, row)), ensure_ascii=False) for row in zip(*values))
+            self._file.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+    def close(self):
+        pass
+
+
+class _ParquetWriter:
+    def __init__(self, f, compression="zstd"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.schema = pa.schema([pa.field(name, pa.string() if name in _TEXT_COLUMNS else
+                                          pa.int64() if name == "Point" else pa.float64()) for name in REPORT_COLUMNS])
+        self._writer = pq.ParquetWriter(f, self.schema, compression=compression)
+
+    def write(self, columns):
+        arrays = [self._pa.array(columns[field.name], type=field.type) for field in self.schema]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "parquet": _ParquetWriter, "ndjson": _NdjsonWriter}
+
+
+def format_for(path):
+    for fmt, (_, extension) in FORMATS.items():
+        if path.endswith(extension):
+            return fmt
+    raise ValueError(f"Unknown report format for {path}; use one of {', '.join(e for _, e in FORMATS.values())}")
+
+
+def export_report(chunks, output, fmt=None):
+    """Write report chunks to a path or binary file object as they arrive.
+
+    fmt is "csv", "parquet" (zstd-compressed, needs pyarrow) or "ndjson";
+    by default it follows the output path's extension, so it is required
+    for file objects. Every chunk is written and dropped before the next is
+    produced, so memory depends on the chunk size, not on the number of
+    segments. Returns the number of rows written.
+    """
+    if fmt is None:
+        if not isinstance(output, str):
+            raise ValueError("fmt is required when writing a report to a file object")
+        fmt = format_for(output)
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown report format: {fmt}")
+    f = open(output, "wb") if isinstance(output, str) else output
+    written = 0
+    try:
+        writer = _WRITERS[fmt](f)
+        try:
+            for columns in chunks:
+                writer.write(columns)
+                written += len(columns["Point"])
+        finally:
+            writer.close()
+    finally:
+        if f is not output:
+            f.close()
+    return written
+
+
+def report_bytes(chunks, fmt):
+    # Whole report in memory, for download buttons; the only copy is the encoded output
+    buffer = io.BytesIO()
+    export_report(chunks, buffer, fmt)
+    return buffer.getvalue()
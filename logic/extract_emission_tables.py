@@ -1,28 +1,166 @@
-from doctr.io import DocumentFile
-from doctr.models import ocr_predictor
 import json
+import os
+from multiprocessing import get_context
+
+import pypdfium2 as pdfium
+
+# doctr renders PDFs at scale 2 (144 dpi) by default; keep the same input size
+RENDER_SCALE = 2
+
+# Predictors built in this process, keyed by factory (None: the pretrained doctr model)
+_predictors = {}
+
+
+def _default_predictor():
+    from doctr.models import ocr_predictor
+    return ocr_predictor(pretrained=True)
+
+
+def get_predictor(factory=None):
+    # One OCR model per process and factory: loading the pretrained weights dominates small jobs
+    predictor = _predictors.get(factory)
+    if predictor is None:
+        predictor = _predictors[factory] = (factory or _default_predictor)()
+    return predictor
+
+
+def _init_worker(factory):
+    get_predictor(factory)
+
+
+def page_count(pdf_path):
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def render_pages(pdf_path, page_ids, scale=RENDER_SCALE):
+    # Rasterize only the requested pages, one at a time
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        for page_id in page_ids:
+            page = pdf[page_id]
+            yield page.render(scale=scale).to_numpy()
+            page.close()
+    finally:
+        pdf.close()
+
+
+def _ocr_batch(pdf_path, page_ids, factory=None):
+    images = list(render_pages(pdf_path, page_ids))
+    pages = get_predictor(factory)(images).export()["pages"]
+    for page_id, page in zip(page_ids, pages):
+        page["page_idx"] = page_id
+    return pages
+
+
+def _ocr_batch_task(args):
+    return _ocr_batch(*args)
+
+
+def _batches(page_ids, batch_size):
+    for i in range(0, len(page_ids), batch_size):
+        yield page_ids[i:i + batch_size]
+
+
+def completed_pages(output_path):
+    # Pages already written to a JSON Lines result; a truncated last line is ignored
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["page_idx"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def _truncate_partial_line(output_path):
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            f.seek(end)
+            f.truncate()
+
+
+def extract_to_jsonl(pdf_path, output_path="data/glec_raw_output.jsonl", page_ids=None,
+                     batch_size=4, workers=None, resume=True, predictor_factory=None):
+    """OCR a PDF page range into a JSON Lines file, one page per line.
+
+    Pages are rasterized lazily in batches of batch_size and spread over a
+    process pool (workers=0 runs in this process). Each worker keeps a single
+    predictor for its lifetime. With resume=True, pages already present in
+    output_path are skipped, so an interrupted run picks up where it stopped.
+    predictor_factory replaces the pretrained doctr model (it must be
+    picklable, e.g. a module-level function). Returns the number of pages
+    written by this call.
+    """
+    if page_ids is None:
+        page_ids = range(page_count(pdf_path))
+    page_ids = list(page_ids)
+
+    if resume:
+        _truncate_partial_line(output_path)
+        done = completed_pages(output_path)
+        page_ids = [p for p in page_ids if p not in done]
+    elif os.path.exists(output_path):
+        os.remove(output_path)
+    if not page_ids:
+        return 0
+
+    tasks = [(pdf_path, batch, predictor_factory) for batch in _batches(page_ids, batch_size)]
+    written = 0
+    with open(output_path, "a", encoding="utf-8") as out:
+        if workers == 0:
+            get_predictor(predictor_factory)
+            results = map(_ocr_batch_task, tasks)
+            pool = None
+        else:
+            pool = get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(predictor_factory,))
+            results = pool.imap_unordered(_ocr_batch_task, tasks)
+        try:
+            for pages in results:
+                for page in pages:
+                    out.write(json.dumps(page, separators=(",", ":")) + "\n")
+                    written += 1
+                out.flush()
+                print(f"OCR: {written}/{len(page_ids)} pages written to {output_path}")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    return written
+
+
+def load_jsonl_result(path="data/glec_raw_output.jsonl"):
+    # Reassemble a JSON Lines result into the {"pages": [...]} layout of doctr's export()
+    with open(path, "r", encoding="utf-8") as f:
+        pages = [json.loads(line) for line in f if line.strip()]
+    pages.sort(key=lambda page: page["page_idx"])
+    return {"pages": pages}
+
 
 def extract_from_pdf(pdf_path: str, page_ids=None):
     print(f"Loading PDF from: {pdf_path}")
-    
-    # This returns a list of page images (numpy arrays)
-    pages = DocumentFile.from_pdf(pdf_path)
-    print("Type of pages:", type(pages))  # <class 'list'>
-    
-    # If specific pages are requested, filter them
-    if page_ids:
-        selected_pages = [pages[i] for i in page_ids]
-    else:
-        selected_pages = pages
-
-    # Load the OCR model
-    model = ocr_predictor(pretrained=True)
-
-    # Perform OCR on the selected pages
-    result = model(selected_pages)
-    full_json = result.export()
-
-    return full_json
+
+    # If specific pages are requested, use them; None or an empty list means every page
+    if not page_ids:
+        page_ids = range(page_count(pdf_path))
+    page_ids = list(page_ids)
+
+    # Perform OCR on the selected pages, reusing this process's predictor
+    pages = []
+    for batch in _batches(page_ids, 4):
+        pages.extend(_ocr_batch(pdf_path, batch))
+    return {"pages": pages}
+
 
 def save_json_result(result, output_path="data/glec_raw_output.json"):
     with open(output_path, "w", encoding="utf-8") as f:
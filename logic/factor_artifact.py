@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+ARTIFACT_FORMAT_VERSION = 2
+FACTORS_CSV = "data/glec_emission_factors_cleaned.csv"
+ARTIFACT_DIR = "data/emission_factors"
+_FILES = ("factors.npy", "load.npy", "codes.npy", "strings.json")
+_FACTOR_COLUMNS = ("WTT (g CO2e/t-km)", "TTW (g CO2e/t-km)", "WTW (g CO2e/t-km)")
+_LOAD_COLUMNS = ("Combined Load Factor (%)", "Empty Running (%)")
+_KEY_COLUMNS = ("Region", "Vehicle Type", "Fuel")
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_factor_frame(frame):
+    # Same normalization emissions.py has always applied to the CSV
+    frame = frame.copy()
+    for column in _KEY_COLUMNS:
+        frame[column] = frame[column].str.lower().str.strip()
+    return frame
+
+
+def build_factor_artifact(csv_path=FACTORS_CSV, out_dir=ARTIFACT_DIR):
+    """Compile the cleaned factor CSV into plain arrays NumPy can load alone.
+
+    Writes (format version 2):
+        factors.npy   (n, 3) float64 WTT/TTW/WTW in g CO2e/t-km, WTW filled as WTT+TTW
+        load.npy      (n, 2) float64 combined load factor and empty running as fractions, NaN if unknown
+        codes.npy     (n, 3) int32 region/vehicle type/fuel ids into strings.json
+        strings.json  interned, already normalized (lower-cased, stripped) strings
+        meta.json     version, row count, sha256 of every file and of the source CSV
+
+    Run as: python -m logic.factor_artifact [csv_path] [out_dir]
+    """
+    import pandas as pd
+
+    frame = normalize_factor_frame(pd.read_csv(csv_path))
+    factors = frame[list(_FACTOR_COLUMNS)].to_numpy(dtype=np.float64, copy=True)
+    factors[:, 2] = np.where(np.isnan(factors[:, 2]), factors[:, 0] + factors[:, 1], factors[:, 2])
+    load = frame[list(_LOAD_COLUMNS)].to_numpy(dtype=np.float64, copy=True) / 100
+
+    strings = []
+    ids = {}
+    codes = np.empty((len(frame), 3), dtype=np.int32)
+    for j, column in enumerate(_KEY_COLUMNS):
+        for i, value in enumerate(frame[column].fillna("").tolist()):
+            if value not in ids:
+                ids[value] = len(strings)
+                strings.append(value)
+            codes[i, j] = ids[value]
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "factors.npy"), factors)
+    np.save(os.path.join(out_dir, "load.npy"), load)
+    np.save(os.path.join(out_dir, "codes.npy"), codes)
+    with open(os.path.join(out_dir, "strings.json"), "w", encoding="utf-8") as f:
+        json.dump(strings, f, ensure_ascii=False, indent=0)
+
+    meta = {
+        "version": ARTIFACT_FORMAT_VERSION,
+        "rows": len(frame),
+        "source": os.path.basename(csv_path),
+        "source_sha256": file_sha256(csv_path),
+        "checksums": {name: file_sha256(os.path.join(out_dir, name)) for name in _FILES},
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return out_dir
+
+
+class FactorTable:
+    """Columns of a compiled factor artifact; factor_matrix is memory-mapped.
+
+    load_matrix holds the combined load factor and empty running share of
+    each row as fractions (NaN where the table gives none).
+    """
+
+    def __init__(self, regions, vehicle_types, fuels, factor_matrix, load_matrix=None):
+        self.regions = regions
+        self.vehicle_types = vehicle_types
+        self.fuels = fuels
+        self.factor_matrix = factor_matrix
+        if load_matrix is None:
+            load_matrix = np.full((len(factor_matrix), 2), np.nan)
+        self.load_matrix = load_matrix
+
+    def __len__(self):
+        return len(self.factor_matrix)
+
+
+def load_factor_artifact(path=ARTIFACT_DIR, source=None, verify=True, mmap=True):
+    """Open a compiled artifact without pandas.
+
+    Raises ArtifactError when the directory is missing, was written by another
+    format version, fails its checksums (verify=True), or was compiled from a
+    different version of the source CSV than the one at source.
+    """
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError as exc:
+        raise ArtifactError(f"No factor artifact in {path}") from exc
+    if meta.get("version") != ARTIFACT_FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported factor artifact version {meta.get('version')} in {path}")
+    if verify:
+        for name in _FILES:
+            if file_sha256(os.path.join(path, name)) != meta["checksums"].get(name):
+                raise ArtifactError(f"Checksum mismatch for {name} in {path}")
+    if source is not None and os.path.exists(source) and file_sha256(source) != meta.get("source_sha256"):
+        raise ArtifactError(f"{path} is out of date with {source}; rebuild it")
+
+    with open(os.path.join(path, "strings.json"), encoding="utf-8") as f:
+        strings = json.load(f)
+    codes = np.load(os.path.join(path, "codes.npy"))
+    mode = "r" if mmap else None
+    factors = np.load(os.path.join(path, "factors.npy"), mmap_mode=mode)
+    load = np.load(os.path.join(path, "load.npy"), mmap_mode=mode)
+    columns = [[strings[c] for c in codes[:, j].tolist()] for j in range(3)]
+    return FactorTable(*columns, factor_matrix=factors, load_matrix=load)
+
+
+if __name__ == "__main__":
+    out = build_factor_artifact(*sys.argv[1:3])
+    print(f"Compiled emission factors to: {out}")
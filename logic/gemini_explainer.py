@@ -1,24 +1,347 @@
+import hashlib
 import os
-import google.generativeai as genai
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
 from dotenv import load_dotenv
 
+from logic.geocache import CACHE_DIR
+from logic.instrumentation import enabled as instrumentation_enabled, observe, register_collector, timed, timer
+
 load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise Exception("❌ GEMINI_API_KEY not found in .env file.")
 
-genai.configure(api_key=api_key)
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+# "gemini" (default) or "fake" for the offline canned backend
+GEMINI_BACKEND = os.getenv("GREENROUTE_GEMINI_BACKEND", "gemini")
+# Answers depend only on the prompt, so they are reused for a day
+EXPLANATION_TTL_SECONDS = 24 * 3600
+
+PROMPT_TEMPLATE = (
+    "You are a CO₂ emissions expert for logistics. "
+    "Explain TTW, WTT, WTW and suggest how to reduce emissions.\n\n"
+    "Trip Info:\n{trip_summary}\n\n"
+    "Question: {question}"
+)
+
+
+class GeminiConfigError(Exception):
+    """The Gemini backend cannot be created, e.g. GEMINI_API_KEY is missing."""
+
+
+def build_prompt(question, trip_summary):
+    return PROMPT_TEMPLATE.format(trip_summary=trip_summary, question=question)
+
+
+class GeminiBackend:
+    """Live Google Gemini backend; the SDK is imported and configured on first use."""
+
+    def __init__(self, model_name=GEMINI_MODEL, api_key=None):
+        self.name = f"gemini:{model_name}"
+        self.model_name = model_name
+        self.api_key = api_key
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                api_key = self.api_key or os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise GeminiConfigError("❌ GEMINI_API_KEY not found in .env file.")
+                import google.generativeai as genai
+
+                genai.configure(api_key=api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    def generate(self, prompt):
+        return self._get_model().generate_content(prompt).text
+
+    def stream(self, prompt):
+        for chunk in self._get_model().generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeGeminiBackend:
+    """Offline backend answering with a canned explanation; no network, no API key.
+
+    delay simulates model latency (seconds per answer), spread over the
+    streamed words.
+    """
+
+    name = "fake"
+
+    def __init__(self, answer=None, delay=0.0):
+        self.answer = answer
+        self.delay = delay
+        self.calls = 0
+
+    def _answer(self, prompt):
+        if self.answer is not None:
+            return self.answer
+        question = prompt.rsplit("Question:", 1)[-1].strip()
+        return (
+            f"(offline answer) You asked: {question} "
+            "WTT covers fuel production and delivery, TTW the vehicle's exhaust, and WTW is their sum. "
+            "Fuller loads, shorter routes and lower-carbon fuels such as HVO or CNG reduce WTW per tonne-km."
+        )
+
+    def generate(self, prompt):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self._answer(prompt)
+
+    def stream(self, prompt):
+        self.calls += 1
+        words = self._answer(prompt).split(" ")
+        for k, word in enumerate(words):
+            if self.delay:
+                time.sleep(self.delay / len(words))
+            yield word if k == 0 else " " + word
+
+
+class ExplanationCache:
+    """Prompt-hash keyed answers with TTL, in memory and optionally in SQLite.
+
+    The SQLite file keeps at most max_rows answers, dropping the oldest first.
+    """
+
+    def __init__(self, ttl_seconds=EXPLANATION_TTL_SECONDS, max_entries=256, path=None, max_rows=4096):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.stats = Counter()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanations (key TEXT PRIMARY KEY, answer TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS explanations_created ON explanations (created)")
+            self._conn.commit()
+
+    @classmethod
+    def persistent(cls, **kwargs):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        return cls(path=os.path.join(CACHE_DIR, "explanations.sqlite"), **kwargs)
+
+    @staticmethod
+    def key(backend_name, prompt):
+        return hashlib.sha256(f"{backend_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _expired(self, created):
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
 
-# ✅ Use just "gemini-pro" instead of "models/gemini-pro"
-model = genai.GenerativeModel("gemini-1.5-flash")
+    def _remember(self, key, answer, created):
+        self._memory[key] = (answer, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
 
+    def _forget(self, key):
+        self._memory.pop(key, None)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM explanations WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _prune_rows(self):
+        # Expired rows, then the oldest ones beyond max_rows
+        removed = 0
+        if self.ttl_seconds is not None:
+            removed += self._conn.execute(
+                "DELETE FROM explanations WHERE created < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+        if self.max_rows is not None:
+            removed += self._conn.execute(
+                "DELETE FROM explanations WHERE key NOT IN (SELECT key FROM explanations ORDER BY created DESC LIMIT ?)",
+                (self.max_rows,),
+            ).rowcount
+        self.stats["evictions"] += removed
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._conn is not None:
+                row = self._conn.execute("SELECT answer, created FROM explanations WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    if not self._expired(entry[1]):
+                        self._remember(key, *entry)
+            if entry is None or self._expired(entry[1]):
+                if entry is not None:
+                    self._forget(key)
+                self.stats["misses"] += 1
+                return None
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key, answer):
+        created = time.time()
+        with self._lock:
+            self._remember(key, answer, created)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO explanations (key, answer, created) VALUES (?, ?, ?)", (key, answer, created)
+                )
+                self._prune_rows()
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM explanations")
+                self._conn.commit()
+
+    def __len__(self):
+        return len(self._memory)
+
+
+class Explainer:
+    """Cached, coalescing front of an explanation backend.
+
+    Identical prompts are answered from the cache; a prompt that is already
+    being generated by another thread (e.g. two Streamlit sessions asking the
+    same thing) waits for that answer instead of calling the model again.
+    """
+
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache
+        self.stats = Counter()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _key(self, prompt):
+        return ExplanationCache.key(self.backend.name, prompt)
+
+    def _claim(self, key):
+        # (future, True) for the caller that must generate, (future, False) for waiters
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _settle(self, key, future, answer=None, error=None):
+        # Cache first, so a caller arriving after the in-flight entry is gone finds the answer
+        if error is None and self.cache is not None:
+            self.cache.put(key, answer)
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(answer)
+
+    def ask(self, prompt):
+        key = self._key(prompt)
+        if self.cache is not None:
+            answer = self.cache.get(key)
+            if answer is not None:
+                return answer
+        future, leader = self._claim(key)
+        if not leader:
+            return future.result()
+        self.stats["requests"] += 1
+        try:
+            answer = self.backend.generate(prompt)
+        except Exception as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, answer)
+        return answer
+
+    def stream(self, prompt):
+        # Yields text chunks as the model produces them; cached and coalesced
+        # answers arrive as a single chunk
+        key = self._key(prompt)
+        if self.cache is not None:
+            answer = self.cache.get(key)
+            if answer is not None:
+                yield answer
+                return
+        future, leader = self._claim(key)
+        if not leader:
+            yield future.result()
+            return
+        self.stats["requests"] += 1
+        parts = []
+        try:
+            for chunk in self.backend.stream(prompt):
+                parts.append(chunk)
+                yield chunk
+        except BaseException as e:
+            # Includes GeneratorExit when the reader stops early: waiters get the error, nothing is cached
+            self._settle(key, future, error=e if isinstance(e, Exception) else RuntimeError("stream abandoned"))
+            raise
+        self._settle(key, future, "".join(parts))
+
+    def report(self):
+        report = dict(self.stats)
+        if self.cache is not None:
+            report.update(self.cache.stats)
+            report["entries"] = len(self.cache)
+        return report
+
+
+_explainer = None
+_explainer_lock = threading.Lock()
+
+
+def _default_backend():
+    if GEMINI_BACKEND == "fake":
+        return FakeGeminiBackend()
+    return GeminiBackend(GEMINI_MODEL)
+
+
+def get_explainer():
+    # Built on first question, so importing this module needs neither the SDK nor a key
+    global _explainer
+    with _explainer_lock:
+        if _explainer is None:
+            _explainer = Explainer(_default_backend(), ExplanationCache.persistent())
+        return _explainer
+
+
+def set_explainer_backend(backend, cache=None):
+    # Swap the Gemini backend, e.g. for a FakeGeminiBackend in tests and load runs
+    global _explainer
+    with _explainer_lock:
+        _explainer = Explainer(backend, cache if cache is not None else ExplanationCache())
+        return _explainer
+
+
+register_collector("gemini", lambda: _explainer.report() if _explainer is not None else {})
+
+
+@timed("gemini.ask_gemini")
 def ask_gemini(question, trip_summary):
-    prompt = (
-        "You are a CO₂ emissions expert for logistics. "
-        "Explain TTW, WTT, WTW and suggest how to reduce emissions.\n\n"
-        f"Trip Info:\n{trip_summary}\n\n"
-        f"Question: {question}"
-    )
-    response = model.generate_content(prompt)
-    return response.text
+    return get_explainer().ask(build_prompt(question, trip_summary))
+
+
+def stream_gemini(question, trip_summary):
+    """ask_gemini, yielding the answer in chunks as they arrive (for st.write_stream).
 
+    Timed as "gemini.stream_gemini" (the whole answer) and
+    "gemini.stream_gemini.first_token" (until the first chunk is ready).
+    """
+    start = time.perf_counter()
+    first = True
+    with timer("gemini.stream_gemini"):
+        for chunk in get_explainer().stream(build_prompt(question, trip_summary)):
+            if first and instrumentation_enabled():
+                observe("gemini.stream_gemini.first_token", time.perf_counter() - start)
+            first = False
+            yield chunk
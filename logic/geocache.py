@@ -0,0 +1,201 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from geopy.geocoders import Nominatim
+
+CACHE_DIR = os.getenv("GREENROUTE_CACHE_DIR", ".greenroute_cache")
+
+
+def normalize_place(name):
+    return " ".join(name.lower().split())
+
+
+class NominatimGeocoder:
+    """Live geocoder backed by OpenStreetMap Nominatim."""
+
+    def __init__(self, user_agent="greenroute_app", timeout=10, domain="nominatim.openstreetmap.org", scheme="https"):
+        self._geolocator = Nominatim(user_agent=user_agent, domain=domain, scheme=scheme)
+        self.timeout = timeout
+
+    def geocode(self, place):
+        location = self._geolocator.geocode(place, timeout=self.timeout)
+        if location:
+            return [location.latitude, location.longitude]
+        return None
+
+
+class StaticGeocoder:
+    """Offline geocoder answering from a fixed {place: (lat, lon)} mapping."""
+
+    def __init__(self, places):
+        self.places = {normalize_place(name): [float(lat), float(lon)] for name, (lat, lon) in places.items()}
+        self.calls = 0
+
+    def geocode(self, place):
+        self.calls += 1
+        coords = self.places.get(normalize_place(place))
+        return list(coords) if coords else None
+
+
+class LRUCache:
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteGeocodeStore:
+    """On-disk geocode store with TTL expiry and least-recently-used eviction."""
+
+    def __init__(self, path=None, ttl_seconds=30 * 24 * 3600, max_entries=50_000):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "geocode.sqlite")
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            "place TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS geocode_accessed ON geocode (accessed)")
+        self._conn.commit()
+
+    def get(self, place):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT lat, lon, created FROM geocode WHERE place = ?", (place,)).fetchone()
+            if row is None:
+                return None
+            lat, lon, created = row
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM geocode WHERE place = ?", (place,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE geocode SET accessed = ? WHERE place = ?", (now, place))
+            self._conn.commit()
+            return [lat, lon]
+
+    def put(self, place, coords):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode (place, lat, lon, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (place, coords[0], coords[1], now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM geocode WHERE place IN "
+                    "(SELECT place FROM geocode ORDER BY accessed ASC LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+            self._conn.commit()
+
+    def purge_expired(self):
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM geocode WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class GeocodeCache:
+    """Two-tier geocode cache: in-process LRU in front of an optional SQLite store.
+
+    Lookups are keyed by the normalized place name. Only successful results are
+    cached, so a misspelt city is retried rather than remembered as missing.
+    """
+
+    def __init__(self, backend, store=None, memory_size=512):
+        self.backend = backend
+        self.store = store
+        self.memory = LRUCache(memory_size)
+        self.stats = Counter()
+
+    def cached(self, place):
+        # Cache-only lookup; counts a miss but does not call the backend
+        key = normalize_place(place)
+
+        coords = self.memory.get(key)
+        if coords is not None:
+            self.stats["memory_hits"] += 1
+            return list(coords)
+
+        if self.store is not None:
+            coords = self.store.get(key)
+            if coords is not None:
+                self.stats["disk_hits"] += 1
+                self.memory.put(key, coords)
+                return list(coords)
+
+        self.stats["misses"] += 1
+        return None
+
+    def remember(self, place, coords):
+        key = normalize_place(place)
+        self.memory.put(key, coords)
+        if self.store is not None:
+            self.store.put(key, coords)
+
+    def geocode(self, place):
+        coords = self.cached(place)
+        if coords is not None:
+            return coords
+
+        coords = self.backend.geocode(place)
+        if coords is not None:
+            self.remember(place, coords)
+        return coords
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def report(self):
+        report = dict(self.stats)
+        report["hit_rate"] = round(self.hit_rate(), 4)
+        report["memory_entries"] = len(self.memory)
+        if self.store is not None:
+            report["disk_entries"] = len(self.store)
+            report["disk_evictions"] = self.store.evictions
+        return report
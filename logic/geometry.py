@@ -0,0 +1,176 @@
+import heapq
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+FIXED_POINT_SCALE = 1_000_000
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    # Great-circle distance in km; broadcasts over NumPy arrays of degrees
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def as_latlon_array(coords):
+    coords = np.asarray(coords, dtype=np.float64)
+    return coords.reshape(-1, 2)
+
+
+def segment_lengths_km(coords):
+    # Length of each polyline segment; one fewer entry than there are vertices
+    coords = as_latlon_array(coords)
+    if len(coords) < 2:
+        return np.zeros(0)
+    return haversine_km(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+
+def cumulative_distance_km(coords, total_km=None):
+    """Distance from the first vertex to every vertex along the polyline.
+
+    When total_km is given (e.g. the road distance reported by the router),
+    segment lengths are scaled so the last entry equals it; the polyline is
+    only an approximation of the road, but its shape still says where along
+    the trip each vertex sits.
+    """
+    lengths = segment_lengths_km(coords)
+    cumulative = np.concatenate([[0.0], np.cumsum(lengths)])
+    if total_km is not None and cumulative[-1] > 0:
+        cumulative *= total_km / cumulative[-1]
+    return cumulative
+
+
+def resample_by_distance(cumulative_km, step_km):
+    # Indices of the first vertex at or past every step_km mark, always
+    # including the first and last vertex
+    cumulative_km = np.asarray(cumulative_km, dtype=np.float64)
+    if len(cumulative_km) == 0:
+        return np.zeros(0, dtype=np.int64)
+    marks = np.arange(0.0, cumulative_km[-1], step_km)
+    indices = np.searchsorted(cumulative_km, marks, side="left")
+    indices = np.append(indices, len(cumulative_km) - 1)
+    return np.unique(indices)
+
+
+def _project_m(coords):
+    # Local equirectangular projection in metres, good enough for tolerances of
+    # a few hundred metres along a single route
+    lat0 = np.radians(np.mean(coords[:, 0]))
+    x = np.radians(coords[:, 1]) * np.cos(lat0) * EARTH_RADIUS_KM * 1000
+    y = np.radians(coords[:, 0]) * EARTH_RADIUS_KM * 1000
+    return x, y
+
+
+def _rdp_mask(coords, tolerance_m):
+    x, y = _project_m(coords)
+    keep = np.zeros(len(coords), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        norm = np.hypot(dx, dy)
+        if norm == 0:
+            dist = np.hypot(px, py)
+        else:
+            dist = np.abs(px * dy - py * dx) / norm
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_m:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def _visvalingam_mask(coords, tolerance_m):
+    # Drops the vertex with the smallest triangle area until every remaining
+    # triangle is larger than tolerance_m ** 2
+    x, y = _project_m(coords)
+    n = len(coords)
+    prev = np.arange(-1, n - 1)
+    nxt = np.arange(1, n + 1)
+    keep = np.ones(n, dtype=bool)
+
+    def area(i):
+        a, b = prev[i], nxt[i]
+        return abs((x[a] - x[i]) * (y[b] - y[i]) - (x[b] - x[i]) * (y[a] - y[i])) / 2
+
+    threshold = tolerance_m ** 2
+    heap = [(area(i), i) for i in range(1, n - 1)]
+    heapq.heapify(heap)
+    current = {i: a for a, i in heap}
+    while heap:
+        a, i = heapq.heappop(heap)
+        if not keep[i] or current.get(i) != a:
+            continue
+        if a > threshold:
+            break
+        keep[i] = False
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if 0 < j < n - 1:
+                current[j] = area(j)
+                heapq.heappush(heap, (current[j], j))
+    return keep
+
+
+def simplify(coords, tolerance_m=25.0, method="rdp"):
+    """Simplify a [lat, lon] polyline for display.
+
+    method is "rdp" (Ramer-Douglas-Peucker: no dropped vertex lies further
+    than tolerance_m from the simplified line) or "visvalingam" (drops
+    vertices whose triangle area is below tolerance_m ** 2). Endpoints are
+    always kept. Use the full-resolution polyline for distance maths.
+    """
+    coords = as_latlon_array(coords)
+    if len(coords) < 3 or tolerance_m <= 0:
+        return coords
+    if method == "rdp":
+        keep = _rdp_mask(coords, tolerance_m)
+    elif method == "visvalingam":
+        keep = _visvalingam_mask(coords, tolerance_m)
+    else:
+        raise ValueError(f"Unknown simplification method: {method}")
+    return coords[keep]
+
+
+def to_fixed_point(coords, scale=FIXED_POINT_SCALE):
+    # [lat, lon] degrees -> (n, 2) int32 array; 1e6 keeps ~0.1 m precision
+    return np.round(as_latlon_array(coords) * scale).astype(np.int32)
+
+
+def from_fixed_point(fixed, scale=FIXED_POINT_SCALE):
+    return np.asarray(fixed, dtype=np.int32).reshape(-1, 2) / scale
+
+
+def encode_polyline(coords, precision=5):
+    """Google encoded polyline string for a [lat, lon] polyline."""
+    fixed = np.round(as_latlon_array(coords) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(fixed, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    chunks = []
+    for value in ((deltas << 1) ^ (deltas >> 63)).tolist():
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def decode_polyline(encoded, precision=5):
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    deltas = np.asarray(values, dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / 10 ** precision
@@ -0,0 +1,189 @@
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Off unless GREENROUTE_METRICS is set; enable()/disable() switch it at runtime
+_enabled = os.getenv("GREENROUTE_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+# Latency bucket upper bounds in seconds (Prometheus-style, cumulative on export)
+BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Call count, total and bucketed latency of one instrumented operation."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last slot: above the largest bound
+
+    def observe(self, seconds, error=False):
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th call; good enough for a debug panel
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (self.max,), self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_s": round(self.total, 6),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.buckets)),
+        }
+
+
+_lock = threading.Lock()
+_histograms = {}
+_collectors = {}
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def observe(name, seconds, error=False):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds, error)
+
+
+def timed(name):
+    """Decorator recording the latency of every call under name while enabled.
+
+    When instrumentation is off a call costs one extra function frame and a
+    flag check.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            error = True
+            try:
+                result = func(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                observe(name, time.perf_counter() - start, error)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def _timing(name):
+    start = time.perf_counter()
+    error = True
+    try:
+        yield
+        error = False
+    finally:
+        observe(name, time.perf_counter() - start, error)
+
+
+class _NoTiming:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_TIMING = _NoTiming()
+
+
+def timer(name):
+    # with timer("ui.render_map"): ... ; a shared no-op object when disabled
+    return _timing(name) if _enabled else _NO_TIMING
+
+
+def register_collector(name, collect):
+    # collect() -> {stat: number}, e.g. a cache's hit/miss counters; read at export time
+    _collectors[name] = collect
+
+
+def snapshot():
+    with _lock:
+        timings = {name: h.as_dict() for name, h in sorted(_histograms.items())}
+    caches = {}
+    for name, collect in sorted(_collectors.items()):
+        stats = dict(collect())
+        hits = sum(v for k, v in stats.items() if k.endswith("hits"))
+        total = hits + stats.get("misses", 0)
+        stats.setdefault("hit_rate", round(hits / total, 4) if total else 0.0)
+        caches[name] = stats
+    return {"enabled": _enabled, "timings": timings, "caches": caches}
+
+
+def to_json(indent=2):
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def to_prometheus(prefix="greenroute"):
+    """Snapshot in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = [
+        f"# HELP {prefix}_call_duration_seconds Latency of instrumented calls.",
+        f"# TYPE {prefix}_call_duration_seconds histogram",
+    ]
+    for name, h in data["timings"].items():
+        cumulative = 0
+        for bound, n in h["buckets"].items():
+            cumulative += n
+            lines.append(f'{prefix}_call_duration_seconds_bucket{{op="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{prefix}_call_duration_seconds_sum{{op="{name}"}} {h["total_s"]}')
+        lines.append(f'{prefix}_call_duration_seconds_count{{op="{name}"}} {h["count"]}')
+    lines.append(f"# TYPE {prefix}_call_errors_total counter")
+    for name, h in data["timings"].items():
+        lines.append(f'{prefix}_call_errors_total{{op="{name}"}} {h["errors"]}')
+    lines.append(f"# TYPE {prefix}_cache_stat gauge")
+    for cache, stats in data["caches"].items():
+        for stat, value in stats.items():
+            if isinstance(value, (int, float)):
+                lines.append(f'{prefix}_cache_stat{{cache="{cache}",stat="{_metric_name(stat)}"}} {value}')
+    return "\n".join(lines) + "\n"
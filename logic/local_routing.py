@@ -0,0 +1,409 @@
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+from logic.backends import RoutingBackend, RoutingError
+from logic.geometry import EARTH_RADIUS_KM, haversine_km
+
+GRAPH_FORMAT_VERSION = 1
+# Start and end points farther than this from every graph node are refused rather than snapped
+MAX_SNAP_KM = 5.0
+# Cell size of the node grid used for snapping, in degrees (about 1 km north-south)
+SNAP_CELL_DEG = 0.01
+_KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180
+_ARRAYS = ("lat", "lon", "indptr", "indices", "weights", "rev_indptr", "rev_indices", "rev_weights")
+# OSM highway values build_graph_from_osm keeps as drivable roads
+OSM_HIGHWAYS = frozenset({
+    "motorway", "motorway_link", "trunk", "trunk_link", "primary", "primary_link", "secondary", "secondary_link",
+    "tertiary", "tertiary_link", "unclassified", "residential", "living_street", "service", "road",
+})
+
+
+def _csr(n_nodes, src, dst, weights):
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+    # int32 offsets halve the per-node index while the edge count allows it
+    if indptr[-1] < 2 ** 31:
+        indptr = indptr.astype(np.int32)
+    return indptr, dst[order].astype(np.int32), weights[order].astype(np.float32)
+
+
+def build_graph(path, lat, lon, src, dst, length_m=None, bidirectional=True):
+    """Preprocess an edge list into the on-disk CSR layout LocalGraphBackend reads.
+
+    lat/lon are per-node degrees; src/dst index into them. Edge weights are
+    lengths in metres (the straight-line length when length_m is None), which
+    keeps the great-circle A* heuristic admissible. Forward and reverse CSR
+    arrays (int32 offsets and targets, float32 weights) are written as plain
+    .npy files so they can be memory-mapped; zip-compressed .npz members
+    could not be.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    if length_m is None:
+        length_m = haversine_km(lat[src], lon[src], lat[dst], lon[dst]) * 1000
+    length_m = np.asarray(length_m, dtype=np.float64)
+
+    if bidirectional:
+        src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+        length_m = np.concatenate([length_m, length_m])
+
+    n_nodes = len(lat)
+    indptr, indices, weights = _csr(n_nodes, src, dst, length_m)
+    rev_indptr, rev_indices, rev_weights = _csr(n_nodes, dst, src, length_m)
+
+    os.makedirs(path, exist_ok=True)
+    arrays = dict(lat=lat, lon=lon, indptr=indptr, indices=indices, weights=weights,
+                  rev_indptr=rev_indptr, rev_indices=rev_indices, rev_weights=rev_weights)
+    for name, values in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": GRAPH_FORMAT_VERSION, "nodes": n_nodes, "edges": int(len(indices))}, f)
+    return path
+
+
+def _open_osm(osm_path):
+    if osm_path.endswith(".bz2"):
+        import bz2
+        return bz2.open(osm_path, "rb")
+    if osm_path.endswith(".gz"):
+        import gzip
+        return gzip.open(osm_path, "rb")
+    return open(osm_path, "rb")
+
+
+def _oneway(tags):
+    # 1 forward only, -1 backward only, 0 both ways
+    value = tags.get("oneway")
+    if value in ("yes", "true", "1"):
+        return 1
+    if value == "-1":
+        return -1
+    if value is None and (tags.get("highway") == "motorway" or tags.get("junction") == "roundabout"):
+        return 1
+    return 0
+
+
+def read_osm_roads(osm_path, highways=OSM_HIGHWAYS):
+    """Node coordinates and drivable ways of an OSM XML extract (.osm, .osm.bz2 or .osm.gz).
+
+    Returns ({node id: (lat, lon)}, [(node ids, oneway), ...]). The file is
+    parsed incrementally and every element is cleared once read. PBF
+    extracts need converting first, e.g. with osmium cat.
+    """
+    from xml.etree.ElementTree import iterparse
+
+    coords, ways = {}, []
+    with _open_osm(osm_path) as f:
+        for _, elem in iterparse(f):
+            if elem.tag == "node":
+                coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+                elem.clear()
+            elif elem.tag == "way":
+                tags = {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+                if tags.get("highway") in highways:
+                    ways.append(([int(nd.get("ref")) for nd in elem.iter("nd")], _oneway(tags)))
+                elem.clear()
+    return coords, ways
+
+
+def build_graph_from_osm(osm_path, path, highways=OSM_HIGHWAYS):
+    """build_graph from an OSM extract: drivable ways become directed edges between their nodes.
+
+    One-way streets (oneway=yes/-1, motorways, roundabouts) only get an edge
+    in the direction of travel. Nodes no kept way touches are dropped.
+    """
+    coords, ways = read_osm_roads(osm_path, highways)
+    ids = {}
+    src, dst = [], []
+    for refs, oneway in ways:
+        refs = [ref for ref in refs if ref in coords]
+        nodes = [ids.setdefault(ref, len(ids)) for ref in refs]
+        for a, b in zip(nodes, nodes[1:]):
+            if oneway >= 0:
+                src.append(a)
+                dst.append(b)
+            if oneway <= 0:
+                src.append(b)
+                dst.append(a)
+    if not src:
+        raise ValueError(f"No drivable roads in {osm_path}")
+    lat, lon = np.array([coords[ref] for ref in ids], dtype=np.float64).T
+    return build_graph(path, lat, lon, src, dst, bidirectional=False)
+
+
+class NodeGrid:
+    """Graph nodes bucketed by lat/lon cell, so snapping a point looks at nearby cells only.
+
+    Node ids are sorted by cell once; a query walks square rings of cells
+    outwards from the point's cell and stops as soon as no unvisited cell can
+    hold a closer node, or once the rings are wider than max_km.
+    """
+
+    def __init__(self, lat, lon, cell_deg=SNAP_CELL_DEG):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.lat0, self.lon0 = float(self.lat.min()), float(self.lon.min())
+        rows, cols = self._cells(self.lat, self.lon)
+        self.n_rows, self.n_cols = int(rows.max()) + 1, int(cols.max()) + 1
+        cell = rows * self.n_cols + cols
+        self.order = np.argsort(cell, kind="stable")
+        self.cell_ids, starts = np.unique(cell[self.order], return_index=True)
+        self.bounds = np.append(starts, len(cell))
+
+    def _cells(self, lat, lon):
+        row = np.floor((np.asarray(lat) - self.lat0) / self.cell_deg).astype(np.int64)
+        col = np.floor((np.asarray(lon) - self.lon0) / self.cell_deg).astype(np.int64)
+        return row, col
+
+    def _ring(self, row, col, r):
+        # Node ids in the cells exactly r rings away from (row, col)
+        rows = range(max(row - r, 0), min(row + r, self.n_rows - 1) + 1)
+        cols = range(max(col - r, 0), min(col + r, self.n_cols - 1) + 1)
+        cells = [i * self.n_cols + j for i in rows for j in cols if max(abs(i - row), abs(j - col)) == r]
+        if not cells:
+            return np.zeros(0, dtype=np.int64)
+        cells = np.array(cells, dtype=np.int64)
+        pos = np.searchsorted(self.cell_ids, cells)
+        pos = pos[(pos < len(self.cell_ids)) & (self.cell_ids[np.minimum(pos, len(self.cell_ids) - 1)] == cells)]
+        if not len(pos):
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([self.order[a:b] for a, b in zip(self.bounds[pos], self.bounds[pos + 1])])
+
+    def nearest(self, lat, lon, max_km=MAX_SNAP_KM):
+        """(node, km) of the node closest to the point, or (None, inf) when none is within max_km."""
+        row, col = (int(v) for v in self._cells(lat, lon))
+        best, best_km = None, math.inf
+        last_ring = max(abs(row), abs(row - self.n_rows + 1), abs(col), abs(col - self.n_cols + 1))
+        for r in range(last_ring + 1):
+            # Ring r is at least r - 1 whole cells away along one axis; cos() of the most
+            # poleward latitude it reaches bounds the east-west cell width
+            reach = min(abs(lat) + (r + 1) * self.cell_deg, 90.0)
+            cell_km = self.cell_deg * _KM_PER_DEG * math.cos(math.radians(reach))
+            if (r - 1) * cell_km >= min(best_km, max_km):
+                break
+            nodes = self._ring(row, col, r)
+            if len(nodes):
+                km = haversine_km(lat, lon, self.lat[nodes], self.lon[nodes])
+                i = int(np.argmin(km))
+                if km[i] < best_km:
+                    best, best_km = int(nodes[i]), float(km[i])
+        if best_km > max_km:
+            return None, math.inf
+        return best, best_km
+
+
+class LocalGraphBackend(RoutingBackend):
+    """Routing over a preprocessed road graph, with no network access.
+
+    Shortest paths use A* with a great-circle heuristic, or bidirectional
+    Dijkstra. Alternatives come from the penalty method: edges of the routes
+    found so far are made more expensive and the search is repeated, keeping
+    candidates that share at most share_factor of their length with every
+    earlier route. Points are snapped to the nearest node through a NodeGrid
+    built on first use; a point more than max_snap_km from every node raises
+    RoutingError.
+    """
+
+    def __init__(self, path, profile="local:driving-car", algorithm="astar", penalty=1.4, mmap=True,
+                 max_snap_km=MAX_SNAP_KM, snap_cell_deg=SNAP_CELL_DEG):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != GRAPH_FORMAT_VERSION:
+            raise RoutingError(f"Unsupported graph format version {meta.get('version')} in {path}")
+
+        mode = "r" if mmap else None
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode))
+        self.path = path
+        self.profile = profile
+        self.algorithm = algorithm
+        self.penalty = penalty
+        self.n_nodes = meta["nodes"]
+        self.max_snap_km = max_snap_km
+        self.snap_cell_deg = snap_cell_deg
+        self._grid = None
+
+    def nearest_node(self, lat, lon):
+        if self._grid is None:
+            self._grid = NodeGrid(self.lat, self.lon, self.snap_cell_deg)
+        node, _ = self._grid.nearest(float(lat), float(lon), self.max_snap_km)
+        if node is None:
+            raise RoutingError(f"No road within {self.max_snap_km:g} km of [{lat}, {lon}] in {self.path}")
+        return node
+
+    def _neighbours(self, node, reverse=False):
+        if reverse:
+            a, b = self.rev_indptr[node], self.rev_indptr[node + 1]
+            return range(a, b), self.rev_indices[a:b].tolist(), self.rev_weights[a:b].tolist()
+        a, b = self.indptr[node], self.indptr[node + 1]
+        return range(a, b), self.indices[a:b].tolist(), self.weights[a:b].tolist()
+
+    def _astar(self, source, target, penalties):
+        # Great-circle metres to the target, computed once per node the search reaches
+        target_lat, target_lon = math.radians(float(self.lat[target])), math.radians(float(self.lon[target]))
+        cos_target = math.cos(target_lat)
+        estimates = {}
+
+        def estimate(node):
+            metres = estimates.get(node)
+            if metres is None:
+                lat, lon = math.radians(float(self.lat[node])), math.radians(float(self.lon[node]))
+                a = math.sin((target_lat - lat) / 2) ** 2 + \
+                    math.cos(lat) * cos_target * math.sin((target_lon - lon) / 2) ** 2
+                metres = estimates[node] = 2000 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+            return metres
+
+        best = {source: 0.0}
+        pred = {source: (None, None)}
+        heap = [(0.0, 0.0, source)]
+        done = set()
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                return self._unwind(pred, target)
+            if node in done:
+                continue
+            done.add(node)
+
+            positions, targets, weights = self._neighbours(node)
+            for pos, nxt, weight in zip(positions, targets, weights):
+                new_cost = cost + weight * penalties.get((node, nxt), 1.0)
+                if new_cost < best.get(nxt, float("inf")):
+                    best[nxt] = new_cost
+                    pred[nxt] = (node, pos)
+                    heapq.heappush(heap, (new_cost + estimate(nxt), new_cost, nxt))
+        return None
+
+    def _bidirectional(self, source, target, penalties):
+        if source == target:
+            return [source], []
+        dist = ({source: 0.0}, {target: 0.0})
+        pred = ({source: (None, None)}, {target: (None, None)})
+        heaps = ([(0.0, source)], [(0.0, target)])
+        done = (set(), set())
+        best, meeting = float("inf"), None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            cost, node = heapq.heappop(heaps[side])
+            if node in done[side]:
+                continue
+            done[side].add(node)
+
+            positions, targets, weights = self._neighbours(node, reverse=bool(side))
+            for pos, nxt, weight in zip(positions, targets, weights):
+                # Penalties are keyed by the forward (from, to) node pair
+                edge = (nxt, node) if side else (node, nxt)
+                new_cost = cost + weight * penalties.get(edge, 1.0)
+                if new_cost < dist[side].get(nxt, float("inf")):
+                    dist[side][nxt] = new_cost
+                    pred[side][nxt] = (node, pos)
+                    heapq.heappush(heaps[side], (new_cost, nxt))
+                other = dist[1 - side].get(nxt)
+                if other is not None and new_cost + other < best:
+                    best, meeting = new_cost + other, nxt
+
+        if meeting is None:
+            return None
+        forward_nodes, forward_edges = self._unwind(pred[0], meeting)
+        node, edges = meeting, []
+        backward_nodes = []
+        while pred[1][node][0] is not None:
+            node, _ = pred[1][node]
+            backward_nodes.append(node)
+        for a, b in zip([meeting] + backward_nodes, backward_nodes):
+            edges.append(self._edge_position(a, b))
+        return forward_nodes + backward_nodes, forward_edges + edges
+
+    def _edge_position(self, a, b):
+        positions, targets, _ = self._neighbours(a)
+        return positions[targets.index(b)]
+
+    def _unwind(self, pred, node):
+        nodes, edges = [node], []
+        while pred[node][0] is not None:
+            node, pos = pred[node]
+            nodes.append(node)
+            edges.append(pos)
+        return nodes[::-1], edges[::-1]
+
+    def shortest_path(self, source, target, penalties=None):
+        search = self._bidirectional if self.algorithm == "bidirectional" else self._astar
+        return search(source, target, penalties or {})
+
+    def _route(self, nodes, edges):
+        metres = float(np.sum(self.weights[edges])) if edges else 0.0
+        coords = np.column_stack([self.lat[nodes], self.lon[nodes]]).tolist()
+        return {"coordinates": coords, "distance_km": round(metres / 1000, 2)}
+
+    def directions(self, start, end, alternative_routes=None):
+        source = self.nearest_node(*start)
+        target = self.nearest_node(*end)
+        found = self.shortest_path(source, target)
+        if found is None:
+            raise RoutingError(f"No path between nodes {source} and {target} in {self.path}")
+
+        paths = [found]
+        if alternative_routes:
+            share_factor = alternative_routes.get("share_factor", 0.6)
+            target_count = alternative_routes.get("target_count", 1)
+            penalties = {}
+            for _ in range(4 * target_count):
+                if len(paths) > target_count:
+                    break
+                nodes = paths[-1][0]
+                for edge in zip(nodes, nodes[1:]):
+                    penalties[edge] = penalties.get(edge, 1.0) * self.penalty
+                candidate = self.shortest_path(source, target, penalties)
+                if candidate is None:
+                    break
+                if all(self._shared_fraction(candidate[1], kept[1]) <= share_factor for kept in paths):
+                    paths.append(candidate)
+
+        return [self._route(nodes, edges) for nodes, edges in paths]
+
+    def _distances_from(self, source, targets):
+        # Plain Dijkstra from source, stopping once every target is settled
+        remaining = set(targets)
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        done = set()
+        while heap and remaining:
+            cost, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            remaining.discard(node)
+            _, nexts, weights = self._neighbours(node)
+            for nxt, weight in zip(nexts, weights):
+                new_cost = cost + weight
+                if new_cost < dist.get(nxt, float("inf")):
+                    dist[nxt] = new_cost
+                    heapq.heappush(heap, (new_cost, nxt))
+        return [dist[t] if t in done else float("nan") for t in targets]
+
+    def matrix(self, locations):
+        # One single-source search per distinct origin node instead of n * n point-to-point queries
+        nodes = [self.nearest_node(lat, lon) for lat, lon in locations]
+        rows = {}
+        for node in nodes:
+            if node not in rows:
+                rows[node] = self._distances_from(node, nodes)
+        return np.array([rows[node] for node in nodes], dtype=np.float64) / 1000
+
+    def _shared_fraction(self, edges, other_edges):
+        if not edges:
+            return 1.0
+        shared = np.intersect1d(edges, other_edges)
+        total = float(np.sum(self.weights[edges]))
+        return float(np.sum(self.weights[shared])) / total if total else 1.0
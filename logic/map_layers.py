@@ -0,0 +1,275 @@
+import json
+import math
+
+import numpy as np
+
+from logic.geometry import EARTH_RADIUS_KM, as_latlon_array
+
+# Above this many markers individual folium.Marker objects give way to one clustered layer
+MAX_INDIVIDUAL_MARKERS = 50
+# Aim for about this many non-empty cells whatever the map extent
+TARGET_CELLS = 300
+MAX_HEAT_POINTS = 2000
+
+# Light to dark: low to high emissions per cell
+CELL_COLORS = ("#1a9850", "#91cf60", "#fee08b", "#fc8d59", "#d73027")
+
+_SQRT3 = math.sqrt(3.0)
+_HEX_CORNERS = np.radians(30 + 60 * np.arange(6))
+
+# Client-side marker factory for FastMarkerCluster: each row is [lat, lon, tooltip, color]
+_MARKER_CALLBACK = """function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+        {radius: 6, color: row[3], fillColor: row[3], fillOpacity: 0.9, weight: 1});
+    marker.bindTooltip(row[2]);
+    return marker;
+}"""
+
+
+def _project_km(lat, lon, lat0):
+    # Equirectangular projection about lat0; cells stay near-square over a country or a fleet's area
+    x = np.radians(lon) * math.cos(math.radians(lat0)) * EARTH_RADIUS_KM
+    y = np.radians(lat) * EARTH_RADIUS_KM
+    return x, y
+
+
+def _unproject_km(x, y, lat0):
+    lat = np.degrees(y / EARTH_RADIUS_KM)
+    lon = np.degrees(x / (EARTH_RADIUS_KM * math.cos(math.radians(lat0))))
+    return lat, lon
+
+
+_STEPS = (1, 2, 5)
+
+
+def _nice_steps(start):
+    # 1, 2 or 5 x 10^k from the first step >= start upwards, so cell sizes read well in a legend
+    exponent = math.floor(math.log10(start))
+    while True:
+        for mantissa in _STEPS:
+            step = mantissa * 10.0 ** exponent
+            if step >= start:
+                yield step
+        exponent += 1
+
+
+def lod_cell_km(lat, lon, target_cells=TARGET_CELLS, min_km=0.5):
+    """Cell size in km for the map extent covered by lat/lon.
+
+    Starts from the bounding-box diagonal split into target_cells and grows
+    the size until at most target_cells cells are occupied, so a single route
+    (a thin band) and a fleet spread over a region both end up with a
+    similar number of cells to draw.
+    """
+    lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+    if lat.size == 0:
+        return min_km
+    x, y = _project_km(lat, lon, float((lat.min() + lat.max()) / 2))
+    diagonal = math.hypot(float(np.ptp(x)), float(np.ptp(y)))
+    for step in _nice_steps(max(min_km, diagonal / max(target_cells, 1))):
+        keys = _cell_keys(np.floor(x / step).astype(np.int64), np.floor(y / step).astype(np.int64))
+        if len(np.unique(keys)) <= target_cells:
+            return step
+
+
+def _cell_keys(i, j):
+    # One int64 per (i, j) pair: np.unique on a flat array is far faster than on rows
+    i, j = i - i.min(), j - j.min()
+    return i * (int(j.max()) + 1) + j
+
+
+def _hex_round(q, r):
+    # Cube-coordinate rounding of fractional axial coordinates, vectorized
+    s = -q - r
+    rq, rr, rs = np.rint(q), np.rint(r), np.rint(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def bin_emissions(lat, lon, values, cell_km=None, kind="hex", lat0=None):
+    """Sum values (e.g. per-segment kg CO2e) into square or hexagonal cells.
+
+    kind="square" uses cell_km x cell_km squares, kind="hex" pointy-top
+    hexagons cell_km across the flats (an H3-like tiling without the H3
+    dependency). cell_km defaults to lod_cell_km. Everything is one NumPy
+    pass: points are projected, assigned integer cell coordinates, and
+    reduced with np.unique/np.bincount.
+
+    Returns {"lat", "lon" (cell centres), "value" (sum), "count",
+    "polygons" ((cells, corners, 2) [lat, lon] outlines), "cell_km", "kind"}.
+    The values' total is preserved exactly.
+    """
+    lat = np.asarray(lat, dtype=np.float64).reshape(-1)
+    lon = np.asarray(lon, dtype=np.float64).reshape(-1)
+    values = np.broadcast_to(np.asarray(values, dtype=np.float64), lat.shape)
+    if kind not in ("hex", "square"):
+        raise ValueError(f"Unknown cell kind: {kind}")
+    if cell_km is None:
+        cell_km = lod_cell_km(lat, lon)
+    if lat0 is None:
+        lat0 = float((lat.min() + lat.max()) / 2) if lat.size else 0.0
+    x, y = _project_km(lat, lon, lat0)
+
+    if kind == "square":
+        i, j = np.floor(x / cell_km).astype(np.int64), np.floor(y / cell_km).astype(np.int64)
+    else:
+        size = cell_km / _SQRT3  # centre to corner
+        i, j = _hex_round((_SQRT3 / 3 * x - y / 3) / size, (2 / 3 * y) / size)
+
+    if lat.size:
+        _, first, inverse = np.unique(_cell_keys(i, j), return_index=True, return_inverse=True)
+    else:
+        first = inverse = np.zeros(0, dtype=np.int64)
+    inverse = inverse.reshape(-1)
+    totals = np.bincount(inverse, weights=values, minlength=len(first))
+    counts = np.bincount(inverse, minlength=len(first))
+    ci, cj = i[first].astype(np.float64), j[first].astype(np.float64)
+
+    if kind == "square":
+        cx, cy = (ci + 0.5) * cell_km, (cj + 0.5) * cell_km
+        half = cell_km / 2
+        dx = np.array([-half, half, half, -half])
+        dy = np.array([-half, -half, half, half])
+    else:
+        cx, cy = size * _SQRT3 * (ci + cj / 2), size * 1.5 * cj
+        dx, dy = size * np.cos(_HEX_CORNERS), size * np.sin(_HEX_CORNERS)
+
+    center_lat, center_lon = _unproject_km(cx, cy, lat0)
+    corner_lat, corner_lon = _unproject_km(cx[:, None] + dx[None, :], cy[:, None] + dy[None, :], lat0)
+    return {
+        "lat": center_lat,
+        "lon": center_lon,
+        "value": totals,
+        "count": counts,
+        "polygons": np.stack([corner_lat, corner_lon], axis=-1),
+        "cell_km": cell_km,
+        "kind": kind,
+    }
+
+
+def profile_segments(profile, key="WTW"):
+    # Per-segment emissions placed at segment midpoints, from a cumulative emission_profile
+    lat, lon = np.asarray(profile["lat"]), np.asarray(profile["lon"])
+    if len(lat) < 2:
+        return lat, lon, np.zeros(len(lat))
+    return (lat[:-1] + lat[1:]) / 2, (lon[:-1] + lon[1:]) / 2, np.diff(np.asarray(profile[key]))
+
+
+def bin_profiles(profiles, key="WTW", cell_km=None, kind="hex"):
+    """bin_emissions over the segments of one or many routes (e.g. a fleet), on one grid."""
+    parts = [profile_segments(p, key) for p in profiles if p is not None]
+    if not parts:
+        return bin_emissions([], [], [], cell_km=cell_km or 1.0, kind=kind)
+    lat, lon, values = (np.concatenate(arrays) for arrays in zip(*parts))
+    return bin_emissions(lat, lon, values, cell_km=cell_km, kind=kind)
+
+
+def cell_colors(values, palette=CELL_COLORS):
+    # Quantile classes, so one hot cell does not wash out the rest of the map
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return np.array([], dtype=object)
+    edges = np.quantile(values, np.linspace(0, 1, len(palette) + 1)[1:-1])
+    return np.asarray(palette, dtype=object)[np.searchsorted(edges, values, side="right")]
+
+
+def cells_geojson(bins, decimals=5, unit="kg CO₂e"):
+    """GeoJSON FeatureCollection of the non-empty cells, colour and totals in properties."""
+    colors = cell_colors(bins["value"])
+    polygons = np.round(bins["polygons"][..., ::-1], decimals)  # GeoJSON wants [lon, lat]
+    features = []
+    for k in range(len(bins["value"])):
+        ring = polygons[k].tolist()
+        ring.append(ring[0])
+        value = round(float(bins["value"][k]), 2)
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+            "properties": {"value": value, "count": int(bins["count"][k]), "color": colors[k],
+                           "label": f"{value} {unit}"},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def heat_points(bins, max_points=MAX_HEAT_POINTS):
+    # HeatMap input from cell centres weighted by their share of the largest cell
+    order = np.argsort(bins["value"])[::-1][:max_points]
+    peak = float(bins["value"][order[0]]) if len(order) and bins["value"][order[0]] > 0 else 1.0
+    return np.column_stack([bins["lat"][order], bins["lon"][order], bins["value"][order] / peak]).round(5).tolist()
+
+
+def downsample_markers(rows, max_markers):
+    # Evenly spaced subset that always keeps the first and last row
+    if len(rows) <= max_markers:
+        return rows
+    keep = np.unique(np.linspace(0, len(rows) - 1, max_markers).round().astype(int))
+    return [rows[k] for k in keep]
+
+
+def _marker_color(co2):
+    return "green" if co2 < 300 else "red"
+
+
+def add_markers(m, city_data, max_individual=MAX_INDIVIDUAL_MARKERS, max_markers=5000):
+    """Route markers: plain folium.Markers for a few, one FastMarkerCluster beyond that.
+
+    The clustered layer ships the points as a compact array and builds the
+    markers in the browser, so the HTML grows by a few dozen bytes per point
+    instead of a full Marker/Icon/Tooltip object each.
+    """
+    import folium
+    from folium.plugins import FastMarkerCluster
+
+    if len(city_data) <= max_individual:
+        for city in city_data:
+            folium.Marker(
+                location=[city["lat"], city["lon"]],
+                tooltip=f"{city['city']}<br>CO₂: {city['co2']} kg",
+                icon=folium.Icon(color=_marker_color(city["co2"]))
+            ).add_to(m)
+        return m
+    rows = [[round(c["lat"], 5), round(c["lon"], 5), f"{c['city']}<br>CO₂: {c['co2']} kg", _marker_color(c["co2"])]
+            for c in downsample_markers(city_data, max_markers)]
+    FastMarkerCluster(rows, callback=_MARKER_CALLBACK, name="Markers").add_to(m)
+    return m
+
+
+def add_emission_cells(m, geojson, name="CO₂ per cell"):
+    """One GeoJson layer for all cells; styling reads the precomputed colour property.
+
+    A route with no binned cells adds no layer (folium's tooltip rejects an
+    empty FeatureCollection).
+    """
+    if not geojson["features"]:
+        return m
+    import folium
+
+    folium.GeoJson(
+        geojson,
+        name=name,
+        style_function=lambda feature: {
+            "fillColor": feature["properties"]["color"],
+            "color": feature["properties"]["color"],
+            "weight": 0.5,
+            "fillOpacity": 0.55,
+        },
+        tooltip=folium.GeoJsonTooltip(fields=["label", "count"], aliases=["CO₂", "Segments"]),
+    ).add_to(m)
+    return m
+
+
+def payload_size(geojson):
+    # Bytes the cell layer adds to the page, for benchmarks and the debug panel
+    return len(json.dumps(geojson, separators=(",", ":")).encode("utf-8"))
+
+
+def fit_to(m, coords):
+    # Zoom the map to the data instead of a fixed zoom level
+    coords = as_latlon_array(coords)
+    if len(coords):
+        m.fit_bounds([coords.min(axis=0).tolist(), coords.max(axis=0).tolist()])
+    return m
@@ -1,22 +1,34 @@
 import folium
 
-def plot_map(city_data):
+from logic.geometry import simplify
+from logic.instrumentation import timed
+from logic.map_layers import add_emission_cells, add_markers, bin_profiles, cells_geojson, fit_to
+
+@timed("map.plot_map")
+def plot_map(city_data, route_coords=None, tolerance_m=25.0, profiles=None, cell_km=None, kind="hex"):
+    """Route line, markers and, when profiles are given, binned emission cells.
+
+    profiles is a list of emission_profile dicts (one route or a fleet);
+    their per-segment WTW is summed into hex or square cells sized for the
+    map extent. Many markers are clustered instead of drawn one by one.
+    """
     if not city_data:
         return folium.Map(location=[0, 0], zoom_start=2)
 
     start_lat, start_lon = city_data[0]["lat"], city_data[0]["lon"]
     m = folium.Map(location=[start_lat, start_lon], zoom_start=6)
 
-    # Draw route line
-    coords = [(c["lat"], c["lon"]) for c in city_data]
+    # Draw route line, simplified for display (full route if given, else the city points)
+    if route_coords is None:
+        route_coords = [(c["lat"], c["lon"]) for c in city_data]
+    coords = simplify(route_coords, tolerance_m).tolist()
     folium.PolyLine(coords, color="blue", weight=4.5, opacity=0.8).add_to(m)
 
+    if profiles:
+        add_emission_cells(m, cells_geojson(bin_profiles(profiles, cell_km=cell_km, kind=kind)))
+
     # Add city markers
-    for city in city_data:
-        folium.Marker(
-            location=[city["lat"], city["lon"]],
-            tooltip=f"{city['city']}<br>CO₂ (Cumulative): {city['co2']} kg",
-            icon=folium.Icon(color="green" if city["co2"] < 300 else "red")
-        ).add_to(m)
+    add_markers(m, city_data)
+    fit_to(m, coords)
 
     return m
@@ -1,6 +1,23 @@
+import csv
 import json
+import re
 import pandas as pd
 
+# Output schema of the streaming parser, in column order
+TABLE_COLUMNS = [
+    "Page", "Region", "Vehicle Type", "Fuel",
+    "Combined Load Factor (%)", "Empty Running (%)",
+    "Fuel Intensity (kg/t-km)", "Fuel Intensity (l/t-km)", "Energy Intensity (kWh/t-km)",
+    "WTT (g CO2e/t-km)", "TTW (g CO2e/t-km)", "WTW (g CO2e/t-km)",
+]
+# Header words that open a table (its vehicle column)
+TABLE_STARTS = {"Vehicle", "SmartWay"}
+# Slack when matching a left-aligned word to the header it starts under
+TEXT_TOLERANCE = 0.012
+# Footnote markers ("0.020*", "0.002#") are dropped from numbers
+_NUMBER = re.compile(r"^\d+(?:[.,]\d+)?%?[*#]?$")
+
+
 def load_ocr_json(path="data/glec_raw_output.json"):
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
@@ -52,3 +69,358 @@ def parse_emission_table(lines):
 def save_to_csv(df, path="data/glec_emission_factors_parsed.csv"):
     df.to_csv(path, index=False)
     print(f"Saved parsed table to: {path}")
+
+
+# -------------------------------
+# Streaming, geometry-aware parser
+# -------------------------------
+
+def iter_ocr_pages(path="data/glec_raw_output.json", chunk_size=1 << 16):
+    """Yield one page dict at a time from a doctr export, without loading the file.
+
+    Reads .jsonl output (one page per line) line by line. For a single JSON
+    document it scans forward to the "pages" array and decodes one page
+    object at a time from a sliding text buffer, so memory is bounded by the
+    largest page rather than the document.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer = ""
+        eof = False
+
+        def fill():
+            nonlocal buffer, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer += chunk
+
+        match = None
+        while match is None:
+            match = re.search(r'"pages"\s*:\s*\[', buffer)
+            if match is None:
+                if eof:
+                    return
+                # Keep a tail in case the key straddles two chunks
+                buffer = buffer[-32:]
+                fill()
+        buffer = buffer[match.end():]
+
+        while True:
+            stripped = buffer.lstrip(" \t\r\n,")
+            if stripped.startswith("]"):
+                return
+            try:
+                page, end = decoder.raw_decode(stripped)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                buffer = stripped
+                fill()
+                continue
+            yield page
+            buffer = stripped[end:]
+
+
+def iter_page_words(page):
+    # Flatten one page into (text, x0, y0, x1, y1) in relative page coordinates
+    for block in page.get("blocks", []):
+        for line in block.get("lines", []):
+            for word in line.get("words", []):
+                (x0, y0), (x1, y1) = word["geometry"]
+                yield word["value"], x0, y0, x1, y1
+
+
+def _is_number(text):
+    return bool(_NUMBER.match(text))
+
+
+def _to_number(text):
+    return float(text.rstrip("*#").rstrip("%").replace(",", "."))
+
+
+def group_rows(words, row_tolerance=0.008):
+    """Cluster words into text rows by vertical centre.
+
+    Rows live in a dict of y-buckets (bucket height = row_tolerance), so each
+    word only compares against rows in its own and adjacent buckets instead
+    of every row on the page. Returns rows sorted top to bottom, each a list
+    of words sorted left to right.
+    """
+    buckets = {}
+    rows = []
+    for word in sorted(words, key=lambda w: (w[2] + w[4]) / 2):
+        y = (word[2] + word[4]) / 2
+        key = int(y / row_tolerance)
+        target = None
+        for k in (key - 1, key, key + 1):
+            for row_id in buckets.get(k, ()):
+                if abs(rows[row_id]["y"] - y) <= row_tolerance:
+                    target = row_id
+                    break
+            if target is not None:
+                break
+        if target is None:
+            target = len(rows)
+            rows.append({"y": y, "words": []})
+            buckets.setdefault(key, []).append(target)
+        row = rows[target]
+        row["words"].append(word)
+        row["y"] += (y - row["y"]) / len(row["words"])
+    return [(row["y"], sorted(row["words"], key=lambda w: w[1])) for row in rows]
+
+
+def _unit_column(text):
+    # Numeric column named by a header unit word, e.g. "(kg/t-km)" or "WTW"
+    lowered = text.lower()
+    if text in ("WTT", "TTW", "WTW"):
+        return f"{text} (g CO2e/t-km)"
+    if "kwh" in lowered:
+        return "Energy Intensity (kWh/t-km)"
+    if "kg/t-km" in lowered:
+        return "Fuel Intensity (kg/t-km)"
+    if lowered.endswith("t-km)") and "co" not in lowered:
+        return "Fuel Intensity (l/t-km)"
+    return None
+
+
+def _is_unit_column(name):
+    return "t-km)" in name
+
+
+def _overlaps(a, b):
+    return a[1] < b[2] and b[1] < a[2]
+
+
+def _find_tables(rows, header_depth, margin):
+    """Locate the table headers on a page.
+
+    A header starts at a "Vehicle" (or "SmartWay") word with a WTW or kWh
+    unit word to its right within header_depth below; side-by-side tables
+    are split at each start word. Returns dicts with the table's x-span, the
+    header top and bottom rows and its column anchors as [name, x0, x1].
+    """
+    starts = [(y, w) for y, words in rows for w in words if w[0] in TABLE_STARTS]
+    tables = []
+    for y, start in starts:
+        siblings = [w[1] for sy, w in starts if abs(sy - y) <= header_depth / 4 and w[1] > start[1]]
+        limit = min(siblings, default=1.0)
+        band = [(ry, words) for ry, words in rows if y - 0.005 <= ry <= y + header_depth]
+        units = [(ry, w) for ry, words in band for w in words
+                 if start[1] < w[1] and w[3] < limit and (w[0] == "WTW" or "kwh" in w[0].lower())]
+        if not units:
+            continue
+        left = start[1] - margin
+        right = min(max(w[3] for _, w in units) + margin, limit - 0.005)
+        bottom = max(ry for ry, _ in units)
+        header = [(ry, [w for w in words if left <= w[1] and w[3] <= right])
+                  for ry, words in band if ry <= bottom + 0.005]
+        tables.append({"left": left, "right": right, "top": y, "bottom": bottom,
+                       "anchors": _header_anchors(header, start)})
+    return tables
+
+
+def _header_anchors(header, start):
+    anchors = [["Vehicle Type", start[1], start[3]]]
+    fuels, empties = [], []
+    for _, words in header:
+        for i, word in enumerate(words):
+            text = word[0]
+            before = words[i - 1][0] if i else ""
+            after = words[i + 1] if i + 1 < len(words) else None
+            name = _unit_column(text)
+            if name:
+                anchors.append([name, word[1], word[3]])
+            elif text == "Combined":
+                anchors.append(["Combined Load Factor (%)", word[1], word[3]])
+            elif text == "Load" and after is not None and after[0] == "Factor":
+                anchors.append(["Combined Load Factor (%)", word[1], after[3]])
+            elif text == "Load" and before != "Combined":
+                # "Load characteristics": the load basis column, not part of the schema
+                anchors.append(["Load Basis", word[1], word[3]])
+            elif text == "Empty":
+                empties.append(["Empty Running (%)", word[1], word[3]])
+            elif text == "Fuel":
+                fuels.append(["Fuel", word[1], word[3]])
+    units = [a for a in anchors if _is_unit_column(a[0])]
+    # "Fuel intensity" sits over the unit columns; the fuel type column is the other "Fuel"
+    anchors += [f for f in fuels if not any(_overlaps(f, u) for u in units)][:1]
+    # "Combined Load Factor & Empty Running" is one column holding the load factor
+    combined = [a for a in anchors if a[0] == "Combined Load Factor (%)"]
+    anchors += [e for e in empties if not any(_overlaps(e, c) for c in combined)][:1]
+
+    kept = {}
+    for anchor in anchors:
+        kept.setdefault(anchor[0], anchor)
+    return sorted(kept.values(), key=lambda a: a[1])
+
+
+def _caption_region(rows, table, max_offset=0.1):
+    """Region named in the "Table N" caption above a table, or None.
+
+    The caption closest in x to the table's first column wins, so side-by-side
+    tables each take their own. Its text up to "road" is the region, spelled
+    as in the region map ("Europe & South America", "North America").
+    """
+    start = table["anchors"][0][1]
+    best = None
+    for i, (y, words) in enumerate(rows):
+        if y >= table["top"]:
+            break
+        for j, word in enumerate(words[:-1]):
+            if word[0] != "Table" or not words[j + 1][0].isdigit():
+                continue
+            offset = abs(word[1] - start)
+            if offset <= max_offset and (best is None or offset <= best[0]):
+                caption = words[j + 2:] + (rows[i + 1][1] if i + 1 < len(rows) else [])
+                best = (offset, [w[0] for w in caption if word[1] - 0.01 <= w[1] < table["right"]])
+    if best is None:
+        return None
+    text = " ".join(best[1])
+    match = re.match(r"(.+?)\s+road\b", text, re.IGNORECASE)
+    if match is None:
+        return None
+    region = re.sub(r"\band\b", "&", match.group(1))
+    return re.sub(r"\bAmerican\b", "America", region)
+
+
+def _word_column(word, anchors, numeric_from):
+    # Numbers are right-aligned under their unit header, text is left-aligned under its header
+    centre = (word[1] + word[3]) / 2
+    if _is_number(word[0]) and not word[0].endswith("%") and centre >= numeric_from:
+        numeric = [a for a in anchors if _is_unit_column(a[0])]
+        return min(numeric, key=lambda a: abs((a[1] + a[2]) / 2 - centre))[0]
+    column = anchors[0][0]
+    for anchor in anchors:
+        if anchor[1] <= word[1] + TEXT_TOLERANCE:
+            column = anchor[0]
+    return column
+
+
+def _parse_table(rows, table, end, page_idx, region, line_gap):
+    anchors = table["anchors"]
+    if not any(_is_unit_column(a[0]) for a in anchors):
+        return []
+    numeric_from = min(a[1] for a in anchors if _is_unit_column(a[0])) - 0.02
+    names = {a[0] for a in anchors}
+    inherited = [c for c in ("Vehicle Type", "Fuel", "Combined Load Factor (%)", "Empty Running (%)") if c in names]
+
+    parsed = []
+    last_y = None
+    for y, words in rows:
+        if y <= table["bottom"] + 0.005:
+            continue
+        if y >= end:
+            break
+        cells = {}
+        for word in words:
+            if table["left"] <= (word[1] + word[3]) / 2 <= table["right"]:
+                cells.setdefault(_word_column(word, anchors, numeric_from), []).append(word[0])
+        if not cells:
+            continue
+        if any(_is_unit_column(name) and any(map(_is_number, values)) for name, values in cells.items()):
+            row = {"Page": page_idx, "Region": region}
+            for name, values in cells.items():
+                if name in ("Vehicle Type", "Fuel"):
+                    row[name] = " ".join(values)
+                elif name != "Load Basis" and _is_number(values[0]):
+                    row[name] = _to_number(values[0])
+            parsed.append(row)
+            last_y = y
+        elif parsed and last_y is not None and y - last_y <= line_gap and set(cells) == {"Vehicle Type"}:
+            # Vehicle names wrap onto the following line(s)
+            row = parsed[-1]
+            row["Vehicle Type"] = " ".join(filter(None, [row.get("Vehicle Type")] + cells["Vehicle Type"]))
+            last_y = y
+        else:
+            last_y = None
+
+    # Blank cells below a merged cell repeat the value above
+    blank_group = ("Combined Load Factor (%)", "Empty Running (%)")
+    for previous, row in zip(parsed, parsed[1:]):
+        merged = [n for n in inherited if row.get(n) is None]
+        if any(row.get(n) is not None for n in blank_group):
+            merged = [n for n in merged if n not in blank_group]
+        for name in merged:
+            row[name] = previous.get(name)
+    return parsed
+
+
+def parse_page_table(page, region=None, row_tolerance=0.008, header_depth=0.07, margin=0.02, line_gap=0.02):
+    """Rebuild the emission table rows of one OCR page from word geometry.
+
+    Columns come from the table header: each header word ("Vehicle", "Fuel",
+    "Load Factor", "(kg/t-km)", "WTW", ...) anchors one column, and only
+    words inside the header's x-span are read, so legends and prose beside
+    the table are dropped. Numbers go to the nearest unit column, text to
+    the header it starts under. Rows with a number are data rows; text-only
+    lines right below them continue the vehicle name, and blank cells repeat
+    the row above, as merged cells do in the PDF. The region comes from the
+    table caption, falling back to region (e.g. on a continued page).
+    """
+    rows = group_rows(list(iter_page_words(page)), row_tolerance)
+    tables = _find_tables(rows, header_depth, margin)
+    parsed = []
+    for table in tables:
+        below = [t["top"] for t in tables if t["top"] > table["top"] and
+                 _overlaps((None, table["left"], table["right"]), (None, t["left"], t["right"]))]
+        end = min(below, default=float("inf"))
+        table_region = _caption_region(rows, table) or region
+        parsed += _parse_table(rows, table, end, page.get("page_idx"), table_region, line_gap)
+    return parsed
+
+
+def iter_table_rows(pages, region=None, **options):
+    # A table continued on the next page keeps the region of its caption
+    for page in pages:
+        for row in parse_page_table(page, region=region, **options):
+            region = row["Region"]
+            yield row
+
+
+def stream_emission_table(json_path="data/glec_raw_output.json", output_path="data/glec_emission_factors_parsed.csv",
+                          region=None, chunk_rows=1000, **options):
+    """Parse an OCR export page by page straight into CSV or Parquet.
+
+    The format follows the output extension (.parquet needs pyarrow). Rows
+    are written in chunks of chunk_rows with the fixed TABLE_COLUMNS schema,
+    so memory stays flat however large the document is. Returns the number
+    of rows written.
+    """
+    rows = iter_table_rows(iter_ocr_pages(json_path), region=region, **options)
+    written = 0
+
+    if output_path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        fields = [pa.field(c, pa.int64() if c == "Page" else pa.string() if c in ("Region", "Vehicle Type", "Fuel")
+                           else pa.float64()) for c in TABLE_COLUMNS]
+        schema = pa.schema(fields)
+        with pq.ParquetWriter(output_path, schema, compression="zstd") as writer:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                    written += len(chunk)
+                    chunk = []
+            if chunk:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                written += len(chunk)
+    else:
+        with open(output_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=TABLE_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                written += 1
+
+    print(f"Saved {written} parsed rows to: {output_path}")
+    return written
@@ -0,0 +1,170 @@
+import numpy as np
+
+from logic.emissions import get_emission_factors
+from logic.geometry import as_latlon_array, cumulative_distance_km, resample_by_distance, segment_lengths_km
+from logic.regions import segment_region_codes
+
+
+def emission_profile(coords, vehicle_type, fuel, load_tons, region, total_km=None):
+    """Cumulative distance and emissions at every vertex of a route polyline.
+
+    Looks the factors up once and evaluates the whole route in one pass.
+    Returns NumPy arrays: "lat", "lon", "distance_km" and cumulative "WTT",
+    "TTW", "WTW" in kg CO2e (unrounded; the final WTW equals
+    calculate_emissions over the full distance before rounding).
+    """
+    coords = as_latlon_array(coords)
+    cumulative_km = cumulative_distance_km(coords, total_km)
+    factors = get_emission_factors(vehicle_type, fuel, region)
+
+    profile = {"lat": coords[:, 0], "lon": coords[:, 1], "distance_km": cumulative_km}
+    for key, ef in factors.items():
+        profile[key] = ef * cumulative_km * load_tons / 1000  # kg CO2e
+    return profile
+
+
+def emission_profiles(coords, vehicle_type, fuels, load_tons, region, total_km=None):
+    """emission_profile for several fuels over the same route in one pass.
+
+    The polyline distances are computed once and shared by every fuel.
+    Returns {fuel: profile}, with None for fuels that have no factors for
+    this vehicle and region.
+    """
+    coords = as_latlon_array(coords)
+    cumulative_km = cumulative_distance_km(coords, total_km)
+
+    profiles = {}
+    for fuel in fuels:
+        try:
+            factors = get_emission_factors(vehicle_type, fuel, region)
+        except ValueError:
+            profiles[fuel] = None
+            continue
+        profile = {"lat": coords[:, 0], "lon": coords[:, 1], "distance_km": cumulative_km}
+        for key, ef in factors.items():
+            profile[key] = ef * cumulative_km * load_tons / 1000  # kg CO2e
+        profiles[fuel] = profile
+    return profiles
+
+
+def iter_emission_profile(coords, vehicle_type, fuel, load_tons, region, total_km=None, chunk_rows=50_000):
+    """emission_profile computed and yielded chunk_rows vertices at a time.
+
+    Yields profile slices (see profile_chunks) without ever holding the
+    whole profile: only the running cumulative totals carry over between
+    chunks. With total_km the polyline length is summed in a first chunked
+    pass to get the scale factor. Raises ValueError before yielding if there
+    are no factors.
+    """
+    coords = as_latlon_array(coords)
+    factors = get_emission_factors(vehicle_type, fuel, region)
+    scale = 1.0
+    if total_km is not None and len(coords) > 1:
+        length = sum(float(segment_lengths_km(coords[lo:lo + chunk_rows + 1]).sum())
+                     for lo in range(0, len(coords) - 1, chunk_rows))
+        scale = total_km / length if length > 0 else 1.0
+
+    carried_km = 0.0
+    for lo in range(0, len(coords), chunk_rows):
+        hi = min(lo + chunk_rows, len(coords))
+        # Segment ending at each vertex; the first vertex of the route has none
+        segment_km = segment_lengths_km(coords[max(lo - 1, 0):hi]) * scale
+        if lo == 0:
+            segment_km = np.concatenate([[0.0], segment_km])
+        chunk = {"lat": coords[lo:hi, 0], "lon": coords[lo:hi, 1], "segment_distance_km": segment_km}
+        chunk["distance_km"] = carried_km + np.cumsum(segment_km)
+        carried_km = float(chunk["distance_km"][-1])
+        for key, ef in factors.items():
+            chunk[f"segment_{key}"] = ef * segment_km * load_tons / 1000  # kg CO2e
+            chunk[key] = ef * chunk["distance_km"] * load_tons / 1000
+        yield chunk
+
+
+def profile_chunks(profile, chunk_rows=50_000):
+    """Slices of an already built profile with per-segment values added.
+
+    Each chunk holds the profile's arrays for chunk_rows vertices (views, no
+    copies) plus "segment_distance_km", "segment_WTT", "segment_TTW" and
+    "segment_WTW": the values of the segment ending at each vertex, 0 for
+    the first vertex.
+    """
+    n = len(profile["distance_km"])
+    for lo in range(0, n, chunk_rows):
+        hi = min(lo + chunk_rows, n)
+        chunk = {key: values[lo:hi] for key, values in profile.items()}
+        for key in ("distance_km", "WTT", "TTW", "WTW"):
+            previous = profile[key][lo - 1] if lo else profile[key][0]
+            chunk[f"segment_{key}"] = np.diff(profile[key][lo:hi], prepend=previous)
+        yield chunk
+
+
+def regional_emission_profiles(coords, vehicle_type, fuels, load_tons, fallback_region=None, total_km=None):
+    """emission_profiles with the GLEC region detected along the route.
+
+    Every segment takes the factors of the region its midpoint lies in
+    (logic.regions), so a route crossing from one region into another is
+    costed per region-homogeneous stretch. fallback_region covers segments
+    outside all regions and regions with no factors for this vehicle/fuel;
+    without it those take the first detected region that has factors, and a
+    fuel none of whose regions has factors gets None. Profiles carry an extra "region"
+    array: the region of the segment ending at each vertex.
+    """
+    coords = as_latlon_array(coords)
+    cumulative_km = cumulative_distance_km(coords, total_km)
+    codes, table = segment_region_codes(coords, fallback_region)
+    used, codes = np.unique(codes, return_inverse=True)
+    names = [table[code] for code in used]
+    segment_km = np.diff(cumulative_km)
+    regions = np.array(names, dtype=object)[codes]
+    vertex_regions = np.concatenate([regions[:1], regions])
+
+    profiles = {}
+    for fuel in fuels:
+        factors = []
+        for name in names:
+            for candidate in dict.fromkeys([name, fallback_region]):
+                if candidate is None:
+                    continue
+                try:
+                    factors.append(get_emission_factors(vehicle_type, fuel, candidate))
+                    break
+                except ValueError:
+                    continue
+            else:
+                factors.append(None)
+        known = [f for f in factors if f is not None]
+        if not known:
+            profiles[fuel] = None
+            continue
+        # Regions without factors borrow the first region that has them
+        factors = [f if f is not None else known[0] for f in factors]
+        profile = {"lat": coords[:, 0], "lon": coords[:, 1], "distance_km": cumulative_km}
+        for key in known[0]:
+            ef = np.array([f[key] for f in factors])
+            profile[key] = np.concatenate([[0.0], np.cumsum(segment_km * ef[codes])]) * load_tons / 1000
+        profile["region"] = vertex_regions
+        profiles[fuel] = profile
+    return profiles
+
+
+def stretch_totals(profile):
+    # Distance and emissions per run of same-region segments of a regional profile
+    regions = profile["region"][1:]
+    if len(regions) == 0:
+        return []
+    starts = np.concatenate([[0], np.flatnonzero(regions[1:] != regions[:-1]) + 1])
+    ends = np.append(starts[1:], len(regions))
+    return [{
+        "region": regions[s],
+        **{key: float(profile[key][e] - profile[key][s]) for key in ("distance_km", "WTT", "TTW", "WTW")},
+    } for s, e in zip(starts, ends)]
+
+
+def sample_profile(profile, step_km):
+    # Thin a profile to one vertex every step_km; per-sample segment values are
+    # the differences between consecutive cumulative values
+    indices = resample_by_distance(profile["distance_km"], step_km)
+    sampled = {key: values[indices] for key, values in profile.items()}
+    for key in ("distance_km", "WTT", "TTW", "WTW"):
+        sampled[f"segment_{key}"] = np.diff(sampled[key], prepend=0.0)
+    return sampled
@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from logic.geometry import as_latlon_array
+
+REGIONS_PATH = os.path.join("data", "regions", "glec_regions.geojson")
+# Grid resolution in degrees; cells away from any border are answered by the grid alone
+GRID_CELL_DEG = 0.25
+
+_NO_REGION = 0
+_BORDER = -1
+
+
+def _points_in_ring(lon, lat, ring):
+    # Even-odd ray casting of many points against one closed ring, one NumPy pass per edge
+    inside = np.zeros(len(lon), dtype=bool)
+    x1, y1 = ring[:-1, 0], ring[:-1, 1]
+    x2, y2 = ring[1:, 0], ring[1:, 1]
+    for ax, ay, bx, by in zip(x1, y1, x2, y2):
+        if ay == by:
+            continue
+        crosses = (ay > lat) != (by > lat)
+        inside ^= crosses & (lon < (bx - ax) * (lat - ay) / (by - ay) + ax)
+    return inside
+
+
+class RegionIndex:
+    """Vectorized [lat, lon] -> GLEC region lookup over polygon outlines.
+
+    Polygons are rasterized once onto a uniform lon/lat grid. Cells entirely
+    inside one region (or none) answer directly; cells touched by an outline
+    are marked as border cells, and only points falling in those are tested
+    exactly against the candidate rings. A full-resolution route therefore
+    costs one array lookup per vertex plus exact tests for the few vertices
+    near a border or coast.
+    """
+
+    def __init__(self, regions, rings, cell_deg=GRID_CELL_DEG):
+        # regions: names; rings: [(region position, (k, 2) closed [lon, lat] array), ...]
+        self.regions = list(regions)
+        self.cell_deg = cell_deg
+        self.rings = [(code, np.asarray(ring, dtype=np.float64)) for code, ring in rings]
+        self.bboxes = np.array([[r[:, 0].min(), r[:, 1].min(), r[:, 0].max(), r[:, 1].max()] for _, r in self.rings])
+        self.lon0 = np.floor(self.bboxes[:, 0].min()) - cell_deg
+        self.lat0 = np.floor(self.bboxes[:, 1].min()) - cell_deg
+        self.shape = (int(np.ceil((self.bboxes[:, 3].max() + cell_deg - self.lat0) / cell_deg)) + 1,
+                      int(np.ceil((self.bboxes[:, 2].max() + cell_deg - self.lon0) / cell_deg)) + 1)
+        self.grid = self._rasterize()
+
+    @classmethod
+    def from_geojson(cls, path=REGIONS_PATH, cell_deg=GRID_CELL_DEG):
+        with open(path, "r", encoding="utf-8") as f:
+            collection = json.load(f)
+        regions, rings = [], []
+        for feature in collection["features"]:
+            regions.append(feature["properties"]["region"])
+            geometry = feature["geometry"]
+            polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+            for polygon in polygons:
+                rings.append((len(regions), polygon[0]))  # outer ring; codes start at 1
+        return cls(regions, rings, cell_deg)
+
+    def _cells(self, lon, lat):
+        row = np.floor((lat - self.lat0) / self.cell_deg).astype(np.int64)
+        col = np.floor((lon - self.lon0) / self.cell_deg).astype(np.int64)
+        return row, col
+
+    def _rasterize(self):
+        grid = np.zeros(self.shape, dtype=np.int16)
+        for code, ring in self.rings:
+            row0, col0 = self._cells(ring[:, 0].min(), ring[:, 1].min())
+            row1, col1 = self._cells(ring[:, 0].max(), ring[:, 1].max())
+            rows, cols = np.mgrid[row0:row1 + 1, col0:col1 + 1]
+            lon = self.lon0 + (cols.ravel() + 0.5) * self.cell_deg
+            lat = self.lat0 + (rows.ravel() + 0.5) * self.cell_deg
+            inside = _points_in_ring(lon, lat, ring)
+            grid[rows.ravel()[inside], cols.ravel()[inside]] = code
+
+        # Every cell an outline passes through, sampled finely along each edge and
+        # grown by one cell so corner clips are never classified by the cell centre
+        border = np.zeros(self.shape, dtype=bool)
+        for _, ring in self.rings:
+            a, b = ring[:-1], ring[1:]
+            steps = np.maximum(np.ceil(np.abs(b - a).max(axis=1) / (self.cell_deg / 4)), 1).astype(np.int64)
+            t = np.concatenate([np.arange(n) / n for n in steps])
+            start = np.repeat(a, steps, axis=0)
+            points = start + (np.repeat(b, steps, axis=0) - start) * t[:, None]
+            row, col = self._cells(points[:, 0], points[:, 1])
+            border[row, col] = True
+        grown = border.copy()
+        grown[1:, :] |= border[:-1, :]
+        grown[:-1, :] |= border[1:, :]
+        grown[:, 1:] |= border[:, :-1]
+        grown[:, :-1] |= border[:, 1:]
+        grown[1:, 1:] |= border[:-1, :-1]
+        grown[:-1, :-1] |= border[1:, 1:]
+        grown[1:, :-1] |= border[:-1, 1:]
+        grown[:-1, 1:] |= border[1:, :-1]
+        grid[grown] = _BORDER
+        return grid
+
+    def codes(self, coords):
+        """Region code per [lat, lon] point: 1-based position in self.regions, 0 for none."""
+        coords = as_latlon_array(coords)
+        lat, lon = coords[:, 0], coords[:, 1]
+        row, col = self._cells(lon, lat)
+        on_grid = (row >= 0) & (row < self.shape[0]) & (col >= 0) & (col < self.shape[1])
+        codes = np.zeros(len(coords), dtype=np.int16)
+        codes[on_grid] = self.grid[row[on_grid], col[on_grid]]
+
+        exact = np.flatnonzero(codes == _BORDER)
+        if len(exact):
+            codes[exact] = _NO_REGION
+            plon, plat = lon[exact], lat[exact]
+            for (code, ring), (x0, y0, x1, y1) in zip(self.rings, self.bboxes):
+                near = (plon >= x0) & (plon <= x1) & (plat >= y0) & (plat <= y1)
+                if near.any():
+                    hit = np.flatnonzero(near)[_points_in_ring(plon[near], plat[near], ring)]
+                    codes[exact[hit]] = code
+        return codes
+
+    def names(self, codes):
+        # Region name per code; None where the point is outside every region
+        table = np.array([None] + self.regions, dtype=object)
+        return table[np.asarray(codes)]
+
+    def lookup(self, coords):
+        return self.names(self.codes(coords))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_region_index():
+    # Built on first use (a fraction of a second) and shared by every request
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = RegionIndex.from_geojson()
+        return _index
+
+
+def segment_region_codes(coords, fallback=None, index=None):
+    """Region code of every polyline segment, judged at its midpoint.
+
+    Returns (codes, names) with names[code] the region name. Segments outside
+    all regions (ferries, coastline approximations, or countries without
+    GLEC road factors) take fallback when given, else the region of the last
+    known segment before them; only a leading gap takes the first known one. Raises ValueError if
+    nothing on the route falls into a region and there is no fallback. A
+    route with fewer than two vertices has no segments and gets no codes.
+    """
+    index = index or get_region_index()
+    coords = as_latlon_array(coords)
+    names = [None] + index.regions
+    if len(coords) < 2:
+        return np.zeros(0, dtype=np.int64), names
+    codes = index.codes((coords[:-1] + coords[1:]) / 2).astype(np.int64)
+    unknown = codes == _NO_REGION
+    if not unknown.any():
+        return codes, names
+    if fallback is not None:
+        if fallback not in names:
+            names.append(fallback)
+        codes[unknown] = names.index(fallback)
+        return codes, names
+    if unknown.all():
+        raise ValueError("Route lies outside the GLEC regions; choose a region manually")
+    # Forward fill, then backward fill what precedes the first known segment
+    known_at = np.where(unknown, 0, np.arange(len(codes)))
+    np.maximum.accumulate(known_at, out=known_at)
+    first_known = int(np.argmax(~unknown))
+    filled = codes[known_at]
+    filled[:first_known] = codes[first_known]
+    return filled, names
+
+
+def segment_regions(coords, fallback=None, index=None):
+    # Region name per segment, see segment_region_codes
+    codes, names = segment_region_codes(coords, fallback, index)
+    return np.array(names, dtype=object)[codes]
+
+
+def region_stretches(coords, cumulative_km, fallback=None, index=None):
+    """Runs of consecutive segments in the same region.
+
+    Returns [{"region", "start", "end" (vertex indices), "start_km",
+    "end_km", "distance_km"}, ...] in route order.
+    """
+    regions = segment_regions(coords, fallback, index)
+    cumulative_km = np.asarray(cumulative_km, dtype=np.float64)
+    if len(regions) == 0:
+        return []
+    starts = np.concatenate([[0], np.flatnonzero(regions[1:] != regions[:-1]) + 1])
+    ends = np.append(starts[1:], len(regions))
+    return [{
+        "region": regions[s],
+        "start": int(s),
+        "end": int(e),
+        "start_km": float(cumulative_km[s]),
+        "end_km": float(cumulative_km[e]),
+        "distance_km": float(cumulative_km[e] - cumulative_km[s]),
+    } for s, e in zip(starts, ends)]
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from logic.geocache import CACHE_DIR
+from logic.geometry import from_fixed_point, to_fixed_point
+
+# Coordinates are snapped to ~11 m so re-geocoded depots share a key
+SNAP_DECIMALS = 4
+
+_HEADER = struct.Struct("<H")
+_ROUTE_HEADER = struct.Struct("<dI")
+
+
+def route_key(start, end, profile="driving-car", alternative_routes=None):
+    # start/end are [lat, lon]; the key is a content hash of the normalized request
+    payload = {
+        "start": [round(float(c), SNAP_DECIMALS) for c in start],
+        "end": [round(float(c), SNAP_DECIMALS) for c in end],
+        "profile": profile,
+        "alternative_routes": alternative_routes or None,
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def encode_routes(routes):
+    # routes: list of {"coordinates": [[lat, lon], ...], "distance_km": float}
+    parts = [_HEADER.pack(len(routes))]
+    for route in routes:
+        coords = route["coordinates"]
+        parts.append(_ROUTE_HEADER.pack(route["distance_km"], len(coords)))
+        # Vertices are stored as little-endian int32 micro-degrees (~0.1 m)
+        parts.append(to_fixed_point(coords).astype("<i4").tobytes())
+    return zlib.compress(b"".join(parts), 6)
+
+
+def decode_routes(blob):
+    raw = zlib.decompress(blob)
+    (count,), offset = _HEADER.unpack_from(raw, 0), _HEADER.size
+    routes = []
+    for _ in range(count):
+        distance_km, n_points = _ROUTE_HEADER.unpack_from(raw, offset)
+        offset += _ROUTE_HEADER.size
+        packed = np.frombuffer(raw, dtype="<i4", count=n_points * 2, offset=offset)
+        offset += packed.nbytes
+        coords = from_fixed_point(packed).tolist()
+        routes.append({"coordinates": coords, "distance_km": distance_km})
+    return routes
+
+
+class RouteCache:
+    """Content-addressed cache of extracted ORS routes.
+
+    Entries are compressed binary blobs held in an LRU bounded by entry count
+    and total bytes, optionally backed by a SQLite file so routes survive
+    restarts. The file keeps at most max_rows routes, dropping the oldest
+    first. ttl_seconds=None keeps entries until they are evicted.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl_seconds=7 * 24 * 3600, path=None,
+                 max_rows=16384):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.stats = Counter()
+        self._memory = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS routes (key TEXT PRIMARY KEY, blob BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS routes_created ON routes (created)")
+            self._conn.commit()
+
+    @classmethod
+    def persistent(cls, **kwargs):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        return cls(path=os.path.join(CACHE_DIR, "routes.sqlite"), **kwargs)
+
+    def _expired(self, created):
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def _remember(self, key, blob, created):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[0])
+        self._memory[key] = (blob, created)
+        self._bytes += len(blob)
+        while self._memory and (len(self._memory) > self.max_entries or self._bytes > self.max_bytes):
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    def _forget(self, key):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[0])
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM routes WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _prune_rows(self):
+        # Expired rows, then the oldest ones beyond max_rows
+        removed = 0
+        if self.ttl_seconds is not None:
+            removed += self._conn.execute(
+                "DELETE FROM routes WHERE created < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+        if self.max_rows is not None:
+            removed += self._conn.execute(
+                "DELETE FROM routes WHERE key NOT IN (SELECT key FROM routes ORDER BY created DESC LIMIT ?)",
+                (self.max_rows,),
+            ).rowcount
+        self.stats["evictions"] += removed
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._conn is not None:
+                row = self._conn.execute("SELECT blob, created FROM routes WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (bytes(row[0]), row[1])
+                    if not self._expired(entry[1]):
+                        self._remember(key, *entry)
+            if entry is None or self._expired(entry[1]):
+                if entry is not None:
+                    self._forget(key)
+                self.stats["misses"] += 1
+                return None
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            blob = entry[0]
+        return decode_routes(blob)
+
+    def put(self, key, routes):
+        blob = encode_routes(routes)
+        created = time.time()
+        with self._lock:
+            self._remember(key, blob, created)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO routes (key, blob, created) VALUES (?, ?, ?)", (key, blob, created)
+                )
+                self._prune_rows()
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM routes")
+                self._conn.commit()
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._memory)
+
+
+def matrix_key(locations, profile):
+    payload = {
+        "locations": [[round(float(c), SNAP_DECIMALS) for c in point] for point in locations],
+        "profile": profile,
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+class MatrixCache:
+    """Distance matrices keyed by matrix_key, in memory and optionally as .npy files in path.
+
+    Both tiers drop entries older than ttl_seconds (None keeps them until
+    evicted). Memory holds the max_entries most recently used matrices; on
+    disk the oldest files are deleted beyond max_files. put(persist=False)
+    keeps a matrix in memory only, for ones that are cheaper to recompute
+    than to store.
+    """
+
+    def __init__(self, max_entries=32, path=None, max_files=256, ttl_seconds=7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.path = path
+        self.max_files = max_files
+        self.ttl_seconds = ttl_seconds
+        self.stats = Counter()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    @classmethod
+    def persistent(cls, **kwargs):
+        return cls(path=os.path.join(CACHE_DIR, "matrices"), **kwargs)
+
+    def _expired(self, created):
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def _load(self, key):
+        file = os.path.join(self.path, f"{key}.npy")
+        try:
+            created = os.path.getmtime(file)
+        except OSError:
+            return None
+        if self._expired(created):
+            _remove(file)
+            return None
+        matrix = np.load(file)
+        self._remember(key, matrix, created)
+        return matrix, created
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self.path is not None:
+                entry = self._load(key)
+            if entry is None or self._expired(entry[1]):
+                self.stats["misses"] += 1
+                return None
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0].copy()
+
+    def _remember(self, key, matrix, created):
+        self._memory[key] = (matrix, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _prune_files(self):
+        # Expired files, then the oldest ones beyond max_files
+        files = []
+        for name in os.listdir(self.path):
+            if name.endswith(".npy"):
+                file = os.path.join(self.path, name)
+                try:
+                    files.append((os.path.getmtime(file), file))
+                except OSError:
+                    continue
+        files.sort(reverse=True)
+        for i, (created, file) in enumerate(files):
+            if i >= self.max_files or self._expired(created):
+                _remove(file)
+                self.stats["evictions"] += 1
+
+    def put(self, key, matrix, persist=True):
+        matrix = np.asarray(matrix, dtype=np.float64)
+        with self._lock:
+            self._remember(key, matrix, time.time())
+            if self.path is not None and persist:
+                np.save(os.path.join(self.path, f"{key}.npy"), matrix)
+                self._prune_files()
+
+
+def _remove(file):
+    try:
+        os.remove(file)
+    except OSError:
+        pass
@@ -1,70 +1,131 @@
-import openrouteservice
-from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
+import math
 import os
 from dotenv import load_dotenv
 
+from logic.backends import GeocodingError, ORSBackend, RoutingError, extract_route_info
+from logic.geocache import GeocodeCache, NominatimGeocoder, SQLiteGeocodeStore
+from logic.instrumentation import register_collector, timed, timer
+from logic.route_cache import RouteCache, route_key
+
 load_dotenv()
 
 ORS_API_KEY = os.getenv("ORS_API_KEY")
-if not ORS_API_KEY:
-    raise Exception("ORS_API_KEY not found in .env")
+# "ors" (default) or "local" for the offline graph in GREENROUTE_GRAPH_DIR
+ROUTING_BACKEND = os.getenv("GREENROUTE_ROUTING_BACKEND", "ors")
+GRAPH_DIR = os.getenv("GREENROUTE_GRAPH_DIR", "data/road_graph")
+
+ROUTE_PROFILE = 'driving-car'
+ALTERNATIVE_ROUTES = {"share_factor": 0.6, "target_count": 1}
+OPTIMIZE_MIN_DISTANCE_KM = 100
+EARTH_RADIUS_KM = 6371.0088
+
+def _default_backend():
+    if ROUTING_BACKEND == "local":
+        from logic.local_routing import LocalGraphBackend
+        return LocalGraphBackend(GRAPH_DIR)
+    if not ORS_API_KEY:
+        raise Exception("ORS_API_KEY not found in .env")
+    return ORSBackend(api_key=ORS_API_KEY, profile=ROUTE_PROFILE)
+
+routing_backend = _default_backend()
+route_cache = RouteCache.persistent()
+
+def set_routing_backend(backend):
+    global routing_backend
+    routing_backend = backend
+    return routing_backend
 
-ors_client = openrouteservice.Client(key=ORS_API_KEY)
-geolocator = Nominatim(user_agent="greenroute_app")
+geocoder = GeocodeCache(NominatimGeocoder(user_agent="greenroute_app", timeout=10), store=SQLiteGeocodeStore())
 
+def set_geocoder_backend(backend, store=None):
+    # Swap the live Nominatim backend, e.g. for a StaticGeocoder in offline runs
+    global geocoder
+    geocoder = GeocodeCache(backend, store=store)
+    return geocoder
+
+register_collector("geocode", lambda: geocoder.report())
+register_collector("routes", lambda: route_cache.stats)
+
+@timed("routing.get_coordinates")
 def get_coordinates(city_name):
     try:
-        location = geolocator.geocode(city_name, timeout=10)
+        location = geocoder.geocode(city_name)
         if location:
-            return [location.latitude, location.longitude]
+            return location
         else:
-            raise Exception(f"Location not found for: {city_name}")
+            raise GeocodingError(f"Location not found for: {city_name}")
     except GeocoderTimedOut:
-        raise Exception(f"Geocoding timed out for: {city_name}")
+        raise GeocodingError(f"Geocoding timed out for: {city_name}")
+
+def great_circle_km(start, end):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*start, *end))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def _fetch_routes(start_coords, end_coords, alternative_routes=None):
+    profile = routing_backend.profile
+    key = route_key(start_coords, end_coords, profile, alternative_routes)
+    routes = route_cache.get(key)
+    if routes is not None:
+        return routes
 
-def extract_route_info(route):
-    route_coords = [[lat, lon] for lon, lat in route["geometry"]["coordinates"]]
-    distance_km = round(route["properties"]["segments"][0]["distance"] / 1000, 2)
-    return {"coordinates": route_coords, "distance_km": distance_km}
+    with timer("routing.directions"):
+        routes = routing_backend.directions(start_coords, end_coords, alternative_routes)
+    route_cache.put(key, routes)
 
+    if alternative_routes and routes:
+        # The first route of an alternatives response is the recommended route,
+        # i.e. exactly what a plain baseline request returns
+        route_cache.put(route_key(start_coords, end_coords, profile), routes[:1])
+    return routes
+
+def get_route(start_coords, end_coords):
+    # The recommended route between two (lat, lon) points, from the route cache when possible
+    return _fetch_routes(start_coords, end_coords)[0]
+
+@timed("routing.get_optimized_route")
 def get_optimized_route(start_city, end_city):
     start_coords = get_coordinates(start_city)
     end_coords = get_coordinates(end_city)
-    coords = [start_coords[::-1], end_coords[::-1]]  # ORS needs [lon, lat]
+
+    # Road distance is never shorter than the great-circle distance, so when the
+    # straight line already qualifies for optimization, ask for alternatives
+    # straight away and read the baseline off the same response.
+    alt_routes = None
+    alt_requested = False
+    alt_failed = False
+    if great_circle_km(start_coords, end_coords) >= OPTIMIZE_MIN_DISTANCE_KM:
+        alt_requested = True
+        try:
+            alt_routes = _fetch_routes(start_coords, end_coords, ALTERNATIVE_ROUTES)
+        except RoutingError:
+            alt_failed = True
 
     # Step 1: Get baseline route
-    baseline_result = ors_client.directions(
-        coordinates=coords,
-        profile='driving-car',
-        format='geojson'
-    )
-    baseline_route = extract_route_info(baseline_result["features"][0])
-
-    # Step 2: Apply optimization logic only for long trips under 150km
-    try:
-        if baseline_route["distance_km"] >= 100:
-            # For all trips >= 100km, try to fetch alternative route
-            alt_result = ors_client.directions(
-                coordinates=coords,
-                profile='driving-car',
-                format='geojson',
-                alternative_routes={"share_factor": 0.6, "target_count": 1}
-            )
-            routes = alt_result["features"]
-
-            if len(routes) >= 2:
-                optimized_route = extract_route_info(routes[1])
-                note = "Optimized route applied (shorter alternative used)"
-            else:
-                optimized_route = None
-                note = "No alternative route found. Using baseline."
-        else:
-            optimized_route = None
-            note = "Optimized approach is applied for longer routes. Using baseline if no alternative found."
+    if alt_routes:
+        baseline_route = alt_routes[0]
+    else:
+        baseline_route = _fetch_routes(start_coords, end_coords)[0]
+
+    # Step 2: Apply optimization logic only for long trips
+    if baseline_route["distance_km"] >= OPTIMIZE_MIN_DISTANCE_KM and not alt_requested:
+        try:
+            alt_routes = _fetch_routes(start_coords, end_coords, ALTERNATIVE_ROUTES)
+        except RoutingError:
+            alt_failed = True
 
+    return build_route_result(start_coords, end_coords, baseline_route, alt_routes, alt_failed)
 
-    except openrouteservice.exceptions.ApiError as e:
+def build_route_result(start_coords, end_coords, baseline_route, alt_routes, alt_failed=False):
+    if baseline_route["distance_km"] >= OPTIMIZE_MIN_DISTANCE_KM and not alt_failed:
+        if alt_routes and len(alt_routes) >= 2:
+            optimized_route = alt_routes[1]
+            note = "Optimized route applied (shorter alternative used)"
+        else:
+            optimized_route = None
+            note = "No alternative route found. Using baseline."
+    else:
         optimized_route = None
         note = "Optimized approach is applied for longer routes. Using baseline if no alternative found."
 
@@ -0,0 +1,280 @@
+"""HTTP API for emissions and routing, as a plain ASGI application.
+
+    uvicorn logic.service:app --workers 4      # or: python -m logic serve --workers 4
+
+Endpoints (JSON in, JSON out):
+
+    POST /emissions        {"vehicle_type", "fuel", "distance_km", "load_tons", "region"}
+                           -> {"WTT", "TTW", "WTW"} kg CO2e, as calculate_emissions
+    POST /emissions/batch  {"trips": [{...}, ...]} -> {"results": [{"WTT", "TTW", "WTW", "status"}, ...]}
+    POST /route            {"start", "end"} place names -> get_optimized_route's result
+                           (404 for a place that cannot be geocoded, 502 when ORS or Nominatim fails)
+    GET  /health, GET /metrics (Prometheus text)
+
+Each worker process loads the factor table once at startup (the compiled
+artifact is memory-mapped, so workers share its pages) and opens one pooled
+aiohttp session for ORS/Nominatim. Concurrent /emissions requests are
+coalesced by a MicroBatcher into a single calculate_emissions_batch call.
+"""
+import asyncio
+import json
+import math
+import os
+from collections import Counter
+
+from logic import instrumentation
+from logic.emissions import calculate_emissions_batch, get_factor_index
+
+TRIP_FIELDS = ("vehicle_type", "fuel", "distance_km", "load_tons", "region")
+MAX_BATCH_TRIPS = 100_000
+MAX_BODY_BYTES = 32 * 1024 * 1024
+# Far beyond any real trip, and small enough that emissions in grams stay finite
+MAX_TONNE_KM = 1e15
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_trip(trip):
+    # Validated (vehicle_type, fuel, region, distance_km, load_tons); raises HTTPError 400
+    if not isinstance(trip, dict):
+        raise HTTPError(400, "Each trip must be a JSON object")
+    missing = [field for field in TRIP_FIELDS if trip.get(field) is None]
+    if missing:
+        raise HTTPError(400, f"Missing field(s): {', '.join(missing)}")
+    try:
+        distance_km, load_tons = float(trip["distance_km"]), float(trip["load_tons"])
+    except (TypeError, ValueError):
+        raise HTTPError(400, "distance_km and load_tons must be numbers")
+    if not (math.isfinite(distance_km) and math.isfinite(load_tons)) or distance_km < 0 or load_tons < 0:
+        raise HTTPError(400, "distance_km and load_tons must be finite and non-negative")
+    if distance_km * load_tons > MAX_TONNE_KM:
+        raise HTTPError(400, f"distance_km * load_tons must be at most {MAX_TONNE_KM:g} tonne-km")
+    return str(trip["vehicle_type"]), str(trip["fuel"]), str(trip["region"]), distance_km, load_tons
+
+
+def _no_match_message(vehicle_type, fuel, region):
+    # Same wording as get_factor_record, without a second (miss-counting) index lookup
+    vehicle_type, fuel, region = (str(value).lower().strip() for value in (vehicle_type, fuel, region))
+    return f"No match found for: {vehicle_type} with fuel: {fuel} in region: {region}"
+
+
+def evaluate(trips):
+    """calculate_emissions_batch over parsed trips; (results, missing mask)."""
+    vehicle_type, fuel, region, distance_km, load_tons = zip(*trips)
+    result = calculate_emissions_batch(vehicle_type=list(vehicle_type), fuel=list(fuel), region=list(region),
+                                       distance_km=distance_km, load_tons=load_tons, errors="nan")
+    return result, result["WTW"] != result["WTW"]
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-trip evaluations into one vectorized call.
+
+    The first trip of a batch schedules a flush max_delay seconds later (0:
+    on the next event-loop iteration, i.e. everything that arrived while the
+    loop was busy); reaching max_batch flushes at once. Each caller gets its
+    own row back, or the no-match ValueError.
+    """
+
+    def __init__(self, max_batch=1024, max_delay=0.0):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.stats = Counter()
+        self._pending = []
+        self._handle = None
+
+    async def submit(self, trip):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((trip, future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._handle is None:
+            self._handle = loop.call_later(self.max_delay, self.flush)
+        return await future
+
+    def flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.stats["batches"] += 1
+        self.stats["trips"] += len(batch)
+        self.stats["largest"] = max(self.stats["largest"], len(batch))
+        try:
+            result, missing = evaluate([trip for trip, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for k, (trip, future) in enumerate(batch):
+            if future.done():  # caller went away
+                continue
+            if missing[k]:
+                future.set_exception(ValueError(_no_match_message(*trip[:3])))
+            else:
+                future.set_result({key: float(values[k]) for key, values in result.items()})
+
+    def report(self):
+        report = dict(self.stats)
+        report["mean_batch"] = round(self.stats["trips"] / self.stats["batches"], 2) if self.stats["batches"] else 0.0
+        return report
+
+
+class Service:
+    """Per-worker state: factor table, batcher and the pooled routing client."""
+
+    def __init__(self, batcher=None, routing_options=None):
+        self.batcher = batcher or MicroBatcher()
+        self.routing_options = routing_options or {}
+        self.routing_client = None
+        self.routing_error = None
+
+    async def startup(self):
+        get_factor_index()
+        instrumentation.register_collector("service.batcher", self.batcher.report)
+        try:
+            # Importing routing needs ORS_API_KEY; without it only /route is unavailable
+            from logic.async_routing import AsyncRoutingClient
+
+            self.routing_client = AsyncRoutingClient(**self.routing_options)
+            await self.routing_client.open()
+        except Exception as e:
+            self.routing_error = str(e)
+
+    async def shutdown(self):
+        if self.routing_client is not None:
+            await self.routing_client.close()
+
+    async def emissions(self, body):
+        trip = parse_trip(body)
+        try:
+            return await self.batcher.submit(trip)
+        except ValueError as e:
+            raise HTTPError(404, str(e))
+
+    async def emissions_batch(self, body):
+        trips = body.get("trips") if isinstance(body, dict) else None
+        if not isinstance(trips, list):
+            raise HTTPError(400, 'Expected {"trips": [...]}')
+        if len(trips) > MAX_BATCH_TRIPS:
+            raise HTTPError(413, f"At most {MAX_BATCH_TRIPS} trips per request")
+        if not trips:
+            return {"results": []}
+        parsed = [parse_trip(trip) for trip in trips]
+        result, missing = evaluate(parsed)
+        columns = {key: values.tolist() for key, values in result.items()}
+        return {"results": [
+            {"WTT": None, "TTW": None, "WTW": None, "status": "no_factors"} if missing[k] else
+            {"WTT": columns["WTT"][k], "TTW": columns["TTW"][k], "WTW": columns["WTW"][k], "status": "ok"}
+            for k in range(len(parsed))
+        ]}
+
+    async def route(self, body):
+        if self.routing_client is None:
+            raise HTTPError(503, f"Routing unavailable: {self.routing_error}")
+        if not isinstance(body, dict):
+            raise HTTPError(400, 'Expected {"start": place, "end": place}')
+        start, end = body.get("start"), body.get("end")
+        if not (isinstance(start, str) and isinstance(end, str) and start.strip() and end.strip()):
+            raise HTTPError(400, 'Expected {"start": place, "end": place}')
+        from logic.async_routing import GeocodingApiError
+        from logic.backends import GeocodingError
+
+        try:
+            return await self.routing_client.get_optimized_route(start, end)
+        except GeocodingApiError as e:
+            # Nominatim itself failed; the place may well exist
+            raise HTTPError(502, str(e))
+        except GeocodingError as e:
+            raise HTTPError(404, str(e))
+        except Exception as e:
+            raise HTTPError(502, str(e))
+
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _respond(send, status, payload, content_type=b"application/json"):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_app(service=None):
+    """ASGI application; pass a Service to configure batching or routing client options."""
+    service = service or Service()
+    routes = {
+        ("POST", "/emissions"): service.emissions,
+        ("POST", "/emissions/batch"): service.emissions_batch,
+        ("POST", "/route"): service.route,
+    }
+
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await service.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await service.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        if method == "GET" and path == "/health":
+            return await _respond(send, 200, {"status": "ok", "routing": service.routing_client is not None})
+        if method == "GET" and path == "/metrics":
+            return await _respond(send, 200, instrumentation.to_prometheus().encode("utf-8"),
+                                  b"text/plain; version=0.0.4")
+        handler = routes.get((method, path))
+        if handler is None:
+            if any(p == path for _, p in routes):
+                return await _respond(send, 405, {"error": "Method not allowed"})
+            return await _respond(send, 404, {"error": "Not found"})
+        try:
+            with instrumentation.timer(f"service.{path.strip('/').replace('/', '.')}"):
+                raw = await _read_body(receive)
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    raise HTTPError(400, "Body is not valid JSON")
+                payload = await handler(body)
+        except HTTPError as e:
+            return await _respond(send, e.status, {"error": str(e)})
+        await _respond(send, 200, payload)
+
+    app.service = service
+    return app
+
+
+app = create_app()
+
+
+def serve(host="127.0.0.1", port=8000, workers=None):
+    # Multi-process deployment; every worker imports this module and runs its own startup
+    import uvicorn
+
+    uvicorn.run("logic.service:app", host=host, port=port, workers=workers or os.cpu_count(), log_level="warning")
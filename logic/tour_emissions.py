@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+
+from logic.emissions import get_factor_record
+
+# Relative rise in fuel use per vehicle-km from empty to fully laden (v(lf) = v0 * (1 + beta * lf)).
+# Full rigid/articulated trucks burn roughly 1.3-1.5x their empty consumption.
+LOAD_SENSITIVITY = 0.4
+
+
+def laden_load_factor(record):
+    # Load factor over laden km only: the combined load factor also averages in the empty km
+    if math.isnan(record.load_factor):
+        return math.nan
+    empty = 0.0 if math.isnan(record.empty_running) else record.empty_running
+    return min(record.load_factor / (1 - empty), 1.0)
+
+
+def infer_capacity_tons(record, loads_tons):
+    # Without a stated capacity, assume the heaviest leg runs at the table's laden load factor
+    laden = laden_load_factor(record)
+    peak = float(np.max(loads_tons)) if len(loads_tons) else 0.0
+    if math.isnan(laden) or peak <= 0:
+        return math.nan
+    return peak / laden
+
+
+def load_model(record, capacity_tons):
+    # "load-factor" when the row has a load factor and the capacity is known, else plain "tkm"
+    if math.isnan(record.load_factor) or math.isnan(capacity_tons):
+        return "tkm"
+    return "load-factor"
+
+
+def leg_multipliers(record, loads_tons, capacity_tons, load_sensitivity=LOAD_SENSITIVITY):
+    """Effective tonnes per leg: g CO2e = factor (g/t-km) * km * multiplier.
+
+    GLEC factors are averages at the row's combined load factor c, so one
+    vehicle-km emits factor * c * capacity on average. Fuel use is taken as
+    linear in the load fraction and calibrated to that average, which gives
+    c * (capacity + beta * load) / (1 + beta * c) per leg: the table's own
+    t-km result at the reference load, and a non-zero cost for empty legs.
+    Rows without a load factor fall back to the plain t-km model (the load).
+    """
+    loads_tons = np.asarray(loads_tons, dtype=np.float64)
+    if load_model(record, capacity_tons) == "tkm":
+        return loads_tons
+    c = record.load_factor
+    beta = load_sensitivity
+    return c * (capacity_tons + beta * loads_tons) / (1 + beta * c)
+
+
+def tour_emissions(vehicle_type, fuel, region, distances_km, loads_tons, capacity_tons=None,
+                   empty_running=None, load_sensitivity=LOAD_SENSITIVITY):
+    """Per-leg and total WTT/TTW/WTW (kg CO2e) for a tour with varying load.
+
+    distances_km and loads_tons give each leg's length and the tonnes on
+    board while driving it (0 for empty legs). capacity_tons defaults to
+    infer_capacity_tons. Empty running: the table's empty running share
+    describes empty km the tour itself may not contain (repositioning after
+    the last drop). With empty_running=True those km, empty_running / (1 -
+    empty_running) per laden km, are charged as an extra empty allocation;
+    None (default) does so only when no leg is already empty.
+
+    All legs are evaluated in one vectorized pass. Returns {"legs": arrays
+    of distance_km, load_tons, load_factor, WTT, TTW, WTW per leg,
+    "empty_running": the allocation (all zeros when not applied), "totals":
+    rounded kg, "capacity_tons", "model": "load-factor" or "tkm"}.
+    """
+    record = get_factor_record(vehicle_type, fuel, region)
+    distances_km = np.asarray(distances_km, dtype=np.float64).reshape(-1)
+    loads_tons = np.broadcast_to(np.asarray(loads_tons, dtype=np.float64).reshape(-1), distances_km.shape)
+    if capacity_tons is None:
+        capacity_tons = infer_capacity_tons(record, loads_tons)
+    capacity_tons = math.nan if capacity_tons is None else float(capacity_tons)
+
+    factors = np.array([record.wtt, record.ttw, record.wtw])
+    model = load_model(record, capacity_tons)
+    multipliers = leg_multipliers(record, loads_tons, capacity_tons, load_sensitivity)
+    kg = (distances_km * multipliers)[:, None] * factors[None, :] / 1000
+
+    share = 0.0 if math.isnan(record.empty_running) else record.empty_running
+    if empty_running is None:
+        empty_running = not bool(np.any(loads_tons <= 0))
+    empty_km = 0.0
+    if empty_running and model == "load-factor" and share > 0:
+        empty_km = float(distances_km[loads_tons > 0].sum()) * share / (1 - share)
+    empty_kg = empty_km * float(leg_multipliers(record, np.zeros(1), capacity_tons, load_sensitivity)[0]) * factors / 1000
+
+    legs = {
+        "distance_km": distances_km,
+        "load_tons": np.array(loads_tons),
+        "load_factor": loads_tons / capacity_tons if capacity_tons else np.full(len(loads_tons), np.nan),
+        "WTT": kg[:, 0],
+        "TTW": kg[:, 1],
+        "WTW": kg[:, 2],
+    }
+    totals = kg.sum(axis=0) + empty_kg
+    return {
+        "legs": legs,
+        "empty_running": {"distance_km": empty_km, "WTT": float(empty_kg[0]), "TTW": float(empty_kg[1]),
+                          "WTW": float(empty_kg[2])},
+        "totals": {key: round(float(v), 2) for key, v in zip(("WTT", "TTW", "WTW"), totals)},
+        "capacity_tons": capacity_tons,
+        "model": model,
+    }
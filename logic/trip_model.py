@@ -0,0 +1,141 @@
+import time
+from collections import Counter
+
+import numpy as np
+
+from logic import instrumentation
+from logic.emissions import get_emission_factors
+from logic.geometry import as_latlon_array, cumulative_distance_km
+from logic.regions import segment_region_codes
+
+# Stages in dependency order; each one's cache key includes the keys it depends on
+STAGES = ("geometry", "regions", "factors", "unit_profile", "profile")
+
+
+class TripModel:
+    """A trip split into stages so a parameter change only redoes what it affects.
+
+    geometry      route polyline -> cumulative and per-segment distances
+    regions       + region choice (None detects it along the route) -> region
+                  per segment and the cumulative distance driven in each region
+    factors       region names + vehicle type + fuel -> WTT/TTW/WTW per region
+    unit_profile  regions + factors -> cumulative kg CO2e per tonne of load
+    profile       unit_profile + load -> the emission profile (see logic.profile)
+
+    Changing the load only rescales the cached unit profile; changing the
+    vehicle or fuel redoes one (regions, n) x (n, 3) product over cached
+    distances; only a new route recomputes distances and regions. Profiles
+    equal regional_emission_profiles / emission_profile up to float rounding.
+    """
+
+    def __init__(self):
+        self._cache = {}  # stage -> (key, value)
+        self.stats = {stage: Counter() for stage in STAGES}
+        self.last = {}  # stage -> {"status": "cached" | "recomputed", "ms": float}
+
+    def _stage(self, name, key, compute):
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == key:
+            self.stats[name]["hits"] += 1
+            self.last[name] = {"status": "cached", "ms": 0.0}
+            return cached[1]
+        start = time.perf_counter()
+        with instrumentation.timer(f"trip_model.{name}"):
+            value = compute()
+        self._cache[name] = (key, value)
+        self.stats[name]["recomputes"] += 1
+        self.last[name] = {"status": "recomputed", "ms": (time.perf_counter() - start) * 1000}
+        return value
+
+    def invalidate(self, stage=None):
+        # Drop one stage (and so everything after it, whose keys no longer match) or all of them
+        stages = STAGES[STAGES.index(stage):] if stage else STAGES
+        for name in stages:
+            self._cache.pop(name, None)
+
+    def profile(self, route_id, coords, vehicle_type, fuel, load_tons, region=None, total_km=None):
+        """Emission profile of the trip, reusing every stage whose inputs are unchanged.
+
+        route_id identifies the geometry (coords are only read when it
+        changes). Raises ValueError when no region along the route has
+        factors for this vehicle and fuel.
+        """
+        geometry_key = (route_id, total_km)
+        geometry = self._stage("geometry", geometry_key, lambda: _geometry(coords, total_km))
+        regions_key = (geometry_key, region)
+        regions = self._stage("regions", regions_key, lambda: _regions(geometry, coords, region))
+        factors_key = (tuple(regions["names"]), vehicle_type.lower().strip(), fuel.lower().strip())
+        factors = self._stage("factors", factors_key,
+                              lambda: _factors(regions["names"], vehicle_type, fuel, region))
+        unit_key = (regions_key, factors_key)
+        unit = self._stage("unit_profile", unit_key, lambda: _unit_profile(geometry, regions, factors))
+        return self._stage("profile", (unit_key, float(load_tons)), lambda: _scale(unit, load_tons))
+
+    def report(self):
+        """One row per stage: its status on the last run, time taken and counters."""
+        return [{
+            "stage": stage,
+            "status": self.last.get(stage, {}).get("status", "-"),
+            "ms": round(self.last.get(stage, {}).get("ms", 0.0), 2),
+            "recomputes": self.stats[stage]["recomputes"],
+            "hits": self.stats[stage]["hits"],
+        } for stage in STAGES]
+
+
+def _geometry(coords, total_km):
+    coords = as_latlon_array(coords)
+    cumulative_km = cumulative_distance_km(coords, total_km)
+    return {"lat": coords[:, 0], "lon": coords[:, 1], "distance_km": cumulative_km,
+            "segment_km": np.diff(cumulative_km)}
+
+
+def _regions(geometry, coords, region):
+    segment_km = geometry["segment_km"]
+    if region is None:
+        codes, table = segment_region_codes(coords)
+        used, codes = np.unique(codes, return_inverse=True)
+        names = [table[code] for code in used]
+    else:
+        codes, names = np.zeros(len(segment_km), dtype=np.int64), [region]
+    # Cumulative distance driven in each region up to every vertex: (regions, vertices)
+    by_region = np.zeros((len(names), len(segment_km) + 1))
+    for r in range(len(names)):
+        np.cumsum(np.where(codes == r, segment_km, 0.0), out=by_region[r, 1:])
+    regions = {"names": names, "codes": codes, "cumulative_km": by_region}
+    if region is None:
+        segment_regions = np.array(names, dtype=object)[codes]
+        regions["vertex_regions"] = np.concatenate([segment_regions[:1], segment_regions])
+    return regions
+
+
+def _factors(names, vehicle_type, fuel, region):
+    # (regions, 3) WTT/TTW/WTW; detected regions without factors borrow the first that has them
+    factors = []
+    for name in names:
+        try:
+            factors.append(get_emission_factors(vehicle_type, fuel, name))
+        except ValueError:
+            if region is not None:
+                raise
+            factors.append(None)
+    known = [f for f in factors if f is not None]
+    if not known:
+        raise ValueError(f"No match found for: {vehicle_type} with fuel: {fuel} in any region along the route")
+    return np.array([[f[key] for key in ("WTT", "TTW", "WTW")] for f in (f or known[0] for f in factors)])
+
+
+def _unit_profile(geometry, regions, factors):
+    # kg CO2e per tonne of load at every vertex: cumulative km per region times g/t-km per region
+    kg_per_ton = regions["cumulative_km"].T @ factors / 1000
+    unit = {"lat": geometry["lat"], "lon": geometry["lon"], "distance_km": geometry["distance_km"],
+            "WTT": kg_per_ton[:, 0], "TTW": kg_per_ton[:, 1], "WTW": kg_per_ton[:, 2]}
+    if "vertex_regions" in regions:
+        unit["region"] = regions["vertex_regions"]
+    return unit
+
+
+def _scale(unit, load_tons):
+    profile = dict(unit)
+    for key in ("WTT", "TTW", "WTW"):
+        profile[key] = unit[key] * load_tons
+    return profile
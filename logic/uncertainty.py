@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from logic.emissions import get_factor_index
+
+DEFAULT_SAMPLES = 10_000
+MAX_SAMPLES = 1_000_000
+# Upper bound on factor rows x samples drawn at once; about 100 MB of working arrays
+MAX_CHUNK_VALUES = 2_000_000
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+
+@dataclass(frozen=True)
+class UncertaintyModel:
+    """Relative spread (log-space standard deviation) of each perturbed input.
+
+    GLEC publishes averages without spreads; these defaults are assumptions
+    for reporting ranges, not GLEC figures. WTT and TTW factors vary
+    independently, and WTW moves with both in proportion to their shares.
+    The load-factor term (how full the vehicle really runs compared with the
+    table's average, which scales fuel per tonne-km) and the distance term
+    apply to both. Every multiplier is lognormal with mean 1, so the sample
+    mean matches calculate_emissions.
+    """
+
+    wtt: float = 0.15
+    ttw: float = 0.10
+    load_factor: float = 0.20
+    distance: float = 0.05
+
+
+def _multipliers(rng, sigma, n):
+    return np.exp(sigma * rng.standard_normal(n) - sigma * sigma / 2)
+
+
+def _band_key(key, q):
+    return f"{key}_p{q:g}"
+
+
+def unit_bands(wtt_share, n_samples=DEFAULT_SAMPLES, percentiles=DEFAULT_PERCENTILES, model=None, seeds=None,
+               max_chunk_values=MAX_CHUNK_VALUES):
+    """Sample mean and percentiles of the WTT/TTW/WTW multipliers per factor row.
+
+    wtt_share is WTT / (WTT + TTW) of each row. Row k is sampled from
+    seeds[k] (a SeedSequence), n_samples draws at a time for at most
+    max_chunk_values draws per chunk. Returns {"WTT", "TTW", "WTW"} arrays of
+    shape (rows, 1 + len(percentiles)): the mean, then each percentile, as
+    multiples of the point estimate.
+    """
+    model = model or UncertaintyModel()
+    wtt_share = np.asarray(wtt_share, dtype=np.float64).reshape(-1)
+    # The load-factor and distance terms multiply into one lognormal
+    shared_sigma = np.hypot(model.load_factor, model.distance)
+    out = {key: np.empty((len(wtt_share), 1 + len(percentiles))) for key in ("WTT", "TTW", "WTW")}
+    chunk = max(1, max_chunk_values // n_samples)
+    for lo in range(0, len(wtt_share), chunk):
+        hi = min(lo + chunk, len(wtt_share))
+        shared = np.empty((hi - lo, n_samples))
+        wtt = np.empty((hi - lo, n_samples))
+        ttw = np.empty((hi - lo, n_samples))
+        for k in range(lo, hi):
+            rng = np.random.default_rng(seeds[k])
+            shared[k - lo] = _multipliers(rng, shared_sigma, n_samples)
+            wtt[k - lo] = _multipliers(rng, model.wtt, n_samples)
+            ttw[k - lo] = _multipliers(rng, model.ttw, n_samples)
+        share = wtt_share[lo:hi, None]
+        wtw = wtt * share + ttw * (1 - share)
+        for key, samples in (("WTT", wtt), ("TTW", ttw), ("WTW", wtw)):
+            samples *= shared
+            out[key][lo:hi, 0] = samples.mean(axis=1)
+            out[key][lo:hi, 1:] = np.percentile(samples, percentiles, axis=1).T
+    return out
+
+
+def emission_bands(trips=None, vehicle_type=None, fuel=None, distance_km=None, load_tons=None, region=None,
+                   n_samples=DEFAULT_SAMPLES, percentiles=DEFAULT_PERCENTILES, model=None, seed=0,
+                   max_chunk_values=MAX_CHUNK_VALUES):
+    """Monte Carlo percentile bands of WTT/TTW/WTW for many trips.
+
+    Trips are given as for calculate_emissions_batch (a DataFrame or
+    columns). Each sample perturbs the WTT and TTW factors, the load factor
+    and the distance (see UncertaintyModel). Those perturbations scale a
+    trip's point estimate, so every trip on the same factor row shares one
+    distribution up to its tonne-km: n_samples draws are made once per
+    distinct row (seeded by seed and the row, so results do not depend on
+    which other trips are in the batch) and scaled to each trip. The bands
+    are per trip; percentiles of several trips do not add up.
+
+    Returns a dict of arrays in kg CO2e: "WTT_mean" and "WTT_p5" style keys
+    for every percentile and each of WTT/TTW/WTW, plus "n_samples". Trips
+    with no matching factors are NaN.
+    """
+    if not 1 <= n_samples <= MAX_SAMPLES:
+        raise ValueError(f"n_samples must be between 1 and {MAX_SAMPLES}")
+    if trips is not None:
+        vehicle_type, fuel, region = trips["vehicle_type"], trips["fuel"], trips["region"]
+        distance_km, load_tons = trips["distance_km"], trips["load_tons"]
+
+    distance_km = np.asarray(distance_km, dtype=np.float64).reshape(-1)
+    load_tons = np.asarray(load_tons, dtype=np.float64).reshape(-1)
+    n = max(len(distance_km), len(load_tons))
+    columns = [np.broadcast_to(np.asarray(col, dtype=object).reshape(-1), (n,)) for col in (vehicle_type, fuel, region)]
+    tkm = np.broadcast_to(distance_km, (n,)) * np.broadcast_to(load_tons, (n,))
+
+    factor_index = get_factor_index()
+    rows = factor_index.resolve_rows(*columns)
+    found = rows >= 0
+    distinct, inverse = np.unique(rows[found], return_inverse=True)
+    factors = factor_index.factor_matrix[distinct]
+    wtt_share = np.divide(factors[:, 0], factors[:, 0] + factors[:, 1],
+                          out=np.full(len(distinct), 0.5), where=factors[:, 0] + factors[:, 1] > 0)
+    seeds = [np.random.SeedSequence([seed, int(row)]) for row in distinct]
+    units = unit_bands(wtt_share, n_samples, percentiles, model, seeds, max_chunk_values)
+
+    result = {"n_samples": n_samples}
+    for column, key in enumerate(("WTT", "TTW", "WTW")):
+        point = np.full(n, np.nan)
+        point[found] = factors[inverse, column] * tkm[found] / 1000  # kg, as calculate_emissions before rounding
+        scaled = np.full((n, 1 + len(percentiles)), np.nan)
+        scaled[found] = units[key][inverse] * point[found, None]
+        result[f"{key}_mean"] = scaled[:, 0]
+        for i, q in enumerate(percentiles):
+            result[_band_key(key, q)] = scaled[:, 1 + i]
+    return result
+
+
+def trip_uncertainty(vehicle_type, fuel, distance_km, load_tons, region, n_samples=DEFAULT_SAMPLES,
+                     percentiles=DEFAULT_PERCENTILES, model=None, seed=0):
+    """emission_bands for one trip: {"WTT": {"mean", "p5", ...}, "TTW": ..., "WTW": ...}.
+
+    Raises ValueError like calculate_emissions when there are no factors.
+    """
+    bands = emission_bands(vehicle_type=vehicle_type, fuel=fuel, distance_km=distance_km, load_tons=load_tons,
+                           region=region, n_samples=n_samples, percentiles=percentiles, model=model, seed=seed)
+    if np.isnan(bands["WTW_mean"][0]):
+        raise ValueError(f"No match found for: {vehicle_type.lower().strip()} with fuel: {fuel.lower().strip()} "
+                         f"in region: {region.lower().strip()}")
+    return {key: {"mean": round(float(bands[f"{key}_mean"][0]), 2),
+                  **{f"p{q:g}": round(float(bands[_band_key(key, q)][0]), 2) for q in percentiles}}
+            for key in ("WTT", "TTW", "WTW")}
+
+
+def point_bands(wtt_kg, ttw_kg, wtw_kg, n_samples=DEFAULT_SAMPLES, percentiles=DEFAULT_PERCENTILES, model=None,
+                seed=0):
+    """Bands around already computed trip totals, e.g. the end of an emission profile.
+
+    Used where a trip mixes factor rows (a route crossing regions): the
+    perturbations are applied to the whole trip at once. Same result shape
+    as trip_uncertainty.
+    """
+    share = wtt_kg / (wtt_kg + ttw_kg) if wtt_kg + ttw_kg > 0 else 0.5
+    units = unit_bands([share], n_samples, percentiles, model, [np.random.SeedSequence(seed)])
+    labels = ["mean"] + [f"p{q:g}" for q in percentiles]
+    return {key: {label: round(float(value * point), 2) for label, value in zip(labels, units[key][0])}
+            for key, point in (("WTT", wtt_kg), ("TTW", ttw_kg), ("WTW", wtw_kg))}
@@ -0,0 +1,253 @@
+import math
+import time
+
+import numpy as np
+
+from logic.emissions import get_factor_record
+from logic.geometry import as_latlon_array, haversine_km
+from logic.route_cache import MatrixCache, matrix_key
+from logic.tour_emissions import LOAD_SENSITIVITY, infer_capacity_tons, tour_emissions
+
+# Stand-in distance (km) for pairs the backend could not route, so tours avoid them
+UNREACHABLE_KM = 1e6
+_EPS = 1e-9
+
+matrix_cache = MatrixCache.persistent()
+
+
+def great_circle_matrix(locations):
+    coords = as_latlon_array(locations)
+    return haversine_km(coords[:, None, 0], coords[:, None, 1], coords[None, :, 0], coords[None, :, 1])
+
+
+def distance_matrix(locations, backend=None, cache=True):
+    """(n, n) km matrix between [lat, lon] locations, cached by content.
+
+    backend is a RoutingBackend (its matrix() is used) or None for
+    great-circle distances. cache=True uses the persistent matrix_cache; pass
+    a MatrixCache to use another one, or False to skip caching. Only routed
+    matrices are written to disk; great-circle ones are cheaper to recompute.
+    """
+    profile = "great-circle" if backend is None else backend.profile
+    cache = matrix_cache if cache is True else cache
+    key = matrix_key(locations, profile)
+    if cache:
+        matrix = cache.get(key)
+        if matrix is not None:
+            return matrix
+
+    matrix = great_circle_matrix(locations) if backend is None else backend.matrix(locations)
+    if cache:
+        cache.put(key, matrix, persist=backend is not None)
+    return matrix
+
+
+def tour_tkm(tour, dist, demand, load_tons):
+    # Tonne-km of a tour: every leg weighted by the load still on board
+    tour = np.asarray(tour)
+    legs = dist[tour[:-1], tour[1:]]
+    loads = load_tons - np.cumsum(demand[tour])[:-1]
+    return float(np.dot(legs, loads))
+
+
+def _nearest_neighbour(dist, start, end):
+    # Stops are 1..n (0 is the depot, end is the depot or a zero-cost sink)
+    n = len(dist)
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[[start, end]] = False
+    tour = [start]
+    current = start
+    while unvisited.any():
+        candidates = np.flatnonzero(unvisited)
+        current = int(candidates[np.argmin(dist[current, candidates])])
+        unvisited[current] = False
+        tour.append(current)
+    tour.append(end)
+    return np.array(tour)
+
+
+def _prefix(values):
+    return np.concatenate([[0.0], np.cumsum(values)])
+
+
+class _TourState:
+    """Leg distances, delivered load and prefix sums that make move deltas O(1)."""
+
+    def __init__(self, tour, dist, demand, load_tons):
+        self.tour = tour
+        self.W = load_tons
+        self.D = np.cumsum(demand[tour])          # D[k]: tonnes delivered once t_k is served
+        self.dF = dist[tour[:-1], tour[1:]]      # forward leg k: t_k -> t_k+1
+        self.dR = dist[tour[1:], tour[:-1]]      # same leg driven backwards
+        d = self.D[:-1]
+        self.PF, self.PR = _prefix(self.dF), _prefix(self.dR)
+        self.PFD, self.PRD = _prefix(self.dF * d), _prefix(self.dR * d)
+
+
+def _two_opt_deltas(state, dist, i):
+    # Tonne-km change of reversing t_i+1..t_j for every j; the reversed legs
+    # carry different loads, which the prefix sums account for without
+    # walking the segment
+    t, W, D = state.tour, state.W, state.D
+    j = np.arange(i + 2, len(t) - 1)
+    a = i + 1  # inner legs a..j-1
+    SF = state.PF[j] - state.PF[a]
+    SR = state.PR[j] - state.PR[a]
+    SFD = state.PFD[j] - state.PFD[a]
+    SRD = state.PRD[j] - state.PRD[a]
+    delta = (dist[t[i], t[j]] * (W - D[i]) + dist[t[i + 1], t[j + 1]] * (W - D[j])
+             - state.dF[i] * (W - D[i]) - state.dF[j] * (W - D[j])
+             + (W - D[i] - D[j]) * SR + SRD - W * SF + SFD)
+    return j, delta
+
+
+def _or_opt_deltas(state, dist, a, size):
+    # Tonne-km change of moving t_a..t_b to sit between t_p and t_p+1, for every p
+    t, W, D, dF, PF = state.tour, state.W, state.D, state.dF, state.PF
+    m = len(t) - 1
+    b = a + size - 1
+    Q = D[b] - D[a - 1]  # tonnes dropped inside the segment
+    inner = PF[b] - PF[a]  # legs a..b-1
+
+    # Later in the tour: the legs skipped over carry the segment's tonnes too
+    later = np.arange(b + 1, m)
+    delta_later = (dist[t[a - 1], t[b + 1]] * (W - D[a - 1]) - dF[a - 1] * (W - D[a - 1]) - dF[b] * (W - D[b])
+                   + Q * (PF[later] - PF[b + 1])
+                   + dist[t[later], t[a]] * (W - D[later] + Q)
+                   + dist[t[b], t[later + 1]] * (W - D[later])
+                   - dF[later] * (W - D[later])
+                   - (D[later] - D[b]) * inner)
+    # Earlier: the legs skipped over are lighter by Q, the segment's own legs heavier
+    earlier = np.arange(0, a - 1)
+    delta_earlier = (dist[t[a - 1], t[b + 1]] * (W - D[b]) - dF[a - 1] * (W - D[a - 1]) - dF[b] * (W - D[b])
+                     + dist[t[earlier], t[a]] * (W - D[earlier])
+                     + dist[t[b], t[earlier + 1]] * (W - D[earlier] - Q)
+                     - dF[earlier] * (W - D[earlier])
+                     - Q * (PF[a - 1] - PF[earlier + 1])
+                     + (D[a - 1] - D[earlier]) * inner)
+    return np.concatenate([later, earlier]), np.concatenate([delta_later, delta_earlier])
+
+
+def _move_segment(tour, a, size, p):
+    segment = tour[a:a + size]
+    rest = np.concatenate([tour[:a], tour[a + size:]])
+    insert_at = p + 1 - size if p > a else p + 1
+    return np.concatenate([rest[:insert_at], segment, rest[insert_at:]])
+
+
+def _two_opt_pass(tour, dist, demand, load_tons, deadline):
+    improved = False
+    i = 0
+    state = _TourState(tour, dist, demand, load_tons)
+    while i < len(tour) - 3 and time.perf_counter() < deadline:
+        j, delta = _two_opt_deltas(state, dist, i)
+        best = int(np.argmin(delta))
+        if delta[best] < -_EPS:
+            jj = int(j[best])
+            t = state.tour
+            state = _TourState(np.concatenate([t[:i + 1], t[i + 1:jj + 1][::-1], t[jj + 1:]]), dist, demand, load_tons)
+            improved = True
+        else:
+            i += 1
+    return state.tour, improved
+
+
+def _or_opt_pass(tour, dist, demand, load_tons, deadline, max_segment=3):
+    # Moves a run of up to max_segment consecutive stops elsewhere, unreversed
+    improved = False
+    for size in range(1, max_segment + 1):
+        a = 1
+        state = _TourState(tour, dist, demand, load_tons)
+        while a + size <= len(tour) - 1 and time.perf_counter() < deadline:
+            positions, delta = _or_opt_deltas(state, dist, a, size)
+            if len(delta) and delta.min() < -_EPS:
+                p = int(positions[np.argmin(delta)])
+                state = _TourState(_move_segment(state.tour, a, size, p), dist, demand, load_tons)
+                improved = True
+            else:
+                a += 1
+        tour = state.tour
+    return tour, improved
+
+
+def improve_tour(tour, dist, demand, load_tons, time_limit=5.0):
+    """2-opt and Or-opt local search on tonne-km until no move helps or time runs out.
+
+    tour starts and ends at fixed nodes; demand[k] is dropped at node k, so
+    the load on each leg is load_tons minus everything delivered before it.
+    Returns (tour, passes).
+    """
+    deadline = time.perf_counter() + time_limit
+    passes = 0
+    while time.perf_counter() < deadline:
+        passes += 1
+        tour, two_opt = _two_opt_pass(tour, dist, demand, load_tons, deadline)
+        tour, or_opt = _or_opt_pass(tour, dist, demand, load_tons, deadline)
+        if not (two_opt or or_opt):
+            break
+    return tour, passes
+
+
+def optimize_tour(depot, stops, vehicle_type, fuel, region, load_tons, demands=None, return_to_depot=True,
+                  backend=None, matrix=None, time_limit=5.0, capacity_tons=None, load_sensitivity=LOAD_SENSITIVITY):
+    """Order multi-drop stops to minimize total WTW CO2e for one vehicle.
+
+    depot and stops are [lat, lon]. demands gives the tonnes dropped at each
+    stop (default none, i.e. a constant load); the vehicle leaves the depot
+    with load_tons. Distances come from matrix (depot first, then stops) or
+    distance_matrix(backend).
+
+    Legs are costed with tour_emissions' load model, where a leg emits in
+    proportion to km * (load + capacity / load_sensitivity); for rows with no
+    load factor it is plain tonne-km. Either way the search minimizes a
+    weighted tonne-km sum: nearest-neighbour construction, then improve_tour.
+
+    Returns the visiting order (indices into stops), the tour_emissions
+    breakdown of the optimized and of the given order, and totals in kg CO2e.
+    """
+    record = get_factor_record(vehicle_type, fuel, region)
+    n = len(stops)
+    demand = np.zeros(n + 2)
+    if demands is not None:
+        demand[1:n + 1] = np.asarray(demands, dtype=np.float64)
+    if demand.sum() > load_tons + _EPS:
+        raise ValueError(f"Stops take {demand.sum():.2f} t but the vehicle carries {load_tons} t")
+    if capacity_tons is None:
+        capacity_tons = infer_capacity_tons(record, [load_tons])
+    offset = 0.0 if math.isnan(record.load_factor) or math.isnan(capacity_tons) else capacity_tons / load_sensitivity
+
+    if matrix is None:
+        matrix = distance_matrix([depot, *stops], backend)
+    matrix = np.nan_to_num(np.asarray(matrix, dtype=np.float64), nan=UNREACHABLE_KM)
+
+    # Node n + 1 is where the tour ends: the depot again, or a free sink for open tours
+    dist = np.zeros((n + 2, n + 2))
+    dist[:n + 1, :n + 1] = matrix
+    if return_to_depot:
+        dist[:n + 1, n + 1] = matrix[:, 0]
+        dist[n + 1, :n + 1] = matrix[0, :]
+
+    start = time.perf_counter()
+    tour = _nearest_neighbour(dist, 0, n + 1)
+    tour, passes = improve_tour(tour, dist, demand, load_tons + offset, time_limit)
+    seconds = time.perf_counter() - start
+
+    def breakdown(order):
+        legs_km = dist[order[:-1], order[1:]]
+        loads = load_tons - np.cumsum(demand[order])[:-1]
+        if not return_to_depot:
+            legs_km, loads = legs_km[:-1], loads[:-1]
+        return tour_emissions(vehicle_type, fuel, region, legs_km, np.maximum(loads, 0.0),
+                              capacity_tons=capacity_tons, load_sensitivity=load_sensitivity)
+
+    optimized = breakdown(tour)
+    given = breakdown(np.arange(n + 2))
+    return {
+        "order": (tour[1:-1] - 1).tolist(),
+        "breakdown": optimized,
+        "distance_km": round(float(optimized["legs"]["distance_km"].sum()), 2),
+        "emissions": optimized["totals"],
+        "given_order_emissions": given["totals"],
+        "passes": passes,
+        "seconds": seconds,
+    }
@@ -0,0 +1,297 @@
+"""Offline stand-ins shared by the tests and the benchmarks.
+
+FakeRoutingServer answers /search (Nominatim JSON) and
+/v2/directions/<profile>/geojson (ORS GeoJSON) with deterministic synthetic
+data, after an optional artificial latency. Every `rate_limit_every`-th
+request gets a 429 with Retry-After so client backoff paths are exercised.
+
+    with FakeRoutingServer(latency=0.05) as server:
+        server.url  # e.g. http://127.0.0.1:54321
+
+FakeGeocoder and FakeRoutingBackend do the same in process. The rest builds
+synthetic inputs: random trip legs, a multi-page PDF with a stub OCR
+predictor, a road grid graph and routing lanes.
+"""
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+
+import numpy as np
+from aiohttp import web
+
+
+def fake_coordinates(place):
+    # Stable pseudo-random point in Europe for any place name
+    digest = hashlib.sha256(" ".join(place.lower().split()).encode("utf-8")).digest()
+    lat = 36 + digest[0] / 255 * 22
+    lon = -9 + digest[1] / 255 * 33
+    return round(lat, 6), round(lon, 6)
+
+
+def fake_route_feature(start, end, detour=1.0, n_points=200):
+    # start/end are [lon, lat]; a straight polyline with a road-like distance
+    (lon1, lat1), (lon2, lat2) = start, end
+    coords = []
+    for i in range(n_points):
+        t = i / (n_points - 1)
+        bulge = math.sin(math.pi * t) * (detour - 1.0)
+        coords.append([round(lon1 + (lon2 - lon1) * t + bulge, 6), round(lat1 + (lat2 - lat1) * t, 6)])
+
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    metres = 2 * 6371008.8 * math.asin(math.sqrt(a)) * 1.25 * detour
+    return {
+        "type": "Feature",
+        "geometry": {"type": "LineString", "coordinates": coords},
+        "properties": {"segments": [{"distance": metres, "duration": metres / 20}], "summary": {"distance": metres}},
+    }
+
+
+class FakeRoutingServer:
+    def __init__(self, latency=0.0, rate_limit_every=0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.throttled = 0
+        self._loop = None
+        self._thread = None
+        self._runner = None
+        self._started = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def _throttle(self):
+        self.requests += 1
+        sequence = self.requests
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_limit_every and sequence % self.rate_limit_every == 0:
+            self.throttled += 1
+            return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "0.01"})
+        return None
+
+    async def search(self, request):
+        throttled = await self._throttle()
+        if throttled is not None:
+            return throttled
+        place = request.query.get("q", "")
+        if not place.strip():
+            return web.json_response([])
+        lat, lon = fake_coordinates(place)
+        return web.json_response([{"lat": str(lat), "lon": str(lon), "display_name": place}])
+
+    async def directions(self, request):
+        throttled = await self._throttle()
+        if throttled is not None:
+            return throttled
+        body = await request.json()
+        start, end = body["coordinates"][0], body["coordinates"][-1]
+        features = [fake_route_feature(start, end)]
+        if body.get("alternative_routes"):
+            features.append(fake_route_feature(start, end, detour=1.02))
+        return web.json_response({"type": "FeatureCollection", "features": features})
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get("/search", self.search)
+        app.router.add_post("/v2/directions/{profile}/geojson", self.directions)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeGeocoder:
+    """In-process geocoder backend answering with fake_coordinates."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def geocode(self, place):
+        self.calls += 1
+        return list(fake_coordinates(place)) if place.strip() else None
+
+
+class FakeRoutingBackend:
+    """In-process RoutingBackend returning fake_route_feature routes, no HTTP involved."""
+
+    profile = "fake:driving-car"
+
+    def __init__(self, n_points=200):
+        self.n_points = n_points
+        self.calls = 0
+
+    def directions(self, start, end, alternative_routes=None):
+        from logic.backends import extract_route_info
+
+        self.calls += 1
+        features = [fake_route_feature(start[::-1], end[::-1], n_points=self.n_points)]
+        if alternative_routes:
+            features.append(fake_route_feature(start[::-1], end[::-1], detour=1.02, n_points=self.n_points))
+        return [extract_route_info(feature) for feature in features]
+
+
+# Legs random_legs mixes in that have no factor row
+UNMATCHED = [("HGV (>20t)", "diesel", "europe & south america"), ("Van", "hydrogen", "china")]
+
+
+def random_legs(n, seed=0):
+    from logic.emissions import df
+
+    rng = np.random.default_rng(seed)
+    combos = list(df[["Vehicle Type", "Fuel", "Region"]].itertuples(index=False, name=None)) + UNMATCHED
+    picks = rng.integers(0, len(combos), n)
+    vehicles, fuels, regions = (np.array([combos[i][k] for i in picks], dtype=object) for k in range(3))
+    # Exercise odd distances/loads, including tiny and zero values
+    distances = np.round(rng.exponential(250, n), rng.integers(0, 4))
+    loads = np.round(rng.uniform(0, 40, n), 1)
+    return vehicles, fuels, regions, distances, loads
+
+
+def synthetic_pdf(path, n_pages=40, rows=30):
+    # Minimal hand-written PDF: each page holds a small text table
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(n_pages):
+        lines = ["BT /F1 9 Tf 40 800 Td 12 TL"]
+        lines.append(f"(Module 2 - Road emission factors, page {p + 1}) Tj T*")
+        for r in range(rows):
+            lines.append(f"(Rigid truck {r}-{r + 4} t GVW   Diesel   {0.02 + r / 1000:.3f}   {19 + r}   {62 + r}   {81 + 2 * r}) Tj T*")
+        lines.append("ET")
+        stream = "\n".join(lines)
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {n_pages} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+class _StubResult:
+    def __init__(self, pages):
+        self._pages = pages
+
+    def export(self):
+        return {"pages": self._pages}
+
+
+class StubPredictor:
+    """Stands in for doctr's ocr_predictor: one fake word per page, sized from the image."""
+
+    def __call__(self, images):
+        pages = []
+        for i, image in enumerate(images):
+            height, width = image.shape[:2]
+            word = {"value": f"{float(image.mean()):.3f}", "confidence": 1.0, "geometry": [[0.1, 0.1], [0.2, 0.12]]}
+            line = {"geometry": word["geometry"], "words": [word]}
+            pages.append({"page_idx": i, "dimensions": [height, width],
+                          "blocks": [{"geometry": word["geometry"], "lines": [line], "artefacts": []}]})
+        return _StubResult(pages)
+
+
+def synthetic_grid(path, size=150, spacing_deg=0.01, origin=(50.0, 8.0), seed=0):
+    # Jittered grid road graph written with build_graph; returns (path, lat, lon)
+    from logic.local_routing import build_graph
+
+    rng = np.random.default_rng(seed)
+    rows, cols = np.divmod(np.arange(size * size), size)
+    lat = origin[0] + rows * spacing_deg + rng.normal(0, spacing_deg * 0.15, size * size)
+    lon = origin[1] + cols * spacing_deg + rng.normal(0, spacing_deg * 0.15, size * size)
+
+    node = np.arange(size * size).reshape(size, size)
+    src = np.concatenate([node[:, :-1].ravel(), node[:-1, :].ravel()])
+    dst = np.concatenate([node[:, 1:].ravel(), node[1:, :].ravel()])
+    # Drop a few edges so the grid has some detours, and make roads a bit longer than straight lines
+    keep = rng.random(len(src)) > 0.05
+    src, dst = src[keep], dst[keep]
+    straight = np.hypot((lat[src] - lat[dst]) * 111.2, (lon[src] - lon[dst]) * 71.5) * 1000
+    length = straight * rng.uniform(1.05, 1.4, len(src))
+    return build_graph(path, lat, lon, src, dst, length_m=length), lat, lon
+
+
+def make_lanes(n, n_depots=60, seed=0):
+    rng = random.Random(seed)
+    depots = [f"Depot {i}" for i in range(n_depots)]
+    return [tuple(rng.sample(depots, 2)) for _ in range(n)]
+
+
+def run_sequential(server, lanes):
+    # Swaps the module-level routing backend, geocoder and route cache (see restore_routing in conftest.py)
+    import openrouteservice
+
+    from logic import routing
+    from logic.backends import ORSBackend
+    from logic.geocache import NominatimGeocoder
+    from logic.route_cache import RouteCache
+
+    host = server.url.split("://", 1)[1]
+    routing.set_routing_backend(ORSBackend(openrouteservice.Client(key="benchmark", base_url=server.url)))
+    routing.route_cache = RouteCache()
+    routing.set_geocoder_backend(NominatimGeocoder(domain=host, scheme="http"))
+
+    start = time.perf_counter()
+    results = [routing.get_optimized_route(a, b) for a, b in lanes]
+    return results, time.perf_counter() - start
+
+
+def run_async(server, lanes, max_concurrency):
+    from logic.async_routing import AsyncRoutingClient
+    from logic.geocache import GeocodeCache
+    from logic.route_cache import RouteCache
+
+    async def plan():
+        client = AsyncRoutingClient(
+            api_key="benchmark", ors_base_url=server.url, nominatim_url=server.url,
+            max_concurrency=max_concurrency, max_geocode_concurrency=max_concurrency,
+            geocoder=GeocodeCache(backend=None), route_cache=RouteCache(),
+        )
+        async with client:
+            return await client.get_optimized_routes(lanes), client.retries
+
+    start = time.perf_counter()
+    (results, retries) = asyncio.run(plan())
+    return results, time.perf_counter() - start, retries
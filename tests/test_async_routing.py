@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from logic.async_routing import AsyncRoutingClient, GeocodingApiError, RoutingApiError
+from logic.backends import GeocodingError
+from logic.geocache import GeocodeCache
+from logic.route_cache import RouteCache
+from tests.fakes import FakeRoutingServer, make_lanes, run_async, run_sequential
+
+
+def test_async_client_matches_sequential_routes(restore_routing):
+    lanes = make_lanes(40, n_depots=15)
+    with FakeRoutingServer() as server:
+        sequential, _ = run_sequential(server, lanes)
+    with FakeRoutingServer(rate_limit_every=7) as server:
+        results, _, retries = run_async(server, lanes, max_concurrency=8)
+        throttled = server.throttled
+
+    assert retries == throttled > 0
+    for got, expected in zip(results, sequential):
+        assert got["baseline"]["distance_km"] == expected["baseline"]["distance_km"]
+        assert got["baseline"]["coordinates"] == expected["baseline"]["coordinates"]
+        assert got["note"] == expected["note"]
+
+
+def test_identical_requests_in_flight_are_sent_once():
+    lanes = [("Depot 1", "Depot 2")] * 10
+
+    async def plan(url):
+        client = AsyncRoutingClient(api_key="test", ors_base_url=url, nominatim_url=url, max_concurrency=4,
+                                    geocoder=GeocodeCache(backend=None), route_cache=RouteCache())
+        async with client:
+            return await client.get_optimized_routes(lanes)
+
+    with FakeRoutingServer(latency=0.02) as server:
+        results = asyncio.run(plan(server.url))
+        requests = server.requests
+    assert len({r["baseline"]["distance_km"] for r in results}) == 1
+    # Two geocodes and at most two direction calls (alternatives, plus a baseline if none came back)
+    assert requests <= 4
+
+
+def test_unknown_place_raises_geocoding_error():
+    async def plan(url):
+        client = AsyncRoutingClient(api_key="test", ors_base_url=url, nominatim_url=url,
+                                    geocoder=GeocodeCache(backend=None), route_cache=RouteCache())
+        async with client:
+            return await client.get_coordinates(" ")
+
+    with FakeRoutingServer() as server, pytest.raises(GeocodingError):
+        asyncio.run(plan(server.url))
+
+
+def _plan(url, call, **options):
+    options.setdefault("geocoder", GeocodeCache(backend=None))
+
+    async def plan():
+        client = AsyncRoutingClient(api_key="test", ors_base_url=url, nominatim_url=url, backoff_base=0.001,
+                                    route_cache=RouteCache(), **options)
+        async with client:
+            return await call(client)
+    return plan()
+
+
+def test_geocode_rate_limit_is_a_geocoding_error():
+    with FakeRoutingServer(rate_limit_every=1) as server, pytest.raises(GeocodingApiError) as raised:
+        asyncio.run(_plan(server.url, lambda c: c.get_coordinates("Berlin"), max_retries=1))
+    assert raised.value.status == 429
+
+
+def test_directions_rate_limit_is_a_routing_error():
+    geocoder = GeocodeCache(backend=None)
+    geocoder.remember("Berlin", [52.52, 13.40])
+    geocoder.remember("Potsdam", [52.40, 13.06])
+    with FakeRoutingServer(rate_limit_every=1) as server, pytest.raises(RoutingApiError):
+        asyncio.run(_plan(server.url, lambda c: c.get_optimized_route("Berlin", "Potsdam"),
+                          geocoder=geocoder, max_retries=0))
+
+
+def test_timeout_is_wrapped():
+    with FakeRoutingServer(latency=1.0) as server, pytest.raises(GeocodingApiError) as raised:
+        asyncio.run(_plan(server.url, lambda c: c.get_coordinates("Berlin"), timeout=0.05))
+    assert raised.value.status is None
+
+
+def test_connection_error_is_wrapped():
+    with FakeRoutingServer() as server:
+        url = server.url
+    # The server is gone, so the connection is refused
+    with pytest.raises(GeocodingApiError):
+        asyncio.run(_plan(url, lambda c: c.get_coordinates("Berlin")))
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from logic import routing
+from logic.batch import geocode_places, process_chunk, run_batch
+from logic.route_cache import RouteCache
+from tests.fakes import FakeGeocoder, FakeRoutingBackend
+
+VEHICLE = {"vehicle_type": "Rigid truck (18t)", "fuel": "Diesel", "load_tons": 10.0, "region": "Europe & South America"}
+
+
+@pytest.fixture
+def fakes(restore_routing):
+    geocoder, backend = FakeGeocoder(), FakeRoutingBackend(n_points=20)
+    routing.set_geocoder_backend(geocoder)
+    routing.set_routing_backend(backend)
+    routing.route_cache = RouteCache()
+    return geocoder, backend
+
+
+def trips(pairs):
+    return pd.DataFrame([{**VEHICLE, "origin": o, "destination": d} for o, d in pairs])
+
+
+def test_blank_and_missing_places_are_no_route(fakes):
+    chunk = trips([("Hamburg", "Munich"), (np.nan, "Munich"), ("Hamburg", "   "), (None, None)])
+    out = process_chunk(chunk)
+    assert list(out["status"]) == ["ok", "no_route", "no_route", "no_route"]
+    assert out["distance_km"].iloc[0] > 0
+    assert out["distance_km"].iloc[1:].isna().all()
+
+
+def test_each_distinct_place_is_geocoded_once(fakes):
+    geocoder, backend = fakes
+    chunk = trips([("Hamburg", "Munich"), (" Hamburg", "Munich"), ("Munich", "Hamburg"), ("Berlin", "Munich")])
+    coordinates = geocode_places(chunk)
+    assert sorted(coordinates) == ["Berlin", "Hamburg", "Munich"]
+    assert geocoder.calls == 3
+
+    out = process_chunk(chunk, coordinates)
+    assert geocoder.calls == 3
+    assert backend.calls == 3
+    assert (out["status"] == "ok").all()
+
+
+def test_rows_with_a_distance_are_not_geocoded(fakes):
+    geocoder, _ = fakes
+    chunk = trips([("Hamburg", "Munich")]).assign(distance_km=[780.0])
+    assert geocode_places(chunk) == {}
+    assert process_chunk(chunk)["distance_km"].iloc[0] == 780.0
+    assert geocoder.calls == 0
+
+
+def test_run_batch_writes_every_row(fakes, tmp_path):
+    source, target = tmp_path / "trips.csv", tmp_path / "out.csv"
+    trips([("Hamburg", "Munich"), ("", "Munich")] * 3).to_csv(source, index=False)
+    stats = run_batch(str(source), str(target), chunk_rows=4, workers=0, progress=lambda _: None)
+    assert stats["rows"] == 6 and stats["ok"] == 3 and stats["no_route"] == 3
+    assert len(pd.read_csv(target)) == 6
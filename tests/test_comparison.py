@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from logic.comparison import get_factor_cube, rank_options
+from logic.emissions import calculate_emissions
+
+EUROPE = "Europe & South America"
+
+
+def test_ranking_is_sorted_and_relative_to_the_best():
+    ranked = rank_options({EUROPE: 585.0 * 10})["ranked"]
+    assert list(ranked["Rank"]) == list(range(1, len(ranked) + 1))
+    assert ranked["WTW (kg)"].is_monotonic_increasing
+    assert ranked["vs best (%)"].iloc[0] == 0.0
+    best, last = ranked["WTW (kg)"].iloc[0], ranked.iloc[-1]
+    assert last["vs best (%)"] == pytest.approx((last["WTW (kg)"] / best - 1) * 100, abs=0.1)
+    assert len(rank_options({EUROPE: 5850.0}, top=3)["ranked"]) == 3
+
+
+def test_evaluate_matches_the_factor_table_per_combo():
+    cube = get_factor_cube()
+    europe = cube.region_position(EUROPE)
+    kg = cube.evaluate(cube.tkm_matrix([{EUROPE: 1000.0}, {EUROPE: 250.0, EUROPE.lower(): 250.0}]))
+    for c in np.flatnonzero(cube.available[europe]):
+        wtt, ttw, wtw = cube.factors[europe, c]
+        assert kg["WTT"][0, c] == pytest.approx(wtt)
+        assert kg["WTW"][0, c] == pytest.approx(wtw)
+        assert kg["TTW"][1, c] == pytest.approx(ttw / 2)
+    assert np.isnan(kg["WTW"][0, ~cube.available[europe]]).all()
+
+
+def test_options_missing_in_a_driven_region_are_not_ranked():
+    cube = get_factor_cube()
+    result = rank_options({EUROPE: 5000.0, "North America": 1000.0})
+    both = cube.available[cube.region_position(EUROPE)] & cube.available[cube.region_position("North America")]
+    assert len(result["ranked"]) == both.sum()
+    assert len(result["missing"]) > 0
+    assert result["missing"]["Missing in"].str.len().gt(0).all()
+
+
+def test_fuel_comparison_matches_calculate_emissions():
+    fuels = get_factor_cube().fuel_comparison("Rigid truck (18t)", {EUROPE: 5850.0})
+    expected = calculate_emissions("Rigid truck (18t)", "diesel", 585.0, 10.0, EUROPE)
+    assert fuels["diesel"] == pytest.approx(expected["WTW"], abs=0.005)
+
+
+def test_unknown_region_is_rejected():
+    with pytest.raises(ValueError, match="No factors for region: atlantis"):
+        rank_options({"Atlantis": 100.0})
@@ -0,0 +1,30 @@
+from logic import emissions
+from logic.emissions import get_factor_index
+
+
+def test_misses_do_not_grow_the_index(monkeypatch):
+    index = get_factor_index()
+    monkeypatch.setattr(emissions, "MAX_TRACKED_MISSES", 10)
+    index.reset_misses()
+    size = len(index)
+    for i in range(50):
+        assert index.lookup(f"Spaceship{i}", "diesel", "europe & south america") is None
+    assert index.lookup("Spaceship0", "diesel", "europe & south america") is None
+
+    assert len(index) == size
+    report = index.miss_report()
+    assert len(report) == 10
+    assert report[0]["vehicle_token"] == "spaceship0" and report[0]["misses"] == 2
+    assert index.untracked_misses == 40
+    index.reset_misses()
+    assert index.miss_report() == [] and index.untracked_misses == 0
+
+
+def test_partial_token_hits_are_memoized():
+    index = get_factor_index()
+    size = len(index)
+    record = index.lookup("Rig", "diesel", "Europe & South America")
+    assert record is not None and "rig" in record.vehicle_type
+    assert len(index) == size + 1
+    assert index.lookup("rig truck", "diesel", "europe & south america") is record
+    assert len(index) == size + 1
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from logic.emissions import calculate_emissions, calculate_emissions_batch
+from tests.fakes import UNMATCHED, random_legs
+
+
+def scalar_or_none(vehicle, fuel, distance, load, region):
+    try:
+        return calculate_emissions(vehicle, fuel, float(distance), float(load), region)
+    except ValueError:
+        return None
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_matches_scalar_leg_for_leg(seed):
+    vehicles, fuels, regions, distances, loads = random_legs(2000, seed)
+    batch = calculate_emissions_batch(vehicle_type=vehicles, fuel=fuels, distance_km=distances,
+                                      load_tons=loads, region=regions, errors="nan")
+    for i in range(len(distances)):
+        expected = scalar_or_none(vehicles[i], fuels[i], distances[i], loads[i], regions[i])
+        if expected is None:
+            assert all(np.isnan(batch[key][i]) for key in batch), i
+            continue
+        for key, value in expected.items():
+            actual = batch[key][i]
+            assert (np.isnan(value) and np.isnan(actual)) or value == actual, (i, key, value, actual)
+
+
+def test_batch_accepts_a_dataframe_and_broadcasts_scalars():
+    vehicles, fuels, regions, distances, loads = random_legs(50, seed=7)
+    keep = [(v, f, r) not in UNMATCHED for v, f, r in zip(vehicles, fuels, regions)]
+    trips = pd.DataFrame({"vehicle_type": vehicles, "fuel": fuels, "region": regions,
+                          "distance_km": distances, "load_tons": 12.5})[keep]
+    from_frame = calculate_emissions_batch(trips, errors="nan")
+    broadcast = calculate_emissions_batch(vehicle_type=trips["vehicle_type"], fuel=trips["fuel"],
+                                          region=trips["region"], distance_km=trips["distance_km"],
+                                          load_tons=12.5, errors="nan")
+    for key in ("WTT", "TTW", "WTW"):
+        np.testing.assert_array_equal(from_frame[key], broadcast[key])
+
+
+def test_unmatched_leg_raises_by_default():
+    vehicle, fuel, region = UNMATCHED[0]
+    with pytest.raises(ValueError, match="No match found"):
+        calculate_emissions_batch(vehicle_type=[vehicle], fuel=[fuel], distance_km=[10.0], load_tons=[1.0],
+                                  region=[region])
@@ -0,0 +1,39 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from logic.export import REPORT_COLUMNS, export_report, report_bytes, trip_report_chunks
+
+COORDS = [[52.52, 13.40], [51.34, 12.37], [49.45, 11.08], [48.14, 11.58]]
+TRIP = ("Rigid truck (18t)", "Diesel", 10.0, "Europe & South America")
+
+
+def chunks(chunk_rows=2):
+    return trip_report_chunks(COORDS, *TRIP, total_km=585.0, chunk_rows=chunk_rows)
+
+
+def test_file_objects_need_a_format():
+    with pytest.raises(ValueError, match="fmt is required"):
+        export_report(chunks(), io.BytesIO())
+
+
+def test_format_follows_the_path_extension(tmp_path):
+    path = str(tmp_path / "report.ndjson")
+    assert export_report(chunks(), path) == len(COORDS)
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [row["Point"] for row in rows] == [1, 2, 3, 4]
+    assert rows[-1]["Cumulative Distance (km)"] == pytest.approx(585.0)
+
+
+def test_csv_matches_ndjson():
+    csv = pd.read_csv(io.BytesIO(report_bytes(chunks(), "csv")))
+    ndjson = pd.read_json(io.BytesIO(report_bytes(chunks(chunk_rows=3), "ndjson")), lines=True)
+    assert list(csv.columns) == list(REPORT_COLUMNS)
+    pd.testing.assert_frame_equal(csv[list(REPORT_COLUMNS[1:])], ndjson[list(REPORT_COLUMNS[1:])], check_dtype=False)
+
+
+def test_empty_csv_report_still_has_a_header():
+    assert report_bytes(iter(()), "csv").decode("utf-8").strip() == ",".join(REPORT_COLUMNS)
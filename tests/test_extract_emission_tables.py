@@ -0,0 +1,77 @@
+import pytest
+
+from logic import extract_emission_tables
+from logic.extract_emission_tables import (completed_pages, extract_from_pdf, extract_to_jsonl, load_jsonl_result,
+                                           page_count)
+from tests.fakes import StubPredictor, synthetic_pdf
+
+N_PAGES = 6
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    return synthetic_pdf(str(tmp_path / "synthetic.pdf"), N_PAGES, rows=5)
+
+
+@pytest.fixture(autouse=True)
+def stub_predictor(monkeypatch):
+    # Predictors are cached per process; start each test with the stub standing in for doctr
+    monkeypatch.setattr(extract_emission_tables, "_predictors", {None: StubPredictor()})
+
+
+@pytest.mark.parametrize("workers, batch_size", [(0, 4), (2, 4)])
+def test_every_page_is_written_once_in_order(pdf, tmp_path, workers, batch_size):
+    out = str(tmp_path / "out.jsonl")
+    written = extract_to_jsonl(pdf, out, batch_size=batch_size, workers=workers, predictor_factory=StubPredictor)
+    assert written == page_count(pdf) == N_PAGES
+    assert [page["page_idx"] for page in load_jsonl_result(out)["pages"]] == list(range(N_PAGES))
+
+
+def test_resume_redoes_only_missing_pages(pdf, tmp_path):
+    out = str(tmp_path / "out.jsonl")
+    extract_to_jsonl(pdf, out, workers=0)
+    with open(out, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    # Drop the last two pages and leave a torn line behind, as an interrupted run would
+    with open(out, "w", encoding="utf-8") as f:
+        f.writelines(lines[:-2])
+        f.write(lines[-2][:20])
+
+    assert completed_pages(out) == set(range(N_PAGES - 2))
+    assert extract_to_jsonl(pdf, out, workers=0) == 2
+    assert completed_pages(out) == set(range(N_PAGES))
+    assert len(load_jsonl_result(out)["pages"]) == N_PAGES
+    assert extract_to_jsonl(pdf, out, workers=0) == 0
+
+
+def test_without_resume_the_output_is_rewritten(pdf, tmp_path):
+    out = str(tmp_path / "out.jsonl")
+    extract_to_jsonl(pdf, out, page_ids=[0, 1], workers=0)
+    assert extract_to_jsonl(pdf, out, page_ids=[2], workers=0, resume=False) == 1
+    assert completed_pages(out) == {2}
+
+
+def test_extract_from_pdf_keeps_requested_page_ids(pdf):
+    assert [page["page_idx"] for page in extract_from_pdf(pdf, [4, 1])["pages"]] == [4, 1]
+    assert len(extract_from_pdf(pdf)["pages"]) == N_PAGES
+
+
+def test_extract_from_pdf_reads_every_page_for_an_empty_selection(pdf):
+    assert [page["page_idx"] for page in extract_from_pdf(pdf, [])["pages"]] == list(range(N_PAGES))
+
+
+class ConstantPredictor(StubPredictor):
+    def __call__(self, images):
+        result = super().__call__(images)
+        for page in result.export()["pages"]:
+            page["blocks"][0]["lines"][0]["words"][0]["value"] = "constant"
+        return result
+
+
+def test_a_given_factory_is_used_even_with_a_cached_predictor(pdf, tmp_path):
+    out = str(tmp_path / "out.jsonl")
+    extract_to_jsonl(pdf, out, page_ids=[0], workers=0)
+    extract_to_jsonl(pdf, out, page_ids=[1], workers=0, predictor_factory=ConstantPredictor)
+    words = [page["blocks"][0]["lines"][0]["words"][0]["value"] for page in load_jsonl_result(out)["pages"]]
+    assert words[0] != "constant"
+    assert words[1] == "constant"
@@ -0,0 +1,69 @@
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+from logic.emissions import EmissionFactorIndex, load_factor_frame
+from logic.factor_artifact import (ARTIFACT_FORMAT_VERSION, FACTORS_CSV, ArtifactError, build_factor_artifact,
+                                   load_factor_artifact)
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    source = tmp_path / "factors.csv"
+    shutil.copy(FACTORS_CSV, source)
+    out = tmp_path / "artifact"
+    build_factor_artifact(str(source), str(out))
+    return source, out
+
+
+def test_artifact_matches_the_csv(artifact):
+    source, out = artifact
+    table = load_factor_artifact(str(out), source=str(source))
+    frame = load_factor_frame(str(source))
+    assert len(table) == len(frame)
+    assert table.regions == frame["Region"].tolist()
+    assert isinstance(table.factor_matrix, np.memmap)
+
+    from_csv = EmissionFactorIndex.from_dataframe(frame)
+    from_artifact = EmissionFactorIndex(table)
+    np.testing.assert_array_equal(from_artifact.factor_matrix, from_csv.factor_matrix)
+    np.testing.assert_array_equal(from_artifact.load_matrix, from_csv.load_matrix)
+    for key in ("Rigid truck (18t)", "diesel", "europe & south america"), ("Van", "cng", "europe & south america"):
+        assert from_artifact.lookup(*key).row == from_csv.lookup(*key).row
+
+
+def test_corrupted_file_fails_its_checksum(artifact):
+    source, out = artifact
+    factors = np.load(out / "factors.npy")
+    factors[0, 0] += 1
+    np.save(out / "factors.npy", factors)
+    with pytest.raises(ArtifactError, match="Checksum mismatch for factors.npy"):
+        load_factor_artifact(str(out))
+    assert len(load_factor_artifact(str(out), verify=False)) == len(factors)
+
+
+def test_edited_csv_makes_the_artifact_stale(artifact):
+    source, out = artifact
+    with open(source, "a", encoding="utf-8") as f:
+        f.write("\n")
+    with pytest.raises(ArtifactError, match="out of date"):
+        load_factor_artifact(str(out), source=str(source))
+    build_factor_artifact(str(source), str(out))
+    load_factor_artifact(str(out), source=str(source))
+
+
+def test_missing_or_foreign_artifacts_are_rejected(artifact, tmp_path):
+    _, out = artifact
+    with pytest.raises(ArtifactError, match="No factor artifact"):
+        load_factor_artifact(str(tmp_path / "nowhere"))
+    meta = json.loads((out / "meta.json").read_text())
+    meta["version"] = ARTIFACT_FORMAT_VERSION + 1
+    (out / "meta.json").write_text(json.dumps(meta))
+    with pytest.raises(ArtifactError, match="Unsupported factor artifact version"):
+        load_factor_artifact(str(out))
+
+
+def test_shipped_artifact_is_current():
+    load_factor_artifact(source=FACTORS_CSV)
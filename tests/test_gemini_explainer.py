@@ -0,0 +1,57 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from logic.gemini_explainer import ExplanationCache, Explainer, FakeGeminiBackend, build_prompt
+
+PROMPT = build_prompt("Why is WTW higher than TTW?", "Hamburg -> Munich, 10 t, diesel")
+
+
+def stored_keys(path):
+    with sqlite3.connect(path) as conn:
+        return sorted(key for (key,) in conn.execute("SELECT key FROM explanations"))
+
+
+def test_cache_hit_skips_the_backend():
+    backend = FakeGeminiBackend()
+    explainer = Explainer(backend, ExplanationCache())
+    first = explainer.ask(PROMPT)
+    assert explainer.ask(PROMPT) == first
+    assert backend.calls == 1
+
+
+def test_concurrent_identical_questions_share_one_call():
+    backend = FakeGeminiBackend(delay=0.2)
+    explainer = Explainer(backend, ExplanationCache())
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        answers = list(pool.map(lambda _: explainer.ask(PROMPT), range(8)))
+    assert len(set(answers)) == 1
+    assert backend.calls == 1
+
+
+def test_stream_caches_the_joined_answer():
+    backend = FakeGeminiBackend(answer="Fuller loads cut WTW per tonne-km.", delay=0.01)
+    explainer = Explainer(backend, ExplanationCache())
+    chunks = list(explainer.stream(PROMPT))
+    assert len(chunks) > 1
+    assert explainer.ask(PROMPT) == "".join(chunks) == backend.answer
+    assert backend.calls == 1
+
+
+def test_expired_answers_are_deleted_on_read(tmp_path):
+    path = str(tmp_path / "explanations.sqlite")
+    ExplanationCache(path=path).put("old", "answer")
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE explanations SET created = 1")
+
+    reopened = ExplanationCache(path=path, ttl_seconds=60)
+    assert reopened.get("old") is None
+    assert len(reopened) == 0
+    assert stored_keys(path) == []
+
+
+def test_oldest_answers_are_dropped_beyond_max_rows(tmp_path):
+    path = str(tmp_path / "explanations.sqlite")
+    cache = ExplanationCache(path=path, max_rows=2)
+    for i in range(4):
+        cache.put(f"key{i}", f"answer {i}")
+    assert stored_keys(path) == ["key2", "key3"]
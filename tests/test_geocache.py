@@ -0,0 +1,76 @@
+import sqlite3
+
+from logic.geocache import GeocodeCache, LRUCache, SQLiteGeocodeStore, StaticGeocoder, normalize_place
+
+PLACES = {"Berlin": (52.52, 13.40), "Munich": (48.14, 11.58), "Hamburg": (53.55, 9.99)}
+
+
+def set_column(path, column, place, value):
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"UPDATE geocode SET {column} = ? WHERE place = ?", (value, place))
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
+
+
+def test_store_drops_expired_places(tmp_path):
+    path = str(tmp_path / "geocode.sqlite")
+    store = SQLiteGeocodeStore(path, ttl_seconds=60)
+    store.put("berlin", [52.52, 13.40])
+    store.put("munich", [48.14, 11.58])
+    set_column(path, "created", "berlin", 1)
+
+    assert store.get("berlin") is None
+    assert store.get("munich") == [48.14, 11.58]
+    assert len(store) == 1
+
+    set_column(path, "created", "munich", 1)
+    assert store.purge_expired() == 1
+    assert len(store) == 0
+
+
+def test_store_evicts_the_least_recently_accessed(tmp_path):
+    path = str(tmp_path / "geocode.sqlite")
+    store = SQLiteGeocodeStore(path, max_entries=2)
+    store.put("berlin", [52.52, 13.40])
+    store.put("munich", [48.14, 11.58])
+    set_column(path, "accessed", "berlin", 100)
+    set_column(path, "accessed", "munich", 50)
+    # Reading Munich makes it the most recently used, so Berlin goes first
+    assert store.get("munich") is not None
+    store.put("hamburg", [53.55, 9.99])
+    assert store.get("berlin") is None
+    assert store.get("munich") is not None and store.get("hamburg") is not None
+    assert store.evictions == 1
+
+
+def test_cache_calls_the_backend_once_per_place(tmp_path):
+    backend = StaticGeocoder(PLACES)
+    cache = GeocodeCache(backend, store=SQLiteGeocodeStore(str(tmp_path / "geocode.sqlite")))
+    assert cache.geocode("Berlin") == [52.52, 13.40]
+    assert cache.geocode("  berlin ") == [52.52, 13.40]
+    assert backend.calls == 1
+    assert cache.stats["memory_hits"] == 1
+
+    # A fresh process finds it in the SQLite store
+    reopened = GeocodeCache(backend, store=SQLiteGeocodeStore(str(tmp_path / "geocode.sqlite")))
+    assert reopened.geocode("BERLIN") == [52.52, 13.40]
+    assert backend.calls == 1
+    assert reopened.stats["disk_hits"] == 1
+
+
+def test_unknown_places_are_not_cached():
+    backend = StaticGeocoder(PLACES)
+    cache = GeocodeCache(backend)
+    assert cache.geocode("Atlantis") is None
+    assert cache.geocode("Atlantis") is None
+    assert backend.calls == 2
+    assert cache.cached("Atlantis") is None
+    assert normalize_place(" New   York ") == "new york"
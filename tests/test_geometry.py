@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from logic.geometry import (decode_polyline, encode_polyline, from_fixed_point, haversine_km, simplify,
+                            to_fixed_point)
+
+BERLIN, MUNICH = [52.52, 13.40], [48.14, 11.58]
+
+
+def wiggly_route(end=MUNICH, n=500, amplitude_m=5.0):
+    # Straight line from Berlin with a few metres of GPS-like noise across it
+    rng = np.random.default_rng(0)
+    lat = np.linspace(BERLIN[0], end[0], n)
+    lon = np.linspace(BERLIN[1], end[1], n) + rng.uniform(-1, 1, n) * amplitude_m / 70_000
+    return np.column_stack([lat, lon])
+
+
+def test_google_reference_polyline():
+    # Example from the encoded polyline algorithm documentation
+    coords = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+    assert encode_polyline(coords) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    np.testing.assert_allclose(decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@"), coords)
+
+
+def test_polyline_round_trip_keeps_the_precision():
+    coords = wiggly_route()
+    np.testing.assert_allclose(decode_polyline(encode_polyline(coords)), coords, atol=0.5e-5)
+    np.testing.assert_allclose(decode_polyline(encode_polyline(coords, precision=6), precision=6), coords,
+                               atol=0.5e-6)
+
+
+def test_fixed_point_round_trip_is_within_a_tenth_of_a_metre():
+    coords = wiggly_route()
+    fixed = to_fixed_point(coords)
+    assert fixed.dtype == np.int32 and fixed.shape == coords.shape
+    back = from_fixed_point(fixed)
+    assert haversine_km(coords[:, 0], coords[:, 1], back[:, 0], back[:, 1]).max() < 0.0001
+
+
+@pytest.mark.parametrize("method", ["rdp", "visvalingam"])
+def test_simplify_drops_noise_and_keeps_endpoints(method):
+    # A vertex every ~10 m, as in ORS geometry through a city
+    coords = wiggly_route(end=[52.475, 13.40])
+    simplified = simplify(coords, tolerance_m=25.0, method=method)
+    assert len(simplified) < len(coords) // 10
+    np.testing.assert_array_equal(simplified[0], coords[0])
+    np.testing.assert_array_equal(simplified[-1], coords[-1])
+
+
+def test_rdp_keeps_corners_beyond_the_tolerance():
+    corner = [[52.0, 13.0], [52.0, 13.5], [52.0, 14.0], [52.5, 14.0], [53.0, 14.0]]
+    np.testing.assert_array_equal(simplify(corner, tolerance_m=25.0), [[52.0, 13.0], [52.0, 14.0], [53.0, 14.0]])
+
+
+def test_simplify_leaves_short_lines_and_rejects_unknown_methods():
+    assert len(simplify([BERLIN, MUNICH])) == 2
+    with pytest.raises(ValueError):
+        simplify(wiggly_route(), method="chaikin")
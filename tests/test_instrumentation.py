@@ -0,0 +1,64 @@
+import json
+from collections import Counter
+
+import pytest
+
+from logic import instrumentation
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_enabled", True)
+    monkeypatch.setattr(instrumentation, "_histograms", {})
+    monkeypatch.setattr(instrumentation, "_collectors", {})
+    return instrumentation
+
+
+def test_nothing_is_recorded_while_disabled(metrics):
+    metrics.disable()
+
+    @metrics.timed("op")
+    def op():
+        return 42
+
+    assert op() == 42
+    with metrics.timer("block"):
+        pass
+    assert metrics.snapshot()["timings"] == {}
+
+
+def test_errors_are_counted_and_reraised(metrics):
+    @metrics.timed("op")
+    def op(fail):
+        if fail:
+            raise RuntimeError("boom")
+
+    op(False)
+    with pytest.raises(RuntimeError):
+        op(True)
+    timing = metrics.snapshot()["timings"]["op"]
+    assert timing["count"] == 2 and timing["errors"] == 1
+
+
+def test_json_export_includes_cache_hit_rates(metrics):
+    metrics.observe("geocode", 0.003)
+    metrics.observe("geocode", 0.2)
+    metrics.register_collector("routes", lambda: Counter(hits=3, misses=1))
+    data = json.loads(metrics.to_json())
+    geocode = data["timings"]["geocode"]
+    assert geocode["count"] == 2 and geocode["max_ms"] == 200.0
+    assert geocode["buckets"]["0.005"] == 1 and geocode["buckets"]["0.25"] == 1
+    assert data["caches"]["routes"] == {"hits": 3, "misses": 1, "hit_rate": 0.75}
+
+
+def test_prometheus_buckets_are_cumulative(metrics):
+    metrics.observe("ors.directions", 0.003)
+    metrics.observe("ors.directions", 0.2, error=True)
+    metrics.register_collector("routes", lambda: {"hits": 1, "misses": 1})
+    lines = metrics.to_prometheus().splitlines()
+    assert 'greenroute_call_duration_seconds_bucket{op="ors.directions",le="0.005"} 1' in lines
+    assert 'greenroute_call_duration_seconds_bucket{op="ors.directions",le="0.25"} 2' in lines
+    assert 'greenroute_call_duration_seconds_bucket{op="ors.directions",le="+Inf"} 2' in lines
+    assert 'greenroute_call_duration_seconds_count{op="ors.directions"} 2' in lines
+    assert 'greenroute_call_errors_total{op="ors.directions"} 1' in lines
+    assert 'greenroute_cache_stat{cache="routes",stat="hit_rate"} 0.5' in lines
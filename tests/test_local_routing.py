@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from logic.backends import RoutingError
+from logic.geometry import haversine_km
+from logic.local_routing import LocalGraphBackend, build_graph_from_osm
+from tests.fakes import synthetic_grid
+
+SIZE = 25
+
+
+@pytest.fixture(scope="module")
+def grid(tmp_path_factory):
+    return synthetic_grid(str(tmp_path_factory.mktemp("graph")), SIZE)
+
+
+def random_pairs(n, seed):
+    rng = np.random.default_rng(seed)
+    return [tuple(int(node) for node in rng.integers(0, SIZE * SIZE, 2)) for _ in range(n)]
+
+
+def path_metres(backend, edges):
+    return float(np.sum(backend.weights[edges])) if edges else 0.0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_astar_and_bidirectional_find_the_dijkstra_shortest_path(grid, seed):
+    path, _, _ = grid
+    astar = LocalGraphBackend(path, algorithm="astar")
+    bidirectional = LocalGraphBackend(path, algorithm="bidirectional")
+    for source, target in random_pairs(20, seed):
+        expected = astar._distances_from(source, [target])[0]
+        for backend in (astar, bidirectional):
+            nodes, edges = backend.shortest_path(source, target)
+            assert nodes[0] == source and nodes[-1] == target
+            assert path_metres(backend, edges) == pytest.approx(expected, rel=1e-6)
+
+
+def test_directions_snaps_to_the_nearest_nodes(grid):
+    path, lat, lon = grid
+    backend = LocalGraphBackend(path)
+    (source, target), = random_pairs(1, seed=5)
+    route = backend.directions([lat[source] + 1e-5, lon[source]], [lat[target], lon[target] - 1e-5])[0]
+    assert route["coordinates"][0] == [lat[source], lon[source]]
+    assert route["coordinates"][-1] == [lat[target], lon[target]]
+
+
+def test_alternatives_respect_the_share_factor(grid):
+    path, lat, lon = grid
+    backend = LocalGraphBackend(path)
+    for source, target in random_pairs(5, seed=7):
+        routes = backend.directions([lat[source], lon[source]], [lat[target], lon[target]],
+                                    {"share_factor": 0.6, "target_count": 2})
+        assert 1 <= len(routes) <= 3
+        assert routes[0]["distance_km"] <= min(route["distance_km"] for route in routes)
+
+
+def test_matrix_matches_point_to_point_searches(grid):
+    path, lat, lon = grid
+    backend = LocalGraphBackend(path, algorithm="bidirectional")
+    nodes = [node for pair in random_pairs(3, seed=9) for node in pair]
+    matrix = backend.matrix([(lat[node], lon[node]) for node in nodes])
+    assert np.allclose(np.diag(matrix), 0.0)
+    for i, a in enumerate(nodes):
+        for j, b in enumerate(nodes):
+            _, edges = backend.shortest_path(a, b)
+            assert matrix[i, j] == pytest.approx(path_metres(backend, edges) / 1000, rel=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_nearest_node_matches_a_full_scan(grid, seed):
+    path, lat, lon = grid
+    backend = LocalGraphBackend(path)
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([rng.uniform(lat.min() - 0.02, lat.max() + 0.02, 200),
+                              rng.uniform(lon.min() - 0.02, lon.max() + 0.02, 200)])
+    for p_lat, p_lon in points:
+        km = haversine_km(p_lat, p_lon, lat, lon)
+        assert km[backend.nearest_node(p_lat, p_lon)] == pytest.approx(km.min())
+
+
+def test_points_far_from_the_graph_are_refused(grid):
+    path, lat, lon = grid
+    backend = LocalGraphBackend(path, max_snap_km=2.0)
+    with pytest.raises(RoutingError, match="No road within 2 km"):
+        backend.nearest_node(lat.min() - 0.05, lon.min())
+    with pytest.raises(RoutingError):
+        backend.directions([lat[0], lon[0]], [lat.max() + 1.0, lon.max() + 1.0])
+
+
+OSM_EXTRACT = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="52.000" lon="13.000"/>
+  <node id="2" lat="52.000" lon="13.010"/>
+  <node id="3" lat="52.010" lon="13.010"/>
+  <node id="4" lat="52.010" lon="13.000"/>
+  <node id="5" lat="52.005" lon="13.005"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><tag k="highway" v="residential"/><tag k="oneway" v="yes"/></way>
+  <way id="11"><nd ref="2"/><nd ref="3"/><nd ref="4"/><nd ref="1"/><tag k="highway" v="residential"/></way>
+  <way id="12"><nd ref="1"/><nd ref="5"/><nd ref="3"/><tag k="highway" v="footway"/></way>
+</osm>
+"""
+
+
+def test_graph_from_an_osm_extract_respects_one_way_streets(tmp_path):
+    osm = tmp_path / "extract.osm"
+    osm.write_text(OSM_EXTRACT, encoding="utf-8")
+    backend = LocalGraphBackend(build_graph_from_osm(str(osm), str(tmp_path / "graph")))
+    # The footway and its middle node are not part of the road graph
+    assert backend.n_nodes == 4
+    assert backend.indptr.dtype == np.int32
+
+    start, end = [52.000, 13.000], [52.000, 13.010]
+    forward = backend.directions(start, end)[0]["distance_km"]
+    backward = backend.directions(end, start)[0]["distance_km"]
+    assert forward == pytest.approx(haversine_km(*start, *end), abs=0.01)
+    assert backward > 3 * forward
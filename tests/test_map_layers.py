@@ -0,0 +1,29 @@
+import folium
+import numpy as np
+
+from logic.map_layers import add_emission_cells, bin_emissions, bin_profiles, cells_geojson
+
+
+def geojson_layers(m):
+    return [child for child in m._children.values() if isinstance(child, folium.GeoJson)]
+
+
+def test_empty_cells_add_no_layer():
+    m = folium.Map()
+    geojson = cells_geojson(bin_profiles([]))
+    assert geojson["features"] == []
+    assert add_emission_cells(m, geojson) is m
+    assert geojson_layers(m) == []
+    m.get_root().render()
+
+
+def test_cells_become_one_layer():
+    lat = np.linspace(52.0, 52.5, 50)
+    lon = np.linspace(13.0, 13.5, 50)
+    bins = bin_emissions(lat, lon, np.ones(50), cell_km=5.0)
+    assert bins["value"].sum() == 50
+
+    m = add_emission_cells(folium.Map(), cells_geojson(bins))
+    assert len(geojson_layers(m)) == 1
+    # folium writes the GeoJSON ASCII-escaped
+    assert r'"label": "1.0 kg CO\u2082e"' in m.get_root().render()
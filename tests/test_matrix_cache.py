@@ -0,0 +1,59 @@
+import os
+import time
+
+import numpy as np
+
+from logic.route_cache import MatrixCache, matrix_key
+from logic.vrp import distance_matrix
+
+LOCATIONS = [[52.52, 13.40], [48.14, 11.58], [50.11, 8.68]]
+
+
+class CountingBackend:
+    profile = "test:driving-car"
+
+    def __init__(self):
+        self.calls = 0
+
+    def matrix(self, locations):
+        self.calls += 1
+        return np.full((len(locations), len(locations)), 7.0)
+
+
+def npy_files(path):
+    return sorted(name for name in os.listdir(path) if name.endswith(".npy"))
+
+
+def test_only_routed_matrices_are_written_to_disk(tmp_path):
+    cache = MatrixCache(path=str(tmp_path))
+    distance_matrix(LOCATIONS, cache=cache)
+    assert npy_files(tmp_path) == []
+
+    backend = CountingBackend()
+    distance_matrix(LOCATIONS, backend, cache=cache)
+    assert npy_files(tmp_path) == [f"{matrix_key(LOCATIONS, backend.profile)}.npy"]
+
+    # A fresh process reads the routed matrix back instead of asking the backend again
+    assert distance_matrix(LOCATIONS, backend, cache=MatrixCache(path=str(tmp_path)))[0, 1] == 7.0
+    assert backend.calls == 1
+
+
+def test_oldest_files_are_evicted_beyond_max_files(tmp_path):
+    cache = MatrixCache(path=str(tmp_path), max_files=3)
+    now = time.time()
+    for i in range(5):
+        cache.put(f"key{i}", np.eye(2) * i)
+        os.utime(tmp_path / f"key{i}.npy", (now - 100 + i, now - 100 + i))
+    cache.put("key5", np.eye(2))
+    assert npy_files(tmp_path) == ["key3.npy", "key4.npy", "key5.npy"]
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = MatrixCache(path=str(tmp_path), ttl_seconds=60)
+    cache.put("old", np.eye(2))
+    os.utime(tmp_path / "old.npy", (1, 1))
+
+    reopened = MatrixCache(path=str(tmp_path), ttl_seconds=60)
+    assert reopened.get("old") is None
+    assert npy_files(tmp_path) == []
+    assert cache.get("old") is not None  # still fresh in the memory tier of the writer
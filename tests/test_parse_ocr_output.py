@@ -0,0 +1,106 @@
+import re
+
+import pandas as pd
+import pytest
+
+from logic.parse_ocr_output import iter_ocr_pages, iter_table_rows, parse_page_table, stream_emission_table
+
+OCR_JSON = "data/glec_raw_output.json"
+CLEANED_CSV = "data/glec_emission_factors_cleaned.csv"
+NUMERIC = ["Combined Load Factor (%)", "Empty Running (%)", "Fuel Intensity (kg/t-km)", "Fuel Intensity (l/t-km)",
+           "WTT (g CO2e/t-km)", "TTW (g CO2e/t-km)", "WTW (g CO2e/t-km)"]
+
+
+@pytest.fixture(scope="module")
+def pages():
+    return {page["page_idx"]: page for page in iter_ocr_pages(OCR_JSON)}
+
+
+@pytest.fixture(scope="module")
+def cleaned():
+    return pd.read_csv(CLEANED_CSV)
+
+
+def _key(text):
+    # OCR spacing differs from the cleaned table ("3.5-7.5t" vs "3.5-7.5 t")
+    return re.sub(r"\s+", "", str(text)).lower()
+
+
+def _reference(cleaned, region, vehicle, fuel, load_factor=None):
+    rows = cleaned[(cleaned["Region"] == region) & (cleaned["Vehicle Type"].map(_key) == _key(vehicle))
+                   & (cleaned["Fuel"] == fuel)]
+    if load_factor is not None:
+        rows = rows[rows["Combined Load Factor (%)"] == load_factor]
+    assert len(rows) == 1
+    return rows.iloc[0]
+
+
+def _parsed(rows, vehicle, fuel, load_factor=None):
+    matches = [r for r in rows if _key(r.get("Vehicle Type")) == _key(vehicle) and r.get("Fuel") == fuel
+               and (load_factor is None or r["Combined Load Factor (%)"] == load_factor)]
+    assert len(matches) == 1
+    return matches[0]
+
+
+def _assert_same(row, reference):
+    for column in NUMERIC:
+        expected = reference[column]
+        if pd.isna(expected):
+            assert row.get(column) is None, column
+        else:
+            assert row[column] == pytest.approx(expected), column
+
+
+@pytest.mark.parametrize("page_idx, vehicle, fuel, load_factor", [
+    (1, "Van < 3.5t", "Diesel", None),
+    (1, "Van < 3.5t", "CNG", None),
+    (2, "Rigid truck 3.5-7.5 t GVW", "Diesel", None),
+    (2, "Rigid truck 3.5-7.5 t GVW", "CNG", None),
+    (2, "Rigid truck 7.5-12 t GVW", "CNG", None),
+])
+def test_europe_rows_match_cleaned_table(pages, cleaned, page_idx, vehicle, fuel, load_factor):
+    rows = parse_page_table(pages[page_idx])
+    assert {r["Region"] for r in rows} == {"Europe & South America"}
+    _assert_same(_parsed(rows, vehicle, fuel, load_factor),
+                 _reference(cleaned, "Europe & South America", vehicle, fuel, load_factor))
+
+
+def test_china_rows_match_cleaned_table(pages, cleaned):
+    rows = parse_page_table(pages[4])
+    assert {r["Region"] for r in rows} == {"China"}
+    # The vehicle name wraps onto a second line in the PDF
+    row = _parsed(rows, "Rigid Truck LDT 3.5-4.5tGVW", "Diesel")
+    _assert_same(row, _reference(cleaned, "China", "Rigid Truck LDT 3.5-4.5 t GVW", "Diesel"))
+
+
+def test_north_america_table_has_no_fuel_column(pages, cleaned):
+    rows = parse_page_table(pages[0])
+    assert {r["Region"] for r in rows} == {"North America"}
+    row = _parsed(rows, "General", None)
+    _assert_same(row, _reference(cleaned, "North America", "General", "Unknown"))
+
+
+def test_sidebar_legend_is_not_read_as_vehicles(pages):
+    vehicles = {r["Vehicle Type"] for r in parse_page_table(pages[1])}
+    assert vehicles == {"Van < 3.5t"}
+
+
+def test_side_by_side_energy_tables(pages, cleaned):
+    rows = parse_page_table(pages[3])
+    van = _parsed(rows, "Van < 3.5t", "Electricity")
+    assert van["Energy Intensity (kWh/t-km)"] == pytest.approx(1.2)
+    rigid = _parsed(rows, "Rigid truck 3.5-7.5t GVW", "Electric", 30)
+    assert rigid["Empty Running (%)"] == 9
+    assert rigid["Energy Intensity (kWh/t-km)"] == pytest.approx(0.86)
+
+
+def test_continued_pages_keep_the_caption_region(pages):
+    rows = list(iter_table_rows(pages[i] for i in sorted(pages)))
+    assert all(r["Region"] is not None for r in rows)
+    assert {r["Region"] for r in rows if r["Page"] in (5, 6)} == {"China"}
+
+
+def test_stream_writes_every_row(tmp_path, pages):
+    out = str(tmp_path / "parsed.csv")
+    written = stream_emission_table(OCR_JSON, out)
+    assert written == len(pd.read_csv(out)) == len(list(iter_table_rows(pages[i] for i in sorted(pages))))
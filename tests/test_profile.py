@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from logic.emissions import calculate_emissions
+from logic.profile import (emission_profile, emission_profiles, iter_emission_profile, profile_chunks,
+                           regional_emission_profiles, sample_profile, stretch_totals)
+
+EUROPE = "Europe & South America"
+VEHICLE = "Rigid truck (18t)"
+ROUTE = np.column_stack([np.linspace(52.52, 48.14, 101), np.linspace(13.40, 11.58, 101)])
+
+
+def test_final_totals_match_calculate_emissions():
+    profile = emission_profile(ROUTE, VEHICLE, "Diesel", 10.0, EUROPE, total_km=585.0)
+    assert profile["distance_km"][0] == 0.0
+    assert profile["distance_km"][-1] == pytest.approx(585.0)
+    expected = calculate_emissions(VEHICLE, "Diesel", 585.0, 10.0, EUROPE)
+    for key in ("WTT", "TTW", "WTW"):
+        assert round(float(profile[key][-1]), 2) == expected[key]
+        assert np.all(np.diff(profile[key]) >= 0)
+
+
+def test_unknown_fuels_get_no_profile():
+    profiles = emission_profiles(ROUTE, VEHICLE, ["Diesel", "Plutonium"], 10.0, EUROPE)
+    assert profiles["Plutonium"] is None
+    single = emission_profile(ROUTE, VEHICLE, "Diesel", 10.0, EUROPE)
+    np.testing.assert_allclose(profiles["Diesel"]["WTW"], single["WTW"])
+
+
+def test_chunked_profile_matches_the_whole_profile():
+    whole = emission_profile(ROUTE, VEHICLE, "Diesel", 10.0, EUROPE, total_km=585.0)
+    streamed = list(iter_emission_profile(ROUTE, VEHICLE, "Diesel", 10.0, EUROPE, total_km=585.0, chunk_rows=17))
+    sliced = list(profile_chunks(whole, chunk_rows=17))
+    assert len(streamed) == len(sliced) == 6
+    for key in ("distance_km", "WTW", "segment_distance_km", "segment_WTW"):
+        np.testing.assert_allclose(np.concatenate([c[key] for c in streamed]),
+                                   np.concatenate([c[key] for c in sliced]), atol=1e-9)
+    assert streamed[0]["segment_distance_km"][0] == 0.0
+
+
+def test_sampled_segments_add_up_to_the_total():
+    whole = emission_profile(ROUTE, VEHICLE, "Diesel", 10.0, EUROPE, total_km=585.0)
+    sampled = sample_profile(whole, step_km=50.0)
+    assert len(sampled["distance_km"]) < len(whole["distance_km"])
+    assert sampled["distance_km"][-1] == whole["distance_km"][-1]
+    assert sampled["segment_WTW"].sum() == pytest.approx(whole["WTW"][-1])
+
+
+def test_regional_profile_costs_each_stretch():
+    chicago_berlin = [[41.88, -87.63], [41.0, -86.0], [52.52, 13.40], [48.14, 11.58]]
+    profile = regional_emission_profiles(chicago_berlin, VEHICLE, ["Diesel"], 10.0)["Diesel"]
+    stretches = stretch_totals(profile)
+    assert stretches[0]["region"] == "North America"
+    assert stretches[-1]["region"] == EUROPE
+    # North America has no diesel rigid truck, so it borrows the European factors
+    assert sum(s["WTW"] for s in stretches) == pytest.approx(profile["WTW"][-1])
+    europe = emission_profile(chicago_berlin, VEHICLE, "Diesel", 10.0, EUROPE)
+    np.testing.assert_allclose(profile["WTW"], europe["WTW"])
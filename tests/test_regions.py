@@ -0,0 +1,30 @@
+import pytest
+
+from logic.regions import region_stretches, segment_region_codes, segment_regions
+
+BERLIN, MUNICH, CHICAGO = [52.52, 13.40], [48.14, 11.58], [41.88, -87.63]
+
+
+def test_segments_take_the_region_they_lie_in():
+    assert list(segment_regions([BERLIN, MUNICH, BERLIN])) == ["Europe & South America"] * 2
+
+
+def test_single_vertex_route_has_no_segments():
+    codes, names = segment_region_codes([BERLIN])
+    assert len(codes) == 0
+    assert "Europe & South America" in names
+    assert region_stretches([BERLIN], [0.0]) == []
+
+
+def test_route_outside_every_region_needs_a_fallback():
+    mid_atlantic = [[30.0, -40.0], [31.0, -41.0]]
+    with pytest.raises(ValueError):
+        segment_region_codes(mid_atlantic)
+    assert list(segment_regions(mid_atlantic, fallback="Europe & South America")) == ["Europe & South America"]
+
+
+def test_stretches_split_where_the_region_changes():
+    stretches = region_stretches([CHICAGO, [41.0, -86.0], BERLIN, MUNICH], [0.0, 150.0, 7000.0, 7585.0])
+    assert [s["region"] for s in stretches][0] == "North America"
+    assert stretches[-1]["region"] == "Europe & South America"
+    assert sum(s["distance_km"] for s in stretches) == pytest.approx(7585.0)
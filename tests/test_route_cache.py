@@ -0,0 +1,49 @@
+import sqlite3
+
+from logic.route_cache import RouteCache
+
+ROUTE = [{"coordinates": [[52.52, 13.40], [48.14, 11.58]], "distance_km": 585.0}]
+
+
+def stored_keys(path):
+    with sqlite3.connect(path) as conn:
+        return sorted(key for (key,) in conn.execute("SELECT key FROM routes"))
+
+
+def test_round_trip_through_the_file(tmp_path):
+    path = str(tmp_path / "routes.sqlite")
+    RouteCache(path=path).put("berlin-munich", ROUTE)
+    routes = RouteCache(path=path).get("berlin-munich")
+    assert routes[0]["distance_km"] == 585.0
+    assert routes[0]["coordinates"][1] == [48.14, 11.58]
+
+
+def test_oldest_rows_are_dropped_beyond_max_rows(tmp_path):
+    path = str(tmp_path / "routes.sqlite")
+    cache = RouteCache(path=path, max_rows=3)
+    for i in range(5):
+        cache.put(f"key{i}", ROUTE)
+    assert stored_keys(path) == ["key2", "key3", "key4"]
+    assert cache.stats["evictions"] == 2
+
+
+def test_expired_rows_are_deleted_on_read(tmp_path):
+    path = str(tmp_path / "routes.sqlite")
+    RouteCache(path=path).put("old", ROUTE)
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE routes SET created = 1")
+
+    reopened = RouteCache(path=path, ttl_seconds=60)
+    assert reopened.get("old") is None
+    assert len(reopened) == 0
+    assert stored_keys(path) == []
+
+
+def test_expired_rows_are_pruned_on_write(tmp_path):
+    path = str(tmp_path / "routes.sqlite")
+    cache = RouteCache(path=path, ttl_seconds=60)
+    cache.put("old", ROUTE)
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE routes SET created = 1")
+    cache.put("new", ROUTE)
+    assert stored_keys(path) == ["new"]
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from logic.async_routing import GeocodingApiError
+from logic.backends import GeocodingError, RoutingError
+from logic.emissions import get_factor_index
+from logic.service import HTTPError, MicroBatcher, Service
+
+KNOWN = {"vehicle_type": "Rigid truck (18t)", "fuel": "Diesel", "distance_km": 100, "load_tons": 10,
+         "region": "Europe & South America"}
+UNKNOWN = {**KNOWN, "vehicle_type": "Hovercraft"}
+
+
+class FailingRoutingClient:
+    def __init__(self, error):
+        self.error = error
+
+    async def get_optimized_route(self, start, end):
+        raise self.error
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_trips_share_one_batch():
+    service = Service(MicroBatcher())
+
+    async def many():
+        return await asyncio.gather(*(service.emissions(KNOWN) for _ in range(20)))
+
+    results = run(many())
+    assert len({r["WTW"] for r in results}) == 1
+    assert service.batcher.stats["batches"] == 1
+    assert service.batcher.stats["trips"] == 20
+
+
+def test_unmatched_trips_in_a_batch_count_one_miss():
+    index = get_factor_index()
+    index.reset_misses()
+    service = Service(MicroBatcher())
+
+    async def many():
+        return await asyncio.gather(*(service.emissions(UNKNOWN) for _ in range(10)), return_exceptions=True)
+
+    errors = run(many())
+    assert all(isinstance(e, HTTPError) and e.status == 404 for e in errors)
+    assert "hovercraft" in str(errors[0])
+    assert sum(row["misses"] for row in index.miss_report()) == 1
+    index.reset_misses()
+
+
+@pytest.mark.parametrize("error, status", [
+    (GeocodingError("Location not found for: Atlantis"), 404),
+    (GeocodingApiError(503, "Service Unavailable"), 502),
+    (RoutingError("ORS is down"), 502),
+])
+def test_route_errors_map_to_status(error, status):
+    service = Service()
+    service.routing_client = FailingRoutingClient(error)
+    with pytest.raises(HTTPError) as raised:
+        run(service.route({"start": "Atlantis", "end": "Munich"}))
+    assert raised.value.status == status
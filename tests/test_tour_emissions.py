@@ -0,0 +1,38 @@
+import math
+
+import pytest
+
+from logic.emissions import calculate_emissions, get_factor_record
+from logic.tour_emissions import leg_multipliers, load_model, tour_emissions
+
+EUROPE = ("Rigid truck (18t)", "Diesel", "Europe & South America")
+NORTH_AMERICA = ("General", "Unknown", "North America")
+
+
+def test_rows_without_load_factor_use_tonne_km():
+    result = tour_emissions(*NORTH_AMERICA, [100, 50], [10, 5])
+    assert result["model"] == "tkm"
+    legs = [calculate_emissions(NORTH_AMERICA[0], NORTH_AMERICA[1], d, t, NORTH_AMERICA[2]) for d, t in [(100, 10), (50, 5)]]
+    assert result["totals"]["WTW"] == pytest.approx(sum(leg["WTW"] for leg in legs))
+
+
+def test_unknown_capacity_falls_back_to_tonne_km():
+    result = tour_emissions(*EUROPE, [100], [10], capacity_tons=math.nan)
+    assert result["model"] == "tkm"
+
+
+def test_load_factor_model_charges_empty_legs():
+    result = tour_emissions(*EUROPE, [100, 100], [10, 0])
+    assert result["model"] == "load-factor"
+    assert result["legs"]["WTW"][1] > 0
+    assert result["legs"]["WTW"][0] > result["legs"]["WTW"][1]
+    # The tour already has an empty leg, so no extra empty running is allocated
+    assert result["empty_running"]["distance_km"] == 0.0
+
+
+def test_model_does_not_depend_on_the_multiplier_array():
+    record = get_factor_record(*EUROPE)
+    loads = [4.0, 8.0]
+    assert load_model(record, 20.0) == "load-factor"
+    assert list(leg_multipliers(record, loads, 20.0)) != loads
+    assert load_model(get_factor_record(*NORTH_AMERICA), 20.0) == "tkm"
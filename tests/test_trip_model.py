@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from logic.profile import emission_profile, regional_emission_profiles
+from logic.trip_model import TripModel
+
+EUROPE = "Europe & South America"
+VEHICLE = "Rigid truck (18t)"
+ROUTE = np.column_stack([np.linspace(52.52, 48.14, 50), np.linspace(13.40, 11.58, 50)])
+CHICAGO_BERLIN = [[41.88, -87.63], [41.0, -86.0], [52.52, 13.40], [48.14, 11.58]]
+
+
+def statuses(model):
+    return {row["stage"]: row["status"] for row in model.report()}
+
+
+def test_profile_matches_emission_profile():
+    profile = TripModel().profile("berlin-munich", ROUTE, VEHICLE, "Diesel", 10.0, region=EUROPE, total_km=585.0)
+    expected = emission_profile(ROUTE, VEHICLE, "Diesel", 10.0, EUROPE, total_km=585.0)
+    for key in ("distance_km", "WTT", "TTW", "WTW"):
+        np.testing.assert_allclose(profile[key], expected[key])
+
+
+def test_detected_regions_match_regional_profiles():
+    profile = TripModel().profile("chicago-berlin", CHICAGO_BERLIN, VEHICLE, "Diesel", 10.0)
+    expected = regional_emission_profiles(CHICAGO_BERLIN, VEHICLE, ["Diesel"], 10.0)["Diesel"]
+    np.testing.assert_allclose(profile["WTW"], expected["WTW"])
+    assert list(profile["region"]) == list(expected["region"])
+
+
+def test_changes_only_redo_the_stages_they_affect():
+    model = TripModel()
+    model.profile("berlin-munich", ROUTE, VEHICLE, "Diesel", 10.0, region=EUROPE)
+    assert set(statuses(model).values()) == {"recomputed"}
+
+    twice = model.profile("berlin-munich", ROUTE, VEHICLE, "Diesel", 20.0, region=EUROPE)
+    assert statuses(model) == {"geometry": "cached", "regions": "cached", "factors": "cached",
+                               "unit_profile": "cached", "profile": "recomputed"}
+    once = model.profile("berlin-munich", ROUTE, VEHICLE, "Diesel", 10.0, region=EUROPE)
+    np.testing.assert_allclose(twice["WTW"], 2 * once["WTW"])
+
+    model.profile("berlin-munich", ROUTE, VEHICLE, "CNG", 10.0, region=EUROPE)
+    assert statuses(model)["regions"] == "cached" and statuses(model)["factors"] == "recomputed"
+
+    model.profile("berlin-hamburg", [[52.52, 13.40], [53.55, 9.99]], VEHICLE, "CNG", 10.0, region=EUROPE)
+    assert statuses(model)["geometry"] == "recomputed"
+    assert model.stats["geometry"]["recomputes"] == 2
+
+
+def test_invalidate_drops_the_stage_and_those_after_it():
+    model = TripModel()
+    model.profile("berlin-munich", ROUTE, VEHICLE, "Diesel", 10.0, region=EUROPE)
+    model.invalidate("factors")
+    model.profile("berlin-munich", ROUTE, VEHICLE, "Diesel", 10.0, region=EUROPE)
+    assert statuses(model) == {"geometry": "cached", "regions": "cached", "factors": "recomputed",
+                               "unit_profile": "recomputed", "profile": "recomputed"}
+
+
+def test_unknown_fuel_raises():
+    with pytest.raises(ValueError, match="No match found"):
+        TripModel().profile("berlin-munich", ROUTE, VEHICLE, "Plutonium", 10.0, region=EUROPE)
+    with pytest.raises(ValueError, match="in any region along the route"):
+        TripModel().profile("berlin-munich", ROUTE, VEHICLE, "Plutonium", 10.0)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from logic.emissions import calculate_emissions
+from logic.uncertainty import UncertaintyModel, emission_bands, point_bands, trip_uncertainty
+
+EUROPE = "Europe & South America"
+VEHICLE = "Rigid truck (18t)"
+
+
+def test_bands_are_ordered_around_the_point_estimate():
+    point = calculate_emissions(VEHICLE, "Diesel", 585.0, 10.0, EUROPE)
+    bands = trip_uncertainty(VEHICLE, "Diesel", 585.0, 10.0, EUROPE, n_samples=20_000)
+    for key in ("WTT", "TTW", "WTW"):
+        assert bands[key]["p5"] < bands[key]["p50"] < bands[key]["p95"]
+        # Multipliers have mean 1, so the sample mean lands on calculate_emissions
+        assert bands[key]["mean"] == pytest.approx(point[key], rel=0.01)
+
+
+def test_same_seed_same_bands_regardless_of_the_batch():
+    alone = emission_bands(vehicle_type=VEHICLE, fuel="Diesel", distance_km=585.0, load_tons=10.0, region=EUROPE,
+                           n_samples=2000, seed=7)
+    trips = pd.DataFrame({"vehicle_type": ["Van", VEHICLE], "fuel": ["Diesel", "Diesel"],
+                          "distance_km": [30.0, 585.0], "load_tons": [1.0, 10.0], "region": [EUROPE, EUROPE]})
+    batch = emission_bands(trips, n_samples=2000, seed=7)
+    assert batch["WTW_p95"][1] == alone["WTW_p95"][0]
+    assert emission_bands(trips, n_samples=2000, seed=8)["WTW_p95"][1] != alone["WTW_p95"][0]
+
+
+def test_bands_scale_with_tonne_km_and_chunking_does_not_matter():
+    trips = pd.DataFrame({"vehicle_type": [VEHICLE, VEHICLE, VEHICLE, "Van"], "fuel": "Diesel",
+                          "distance_km": [100.0, 200.0, 50.0, 100.0], "load_tons": [10.0, 10.0, 40.0, 1.0],
+                          "region": EUROPE})
+    bands = emission_bands(trips, n_samples=1000)
+    np.testing.assert_allclose(bands["WTW_p95"][:3] / bands["WTW_p95"][0], [1.0, 2.0, 2.0])
+    chunked = emission_bands(trips, n_samples=1000, max_chunk_values=1000)
+    np.testing.assert_array_equal(chunked["WTW_p95"], bands["WTW_p95"])
+
+
+def test_unknown_trips_are_nan_in_a_batch_and_raise_alone():
+    bands = emission_bands(vehicle_type=["Spaceship", VEHICLE], fuel="Diesel", distance_km=[100.0, 100.0],
+                           load_tons=1.0, region=EUROPE, n_samples=100)
+    assert np.isnan(bands["WTW_mean"][0]) and not np.isnan(bands["WTW_mean"][1])
+    with pytest.raises(ValueError, match="No match found for: spaceship"):
+        trip_uncertainty("Spaceship", "Diesel", 100.0, 1.0, EUROPE, n_samples=100)
+    with pytest.raises(ValueError):
+        emission_bands(vehicle_type=VEHICLE, fuel="Diesel", distance_km=1.0, load_tons=1.0, region=EUROPE,
+                       n_samples=0)
+
+
+def test_zero_spread_collapses_the_bands():
+    model = UncertaintyModel(wtt=0.0, ttw=0.0, load_factor=0.0, distance=0.0)
+    bands = point_bands(120.0, 480.0, 600.0, n_samples=500, model=model)
+    assert bands["WTW"] == {"mean": 600.0, "p5": 600.0, "p50": 600.0, "p95": 600.0}
+    assert bands["WTT"]["p95"] == 120.0
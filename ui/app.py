@@ -6,7 +6,10 @@ import pandas as pd
 # ✅ Add root folder to sys.path for imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from logic.emissions import calculate_emissions, df as emissions_df
+from logic.emissions import calculate_emissions
+from ui.cached import factor_table
+
+emissions_df = factor_table()
 
 st.set_page_config(page_title="GreenRoute Emissions Calculator", layout="centered")
 
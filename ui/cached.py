@@ -0,0 +1,136 @@
+import hashlib
+
+import streamlit as st
+
+from logic import emissions
+from logic.comparison import get_factor_cube, rank_options
+from logic.export import profile_report_chunks, report_bytes
+from logic.geometry import simplify
+from logic.map_layers import bin_profiles, cells_geojson, heat_points
+from logic.profile import emission_profiles, regional_emission_profiles, sample_profile
+from logic.route_cache import encode_routes
+from logic.uncertainty import point_bands
+
+# Region choice that costs each stretch of the route with the region it lies in
+AUTO_REGION = "Auto-detect from route"
+
+
+# Pure, memoized building blocks for the Streamlit pages. Reruns (widget
+# changes, Gemini questions) hit these caches instead of routing or
+# recomputing emissions. Arguments prefixed with "_" are not hashed by
+# Streamlit; they are always derived from the hashed key arguments.
+
+@st.cache_resource
+def factor_index():
+    # One factor index per server process, shared by every session
+    return emissions.get_factor_index()
+
+
+@st.cache_resource
+def factor_table():
+    return emissions.df
+
+
+@st.cache_data(max_entries=256, show_spinner="Routing...")
+def plan_route(start_city, end_city):
+    """get_optimized_route plus content ids for the selected and baseline routes."""
+    # Imported here: routing needs the ORS key, which pages without maps don't
+    from logic.routing import get_optimized_route
+
+    route_data = get_optimized_route(start_city, end_city)
+    route_data["baseline_id"] = route_content_id(route_data["baseline"])
+    route_data["route_id"] = route_content_id(selected_route(route_data))
+    return route_data
+
+
+def route_content_id(route):
+    # Hash of the route's compact binary encoding, so equal geometry means equal id
+    return hashlib.sha256(encode_routes([route])).hexdigest()[:16]
+
+
+def selected_route(route_data):
+    return route_data["optimized"] or route_data["baseline"]
+
+
+@st.cache_data(max_entries=64)
+def render_coords(route_id, _coords, tolerance_m):
+    return simplify(_coords, tolerance_m).tolist()
+
+
+@st.cache_data(max_entries=256)
+def trip_profiles(route_id, vehicle_type, fuels, region, load_tons, _coords, total_km):
+    """Cumulative emission profiles of one route for every fuel in fuels."""
+    factor_index()
+    if region == AUTO_REGION:
+        return regional_emission_profiles(_coords, vehicle_type, fuels, load_tons, total_km=total_km)
+    return emission_profiles(_coords, vehicle_type, fuels, load_tons, region, total_km=total_km)
+
+
+@st.cache_data(max_entries=256)
+def trip_totals(route_id, vehicle_type, fuels, region, load_tons, distance_km):
+    # Whole-trip WTT/TTW/WTW per fuel, None where the table has no factors
+    factor_index()
+    totals = {}
+    for fuel in fuels:
+        try:
+            totals[fuel] = emissions.calculate_emissions(vehicle_type, fuel, distance_km, load_tons, region)
+        except ValueError:
+            totals[fuel] = None
+    return totals
+
+
+@st.cache_data(max_entries=256)
+def trip_comparison(vehicle_type, tkm_items):
+    """Every vehicle/fuel option costed against one trip's tonne-km per region.
+
+    tkm_items is a tuple of (region, tonne-km) pairs so it hashes. Returns
+    {"fuels": {fuel: WTW kg or None} for vehicle_type, "ranked", "missing"}.
+    """
+    factor_index()
+    tkm_by_region = dict(tkm_items)
+    comparison = rank_options(tkm_by_region)
+    comparison["fuels"] = get_factor_cube().fuel_comparison(vehicle_type, tkm_by_region)
+    return comparison
+
+
+@st.cache_data(max_entries=256)
+def trip_bands(route_id, vehicle_type, fuel, region, load_tons, wtt_kg, ttw_kg, wtw_kg):
+    # 5-95% Monte Carlo range around the trip totals, seeded so reruns show the same band
+    return point_bands(wtt_kg, ttw_kg, wtw_kg)
+
+
+@st.cache_data(max_entries=256)
+def marker_rows(route_id, vehicle_type, fuel, region, load_tons, sample_km, _profile):
+    """One table/marker row every sample_km along a cached profile."""
+    sampled = sample_profile(_profile, sample_km)
+    rows = []
+    for idx in range(len(sampled["lat"])):
+        rows.append({
+            "city": f"Point {idx+1}",
+            "lat": float(sampled["lat"][idx]),
+            "lon": float(sampled["lon"][idx]),
+            "Vehicle Type": vehicle_type,
+            "Fuel Type": fuel,
+            "Region": sampled["region"][idx] if "region" in sampled else region,
+            "Segment Distance (km)": round(float(sampled["segment_distance_km"][idx]), 2),
+            "Cumulative Distance (km)": round(float(sampled["distance_km"][idx]), 2),
+            "WTT (kg)": round(float(sampled["segment_WTT"][idx]), 2),
+            "TTW (kg)": round(float(sampled["segment_TTW"][idx]), 2),
+            "WTW (kg)": round(float(sampled["segment_WTW"][idx]), 2),
+            "co2": round(float(sampled["WTW"][idx]), 2)  # cumulative
+        })
+    return rows
+
+
+@st.cache_data(max_entries=16)
+def trip_report(route_id, vehicle_type, fuel, region, load_tons, fmt, _profile):
+    """Encoded per-vertex trip report (see logic.export) of a cached profile."""
+    region = None if region == AUTO_REGION else region
+    return report_bytes(profile_report_chunks(_profile, vehicle_type, fuel, load_tons, region), fmt)
+
+
+@st.cache_data(max_entries=64)
+def emission_cells(route_id, vehicle_type, fuel, region, load_tons, kind, _profile):
+    """Binned per-segment WTW of a cached profile: cell GeoJSON and heatmap points."""
+    bins = bin_profiles([_profile], kind=kind)
+    return {"geojson": cells_geojson(bins), "heat": heat_points(bins), "cell_km": bins["cell_km"]}
@@ -10,23 +10,40 @@ import folium
 from folium.plugins import HeatMap
 from streamlit_folium import folium_static
 import pandas as pd
-from io import StringIO
-
-from logic.routing import get_optimized_route
-
-from logic.emissions import calculate_emissions
-from logic.gemini_explainer import ask_gemini
-
-# Initialize session state
-if "route_data" not in st.session_state:
+import importlib.util
+
+from logic import instrumentation
+from logic.export import FORMATS
+from logic.map_layers import add_emission_cells, add_markers, fit_to
+from logic.profile import stretch_totals
+from logic.trip_model import TripModel
+from ui.cached import AUTO_REGION, emission_cells, marker_rows, plan_route, render_coords, selected_route, trip_bands, trip_comparison, trip_profiles, trip_report, trip_totals
+from logic.gemini_explainer import stream_gemini
+
+# Display tolerance for the route line; distance maths always uses the full polyline
+RENDER_TOLERANCE_M = 25.0
+
+# Initialize session state: only the submitted route endpoints are stored; the
+# vehicle/fuel/region/load widgets apply live, re-costing the cached geometry
+# through the session's TripModel, and the rest comes from ui.cached
+if "trip" not in st.session_state:
+    st.session_state.trip = None
+    st.session_state.trip_model = TripModel()
     st.session_state.route_data = None
     st.session_state.city_data = None
     st.session_state.total_distance_km = 0
     st.session_state.optimized = False
+    st.session_state.stretches = None
+    st.session_state.bands = None
+    st.session_state.profile = None
 
 st.set_page_config(page_title="GreenRoute Map View", layout="wide")
 st.title("🗺️ CO₂ Emission Map View")
 
+# Timing collection is process-wide and set once at startup (GREENROUTE_METRICS);
+# the checkbox only shows or hides this session's view of it
+show_debug = st.sidebar.checkbox("🛠️ Debug: show timings", value=False)
+
 # Inputs
 start_city = st.text_input("Enter Start City")
 end_city = st.text_input("Enter End City")
@@ -56,121 +73,134 @@ fuel_type = st.selectbox("Fuel Type", [
 ])
 
 region = st.selectbox("Region", [
-    "Europe & South America", "North America", "China"])  # or from df["Region"].unique()
+    AUTO_REGION, "Europe & South America", "North America", "China"])  # or from df["Region"].unique()
 
 
 load_tons = st.slider("Load (tons)", 1.0, 40.0, 10.0)
+sample_km = st.number_input("Marker spacing (km)", min_value=1.0, max_value=500.0, value=25.0, step=5.0)
+cell_kind = st.radio("Emission cells", ["hex", "square"], horizontal=True)
 
-# Generate Route
+# Generate Route; vehicle, fuel, region and load changes afterwards apply without re-routing
 if st.button("Generate Route and Emissions"):
+    st.session_state.trip = {"start_city": start_city, "end_city": end_city}
+
+trip = st.session_state.trip and {
+    **st.session_state.trip, "vehicle_type": vehicle_type, "fuel_type": fuel_type, "region": region,
+    "load_tons": load_tons,
+}
+if trip:
     try:
-        route_data = get_optimized_route(start_city, end_city)
+        route_data = plan_route(trip["start_city"], trip["end_city"])
 
         # Use optimized if available
-        selected_route = route_data["optimized"] if route_data["optimized"] else route_data["baseline"]
+        route = selected_route(route_data)
         st.session_state.optimized = route_data["optimized"] is not None
-
-        route_coords = selected_route["coordinates"]
-        total_distance_km = selected_route["distance_km"]
-
-        sampled_coords = route_coords[::10] + [route_coords[-1]]
-        segment_distance = round(total_distance_km / len(sampled_coords), 2)
-
-        city_data = []
-        cumulative = 0
-        for idx, [lat, lon] in enumerate(sampled_coords):
-            co2 = calculate_emissions(vehicle_type, fuel_type, segment_distance, load_tons, region)
-            cumulative += co2["WTW"]
-            city_data.append({
-                "city": f"Point {idx+1}",
-                "lat": lat,
-                "lon": lon,
-                "Vehicle Type": vehicle_type,
-                "Fuel Type": fuel_type,
-                "Region": region,
-                "Segment Distance (km)": segment_distance,
-                "WTT (kg)": round(co2["WTT"], 2),
-                "TTW (kg)": round(co2["TTW"], 2),
-                "WTW (kg)": round(co2["WTW"], 2),
-                "co2": round(cumulative, 2)  # ✅ now shows cumulative!
-            })
-
-        
+        total_distance_km = route["distance_km"]
+
+        # Profile for the chosen fuel: only the stages whose inputs changed are recomputed
+        # (a new load rescales, a new vehicle/fuel re-costs cached distances); other fuels are compared from totals
+        fuels = (trip["fuel_type"].lower(),)
+        profile = st.session_state.trip_model.profile(
+            route_data["route_id"], route["coordinates"], trip["vehicle_type"], trip["fuel_type"], trip["load_tons"],
+            region=None if trip["region"] == AUTO_REGION else trip["region"], total_km=total_distance_km)
+
+        # Exact cumulative emissions along the full polyline, thinned to one marker every sample_km
+        st.session_state.city_data = marker_rows(route_data["route_id"], trip["vehicle_type"], trip["fuel_type"],
+                                                 trip["region"], trip["load_tons"], sample_km, profile)
+        st.session_state.cells = emission_cells(route_data["route_id"], trip["vehicle_type"], trip["fuel_type"],
+                                                trip["region"], trip["load_tons"], cell_kind, profile)
+        st.session_state.stretches = stretch_totals(profile) if "region" in profile else None
+        totals = [float(profile[key][-1]) for key in ("WTT", "TTW", "WTW")]
+        st.session_state.bands = trip_bands(route_data["route_id"], trip["vehicle_type"], trip["fuel_type"],
+                                            trip["region"], trip["load_tons"], *totals)
+        st.session_state.profile = profile
         st.session_state.route_data = route_data
-        st.session_state.city_data = city_data
         st.session_state.total_distance_km = total_distance_km
 
     except Exception as e:
+        st.session_state.route_data = st.session_state.city_data = None
         st.error(f"❌ Error: {str(e)}")
 
 # Map + Summary
 if st.session_state.route_data and st.session_state.city_data:
-    route_coords = st.session_state.route_data["optimized"]["coordinates"] if st.session_state.optimized else st.session_state.route_data["baseline"]["coordinates"]
+    route_data = st.session_state.route_data
+    route = selected_route(route_data)
+    route_coords = render_coords(route_data["route_id"], route["coordinates"], RENDER_TOLERANCE_M)
     city_data = st.session_state.city_data
     total_distance_km = st.session_state.total_distance_km
 
-    m = folium.Map(location=route_coords[len(route_coords)//2], zoom_start=7)
-    folium.PolyLine(route_coords, color="blue", weight=4).add_to(m)
+    with instrumentation.timer("ui.build_map"):
+        m = folium.Map(location=route_coords[len(route_coords)//2], zoom_start=7)
+        folium.PolyLine(route_coords, color="blue", weight=4).add_to(m)
 
-    for city in city_data:
-        folium.Marker(
-            location=[city["lat"], city["lon"]],
-            tooltip=f"{city['city']}<br>CO₂: {city['co2']} KG",
-            icon=folium.Icon(color="green" if city["co2"] < 300 else "red")
-        ).add_to(m)
-
-    HeatMap([[c["lat"], c["lon"], c["co2"]] for c in city_data], min_opacity=0.3, radius=20).add_to(m)
+        # Emissions binned into cells along the full route; markers are clustered past a few dozen
+        cells = st.session_state.cells
+        add_emission_cells(m, cells["geojson"], name=f"CO₂ per {cells['cell_km']:g} km cell")
+        HeatMap(cells["heat"], name="Heatmap", min_opacity=0.3, radius=20).add_to(m)
+        add_markers(m, city_data)
+        folium.LayerControl(collapsed=True).add_to(m)
+        fit_to(m, route_coords)
 
     st.subheader("🌍 Route + Heatmap View")
-    folium_static(m)
+    with instrumentation.timer("ui.render_map"):
+        folium_static(m)
 
     st.subheader("📊 Trip Summary")
-    st.write(f"**Start:** {start_city}")
-    st.write(f"**End:** {end_city}")
+    st.write(f"**Start:** {trip['start_city']}")
+    st.write(f"**End:** {trip['end_city']}")
     st.write(f"**Total Distance:** {total_distance_km} km")
-    st.write(f"**Vehicle:** {vehicle_type}")
-    st.write(f"**Fuel:** {fuel_type}")
-    st.write(f"**Load:** {load_tons} tons")
+    st.write(f"**Vehicle:** {trip['vehicle_type']}")
+    st.write(f"**Fuel:** {trip['fuel_type']}")
+    st.write(f"**Load:** {trip['load_tons']} tons")
+    if st.session_state.stretches:
+        # Detected GLEC regions, each stretch costed with its own factors
+        st.dataframe(pd.DataFrame(st.session_state.stretches).round(2).rename(columns={
+            "region": "Region", "distance_km": "Distance (km)", "WTT": "WTT (kg)", "TTW": "TTW (kg)", "WTW": "WTW (kg)"}),
+            hide_index=True)
     st.write(f"**Estimated WTW CO₂ Emission:** {city_data[-1]['co2']} kg")
+    with st.expander("♻️ Computation stages (cached vs recomputed on this run)"):
+        st.dataframe(pd.DataFrame(st.session_state.trip_model.report()), hide_index=True)
+    wtw_band = st.session_state.bands["WTW"]
+    st.caption(f"90% range (Monte Carlo over factor, load-factor and distance uncertainty): "
+               f"{wtw_band['p5']} – {wtw_band['p95']} kg")
 
         # -------------------------------
     # ⚖️ Compare emissions by fuel
     # -------------------------------
     st.subheader("⚖️ CO₂ Comparison Across Fuel Types")
-    fuel_options = ["diesel", "petrol", "cng", "lng", "electric"]
-    other_fuels = [f for f in fuel_options if f != fuel_type.lower()]
-
-    emissions_comparison = {}
-
-    for alt_fuel in other_fuels:
-        try:
-            alt_emissions = sum([
-                calculate_emissions(vehicle_type, alt_fuel, segment_distance, load_tons, region)["WTW"]
-                for _ in city_data
-            ])
-            emissions_comparison[alt_fuel.title()] = round(alt_emissions, 2)
-        except:
-            emissions_comparison[alt_fuel.title()] = None
-            # st.warning(f"No data for {vehicle_type} with {alt_fuel.title()}")
+    # Tonne-km per region (per detected stretch in auto mode); every vehicle/fuel option is costed from it at once
+    tkm_by_region = {}
+    for stretch in st.session_state.stretches or [{"region": trip["region"], "distance_km": total_distance_km}]:
+        tkm_by_region[stretch["region"]] = tkm_by_region.get(stretch["region"], 0.0) + stretch["distance_km"] * trip["load_tons"]
+    comparison = trip_comparison(trip["vehicle_type"], tuple(sorted(tkm_by_region.items())))
 
     # Show result as a bar chart
     # ✅ Store comparison results in session state
-    st.session_state.emissions_comparison = emissions_comparison
+    st.session_state.emissions_comparison = {fuel.title(): None if wtw is None else round(wtw, 2)
+                                             for fuel, wtw in comparison["fuels"].items()
+                                             if fuel != trip["fuel_type"].lower()}
     st.bar_chart({k: v for k, v in st.session_state.emissions_comparison.items() if v is not None})
 
-    st.info(st.session_state.route_data["note"])
+    st.markdown("**Lowest-WTW vehicle and fuel options for this trip**")
+    st.dataframe(comparison["ranked"].head(15), hide_index=True)
+    if len(comparison["missing"]):
+        with st.expander(f"{len(comparison['missing'])} vehicle/fuel combinations without factors"):
+            st.dataframe(comparison["missing"], hide_index=True)
 
-    if st.session_state.optimized:
-        baseline_coords = st.session_state.route_data["baseline"]["coordinates"]
-        baseline_distance = st.session_state.route_data["baseline"]["distance_km"]
-        baseline_segments = baseline_coords[::10] + [baseline_coords[-1]]
-        baseline_segment_distance = round(baseline_distance / len(baseline_segments), 2)
+    st.info(route_data["note"])
 
-        # Recalculate baseline emissions freshly
-        baseline_emissions = 0
-        for _ in baseline_segments:
-            co2 = calculate_emissions(vehicle_type, fuel_type, baseline_segment_distance, load_tons, region)
-            baseline_emissions += co2["WTW"]
+    if st.session_state.optimized:
+        baseline_distance = route_data["baseline"]["distance_km"]
+
+        # Baseline emissions over the full baseline distance
+        if trip["region"] == AUTO_REGION:
+            baseline_profile = trip_profiles(route_data["baseline_id"], trip["vehicle_type"], fuels[:1], AUTO_REGION,
+                                             trip["load_tons"], route_data["baseline"]["coordinates"], baseline_distance)
+            baseline_emissions = round(float(baseline_profile[fuels[0]]["WTW"][-1]), 2)
+        else:
+            baseline_totals = trip_totals(route_data["baseline_id"], trip["vehicle_type"], (trip["fuel_type"],),
+                                          trip["region"], trip["load_tons"], baseline_distance)
+            baseline_emissions = baseline_totals[trip["fuel_type"]]["WTW"]
 
         # ✅ Use only final cumulative optimized emission
         optimized_emissions = city_data[-1]["co2"]
@@ -185,34 +215,52 @@ if st.session_state.route_data and st.session_state.city_data:
 st.subheader("🤖 Ask GreenRoute AI (Gemini)")
 user_question = st.text_input("Ask anything about this trip...")
 
-if user_question and st.session_state.city_data:
-    with st.spinner("Thinking..."):
-        try:
-            trip_context = (
-                f"Vehicle: {vehicle_type}, Fuel: {fuel_type}, "
-                f"Load: {load_tons} tons, Distance: {st.session_state.total_distance_km} km, "
-                f"Total CO₂: {round(st.session_state.city_data[-1]['co2'], 2)} kg"
-            )
-            response = ask_gemini(user_question, trip_context)
-            st.info(response)
-        except Exception as e:
-            st.error(f"Gemini error: {str(e)}")
-
-# CSV Download
-if st.session_state.city_data:
-    df = pd.DataFrame(st.session_state.city_data)
-    df["Vehicle"] = vehicle_type
-    df["Fuel"] = fuel_type
-    df["Load (tons)"] = load_tons
-    df["Segment Distance (km)"] = round(st.session_state.total_distance_km / len(df), 2)
-
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_bytes = csv_buffer.getvalue().encode("utf-8")
+if user_question and trip and st.session_state.city_data:
+    try:
+        trip_context = (
+            f"Vehicle: {trip['vehicle_type']}, Fuel: {trip['fuel_type']}, "
+            f"Load: {trip['load_tons']} tons, Distance: {st.session_state.total_distance_km} km, "
+            f"Total CO₂: {round(st.session_state.city_data[-1]['co2'], 2)} kg"
+        )
+        # Tokens are shown as they arrive; repeated questions come from the explanation cache
+        with st.container(border=True):
+            st.write_stream(stream_gemini(user_question, trip_context))
+    except Exception as e:
+        st.error(f"Gemini error: {str(e)}")
 
+# Report download: every route vertex with per-segment and cumulative values, streamed in chunks
+if st.session_state.city_data:
+    formats = [fmt for fmt in FORMATS if fmt != "parquet" or importlib.util.find_spec("pyarrow")]
+    report_format = st.radio("Report format", formats, horizontal=True, format_func=str.upper)
+    route_data = st.session_state.route_data
+    mime, extension = FORMATS[report_format]
     st.download_button(
-        label="📥 Download Trip Report (CSV)",
-        data=csv_bytes,
-        file_name="greenroute_trip_report.csv",
-        mime="text/csv"
+        label=f"📥 Download Trip Report ({report_format.upper()})",
+        data=trip_report(route_data["route_id"], trip["vehicle_type"], trip["fuel_type"], trip["region"],
+                         trip["load_tons"], report_format, st.session_state.profile),
+        file_name=f"greenroute_trip_report{extension}",
+        mime=mime
     )
+
+# Debug panel
+if show_debug:
+    snapshot = instrumentation.snapshot()
+    with st.sidebar:
+        st.subheader("⏱️ Timings")
+        if not instrumentation.enabled():
+            st.caption("Timing collection is off; start the app with GREENROUTE_METRICS=1 to record timings.")
+        elif snapshot["timings"]:
+            st.dataframe(pd.DataFrame([
+                {"operation": name, **{k: v for k, v in stats.items() if k != "buckets"}}
+                for name, stats in snapshot["timings"].items()
+            ]).set_index("operation"))
+        else:
+            st.caption("No instrumented calls yet.")
+        st.subheader("🗄️ Caches")
+        st.json(snapshot["caches"])
+        st.download_button("Export JSON", instrumentation.to_json(), file_name="greenroute_metrics.json",
+                           mime="application/json")
+        st.download_button("Export Prometheus", instrumentation.to_prometheus(), file_name="greenroute_metrics.prom",
+                           mime="text/plain")
+        if st.button("Reset timings (all sessions)"):
+            instrumentation.reset()